@@ -0,0 +1,3 @@
+"""
+Benchmarks for markua_indexing; run with `python -m benchmarks --help`.
+"""
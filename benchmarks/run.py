@@ -0,0 +1,207 @@
+"""
+Time each indexing stage on synthetic books of several sizes, report
+throughput and peak RSS, and compare against a stored JSON baseline.
+Each measurement runs in a fresh process so peak RSS is per stage.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.synthetic import BookSpec, parse_size, write_book
+from markua_indexing.markdown_doc import (MarkdownDoc, italicized_phrases, remove_stop_words,
+                                          stop_words, strip_code, unique_words)
+
+baseline_file = Path(__file__).with_name("baseline.json")
+# Smaller books finish a stage in microseconds, too fast to compare across runs:
+DEFAULT_SIZES = "1M,10M"
+# Each timing repeats its operation for at least this long, and reports the mean:
+MIN_SECONDS = 0.2
+# A stage is slower than the baseline if its throughput drops by more than this:
+DEFAULT_TOLERANCE = 0.25
+
+
+def _setup(path: Path, stage: str) -> Callable[[], object]:
+    """Untimed preparation; returns the timed operation."""
+    # Dictionaries load once per process, so keep that out of every stage:
+    stop_words.refresh()
+    if stage == "read":
+        return lambda: path.read_text(encoding='utf-8')
+    if stage == "markdown_doc":
+        def build():
+            doc = MarkdownDoc(doc_path=path, keep_text=False)
+            return doc.index_phrases, doc.index_words
+        return build
+    text = path.read_text(encoding='utf-8')
+    if stage == "strip_code":
+        return lambda: strip_code(text)
+    codeless = strip_code(text)
+    if stage == "italicized_phrases":
+        return lambda: italicized_phrases(codeless)
+    if stage == "unique_words":
+        return lambda: unique_words(codeless)
+    words = unique_words(codeless)
+    if stage == "remove_stop_words":
+        return lambda: remove_stop_words(words)
+    raise ValueError(f"unknown stage {stage!r}")
+
+
+STAGES = ["read", "strip_code", "italicized_phrases", "unique_words",
+          "remove_stop_words", "markdown_doc"]
+
+
+def _peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _measure_in_child(path: Path, stage: str, repeat: int, connection) -> None:
+    operation = _setup(path, stage)
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            operation()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= MIN_SECONDS:
+                break
+        best = min(best, elapsed / calls)
+    connection.send((best, _peak_rss()))
+    connection.close()
+
+
+def measure(path: Path, stage: str, repeat: int = 3) -> Tuple[float, int]:
+    """
+    (best time in seconds, peak RSS in bytes) for `stage` on `path`: the
+    best of `repeat` timings, each the mean of the calls made in MIN_SECONDS
+    (at least one).
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(path, stage, repeat, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        raise RuntimeError(f"benchmark of {stage} on {path} failed") from None
+    process.join()
+    return result
+
+
+def run(sizes: Sequence[int], stages: Sequence[str], spec: BookSpec,
+        repeat: int, directory: Path) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        path = write_book(BookSpec(size, spec.seed, spec.fence_density, spec.emphasis_density,
+                                   spec.vocabulary, spec.stop_word_ratio),
+                          directory / f"book_{size}.md")
+        actual = path.stat().st_size
+        for stage in stages:
+            seconds, peak = measure(path, stage, repeat)
+            results[f"{size_label(size)}:{stage}"] = {
+                "bytes": actual,
+                "seconds": seconds,
+                "mb_per_s": actual / 1e6 / seconds if seconds else float("inf"),
+                "peak_rss_mb": peak / 1e6,
+            }
+        path.unlink()
+    return results
+
+
+def size_label(size: int) -> str:
+    for unit, scale in (("G", 1024 ** 3), ("M", 1024 ** 2), ("K", 1024)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return str(size)
+
+
+def regressions(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Descriptions of each measurement that is slower, or uses more memory, than allowed."""
+    problems = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if result["mb_per_s"] < expected["mb_per_s"] * (1 - tolerance):
+            problems.append(f"{key}: {result['mb_per_s']:.2f} MB/s, "
+                            f"baseline {expected['mb_per_s']:.2f} MB/s")
+        if result["peak_rss_mb"] > expected["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{key}: peak RSS {result['peak_rss_mb']:.1f} MB, "
+                            f"baseline {expected['peak_rss_mb']:.1f} MB")
+    return problems
+
+
+def report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'size:stage':<32}{'seconds':>10}{'MB/s':>10}{'peak RSS MB':>14}")
+    for key, result in results.items():
+        print(f"{key:<32}{result['seconds']:>10.4f}{result['mb_per_s']:>10.2f}"
+              f"{result['peak_rss_mb']:>14.1f}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="Comma-separated book sizes, e.g. 10K,1M,500M (default: %(default)s).")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="Comma-separated stages to time (default: all).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement; the best is kept (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fence-density", type=float, default=0.1)
+    parser.add_argument("--emphasis-density", type=float, default=0.05)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--baseline", type=Path, default=baseline_file,
+                        help="JSON baseline to compare against (default: %(default)s).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed fractional slowdown or memory growth (default: %(default)s).")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write these results as the new baseline instead of comparing.")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    stages = args.stages.split(",")
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    spec = BookSpec(0, args.seed, args.fence_density, args.emphasis_density, args.vocabulary)
+    sizes = {size_label(parse_size(size)): parse_size(size) for size in args.sizes.split(",")}
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(list(sizes.values()), stages, spec, args.repeat, Path(directory))
+    report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding='utf-8')
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding='utf-8')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    # Timings on a shared machine drift from run to run, so a stage only
+    # counts as a regression if it is measured slow (or large) twice:
+    flagged = [key for key in results if regressions({key: results[key]}, baseline, args.tolerance)]
+    if flagged:
+        print(f"Measuring {', '.join(flagged)} again")
+        with tempfile.TemporaryDirectory() as directory:
+            for key in flagged:
+                label, stage = key.split(":")
+                again = run([sizes[label]], [stage], spec, args.repeat, Path(directory))[key]
+                results[key] = {**again,
+                                "mb_per_s": max(again["mb_per_s"], results[key]["mb_per_s"]),
+                                "peak_rss_mb": min(again["peak_rss_mb"],
+                                                   results[key]["peak_rss_mb"])}
+    problems = regressions(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
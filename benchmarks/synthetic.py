@@ -0,0 +1,83 @@
+"""
+Reproducible synthetic Markua manuscripts for benchmarking.
+"""
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List
+
+from markua_indexing.markdown_doc import stop_words
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zen", "pli", "dra", "sto", "quo"]
+
+
+@dataclass(frozen=True)
+class BookSpec:
+    size: int  # Approximate size in bytes
+    seed: int = 1
+    fence_density: float = 0.1  # Fraction of paragraphs followed by a code listing
+    emphasis_density: float = 0.05  # Fraction of words that start an italic span
+    vocabulary: int = 5000  # Distinct invented (indexable) words
+    stop_word_ratio: float = 0.5  # Fraction of words drawn from the stop-word dictionaries
+
+
+def vocabulary(rng: random.Random, count: int) -> List[str]:
+    words = set()
+    while len(words) < count:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        words.add(word.capitalize() if rng.random() < 0.2 else word)
+    return sorted(words)
+
+
+def paragraphs(spec: BookSpec) -> Iterator[str]:
+    """Paragraphs and code listings, each ending with a blank line, totalling about `spec.size` bytes."""
+    rng = random.Random(spec.seed)
+    invented = vocabulary(rng, spec.vocabulary)
+    common = sorted(word for word in stop_words.words if word.isalpha())
+    written = 0
+    chapter = 0
+    while written < spec.size:
+        if written == 0 or rng.random() < 0.02:
+            chapter += 1
+            block = f"# Chapter {chapter}: {rng.choice(invented)}\n\n"
+        else:
+            words = []
+            italic = 0
+            for _ in range(rng.randint(20, 120)):
+                pool = common if rng.random() < spec.stop_word_ratio else invented
+                word = rng.choice(pool)
+                if not italic and rng.random() < spec.emphasis_density:
+                    italic = rng.randint(1, 3)
+                    word = "*" + word
+                if italic:
+                    italic -= 1
+                    if not italic:
+                        word += "*"
+                words.append(word)
+            if italic:
+                words[-1] += "*"
+            lines = []
+            for start in range(0, len(words), 12):
+                lines.append(" ".join(words[start:start + 12]))
+            block = ".\n".join(lines) + ".\n\n"
+            if rng.random() < spec.fence_density:
+                code = "\n".join(f"val {rng.choice(invented)}_{n} = {n} * factor"
+                                 for n in range(rng.randint(3, 15)))
+                block += f"```scala\n{code}\n```\n\n"
+        written += len(block.encode('utf-8'))
+        yield block
+
+
+def write_book(spec: BookSpec, path: Path) -> Path:
+    with path.open('w', encoding='utf-8') as file:
+        file.writelines(paragraphs(spec))
+    return path
+
+
+def parse_size(text: str) -> int:
+    """'10K', '1.5M', '500M', '2G' or plain bytes."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
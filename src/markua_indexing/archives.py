@@ -0,0 +1,54 @@
+"""
+Read manuscript files straight out of zip and tar bundles (as Leanpub and
+content management systems hand them out), without unpacking them to disk.
+A tar file is read as a stream, so a compressed one is decompressed once,
+front to back; zip members are compressed one by one and read in turn.
+"""
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Sequence, Tuple
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Members read from an archive:
+MANUSCRIPT_SUFFIXES = (".md", ".markua")
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(name: str, suffixes: Sequence[str]) -> bool:
+    member = PurePosixPath(name)
+    # Skip the resource forks macOS adds to the zip files it makes:
+    return (member.suffix in suffixes and not member.name.startswith("._")
+            and "__MACOSX" not in member.parts)
+
+
+def _member_path(path: Path, name: str) -> Path:
+    return path / name.lstrip("/")  # An absolute member name would replace `path`
+
+
+def members(path: Path,
+            suffixes: Sequence[str] = MANUSCRIPT_SUFFIXES) -> Iterator[Tuple[Path, bytes]]:
+    """
+    (path, content) of each manuscript file in the archive at `path`, the
+    path being the archive's followed by the member's, e.g.
+    book.zip/manuscript/ch1.md. Zip members come largest first, so the
+    longest chapter never starts last; tar members in archive order.
+    """
+    # Imported here, so runs without archives don't pay for them at start-up
+    import tarfile
+    import zipfile
+    if path.name.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            infos = [info for info in archive.infolist()
+                     if not info.is_dir() and _wanted(info.filename, suffixes)]
+            for info in sorted(infos, key=lambda info: info.file_size, reverse=True):
+                yield _member_path(path, info.filename), archive.read(info)
+        return
+    # 'r|*' reads the (possibly compressed) stream once, without seeking back:
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and _wanted(member.name, suffixes):
+                file = archive.extractfile(member)
+                if file is not None:
+                    yield _member_path(path, member.name), file.read()
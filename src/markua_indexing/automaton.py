@@ -0,0 +1,79 @@
+"""
+Aho-Corasick automaton over token sequences: finds every occurrence of
+thousands of multi-word terms in one left-to-right pass over the tokens.
+"""
+from collections import deque
+from typing import Dict, Generic, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+V = TypeVar('V')
+
+
+class Automaton(Generic[V]):
+    """
+    Add token sequences with `add()`, then `search()` a token stream. Each
+    match is reported as (start, end, value) with `end` exclusive, in time
+    linear in the number of tokens searched plus the number of matches.
+    """
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (term length, value) pairs of the terms ending at each state:
+        self._terms: List[List[Tuple[int, V]]] = [[]]
+        # ... plus those reachable through failure links, filled in by build():
+        self._output: List[List[Tuple[int, V]]] = [[]]
+        self._built = True
+
+    def add(self, tokens: Sequence[str], value: V) -> None:
+        if not tokens:
+            raise ValueError("cannot add an empty token sequence")
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terms.append([])
+            state = next_state
+        self._terms[state].append((len(tokens), value))
+        self._built = False
+
+    def build(self) -> None:
+        """Computes the failure links; called automatically by `search()`."""
+        self._output = [list(terms) for terms in self._terms]
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child].extend(self._output[self._fail[child]])
+                queue.append(child)
+        self._built = True
+
+    def search(self, tokens: Iterable[str]) -> Iterator[Tuple[int, int, V]]:
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length, value in output[state]:
+                yield index + 1 - length, index + 1, value
+
+    def contains_any(self, tokens: Iterable[str]) -> bool:
+        for _ in self.search(tokens):
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return sum(len(terms) for terms in self._terms)
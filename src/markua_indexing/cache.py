@@ -0,0 +1,87 @@
+"""
+On-disk cache of per-chapter results, so re-indexing after an edit only
+reprocesses the chapters that changed.
+"""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Optional
+
+from markua_indexing.top_dir import TopDir
+
+# Default home of the result cache:
+cache_dir = TopDir("index_cache")
+
+DEFAULT_LIMIT = 64 * 1024 * 1024  # bytes
+# Part of every key. Bump it whenever extraction or ChapterResult changes, so
+# results pickled by older code are never reused for an unchanged chapter:
+CACHE_VERSION = 4
+
+
+class ResultCache:
+    """
+    One pickle file per entry, named by a digest of the chapter's content,
+    the dictionaries fingerprint and CACHE_VERSION. Reading an entry touches
+    its mtime, so `trim()` can evict in least-recently-used order once the
+    total size passes `limit` bytes.
+    """
+
+    def __init__(self, directory: Path = cache_dir.directory, limit: int = DEFAULT_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(content: bytes, fingerprint: str) -> str:
+        digest = hashlib.sha256(f"{CACHE_VERSION}:{fingerprint}".encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f"{key}.pickle"
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entry(key)
+        try:
+            with entry.open('rb') as file:
+                value = pickle.load(file)
+            os.utime(entry)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        entry = self._entry(key)
+        temporary = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            with temporary.open('wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, entry)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+    def trim(self) -> int:
+        """Evict least-recently-used entries until under the limit. Returns the count evicted."""
+        entries = []
+        total = 0
+        for entry in self.directory.glob("*.pickle"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+            total += stat.st_size
+        evicted = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.limit:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        for entry in self.directory.glob("*.pickle"):
+            entry.unlink(missing_ok=True)
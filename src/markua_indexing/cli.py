@@ -0,0 +1,305 @@
+"""
+Command line entry points: index a manuscript into index_words.txt, and
+remove fenced code from markdown files. Editor integrations run these on
+every save, so this module imports nothing of the package up front: each
+module is imported by the branch that needs it, and the option defaults
+below are literals rather than imports (tests check they match).
+"""
+import argparse
+import glob
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Files searched for when a directory is named on the command line:
+MANUSCRIPT_SUFFIXES = (".md", ".markua")
+# Defaults of the options, as in the modules that implement them:
+DEFAULT_OUTPUT = Path("index_words") / "index_words.txt"  # markdown_doc.index_words_file
+DEFAULT_CACHE_LIMIT_MB = 64  # cache.DEFAULT_LIMIT
+DEFAULT_CONCORDANCE_K = 3  # concordance.DEFAULT_K
+DEFAULT_CLUSTER_DISTANCE = 2  # clusters.DEFAULT_DISTANCE
+DEFAULT_COLLOCATIONS_TOP = 100  # collocations.DEFAULT_TOP
+
+
+def expand(arguments: Iterable[str]) -> List[Path]:
+    """Files, wildcard patterns and directories, as a de-duplicated list of files."""
+    paths: List[Path] = []
+    for argument in arguments:
+        for match in glob.glob(argument) or [argument]:
+            path = Path(match)
+            if path.is_dir():
+                paths.extend(sorted(p for p in path.rglob("*")
+                                    if p.suffix in MANUSCRIPT_SUFFIXES))
+            elif path.is_file():
+                paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def chapter_lines(path: Path) -> Iterator[Tuple[str, Iterable[str]]]:
+    """(name, lines) of the file at `path`, or of each manuscript file in it if an archive."""
+    from markua_indexing.archives import is_archive, members
+    if is_archive(path):
+        for member, content in members(path):
+            yield str(member), content.decode('utf-8').splitlines(keepends=True)
+        return
+    with path.open(encoding='utf-8') as file:
+        yield str(path), file
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="""
+    Index a Markua manuscript. Each chapter has its fenced code removed and its
+    italicized phrases and words extracted in a separate worker process; the
+    results are merged, stop words are removed, and everything is written to
+    index_words.txt with the italicized phrases at the top.
+    """
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="Markdown files, file patterns (wildcards supported), directories, or zip "
+             "and tar archives of markdown files; - reads standard input.",
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: one per CPU).",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        default=None,
+        help=f"Where to write the results (default: {DEFAULT_OUTPUT} in the project "
+             f"directory).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Reprocess every file instead of reusing results for unchanged ones.",
+    )
+    parser.add_argument(
+        "--cache-limit",
+        type=int,
+        default=DEFAULT_CACHE_LIMIT_MB,
+        help="Size limit of the result cache (index_cache in the project directory) in MB "
+             "(default: %(default)s).",
+    )
+    parser.add_argument(
+        "--positions",
+        action="store_true",
+        help="Also save where each term occurs, next to the output as a .postings file "
+             "(load it with markua_indexing.postings.Postings.load).",
+    )
+    parser.add_argument(
+        "--concordance",
+        nargs="?",
+        type=int,
+        const=DEFAULT_CONCORDANCE_K,
+        metavar="K",
+        help="Also write up to K snippets of each index word and phrase in use, with "
+             "file:line, to concordance.txt next to the output, terms used in the most "
+             "files first (default K: %(const)s).",
+    )
+    parser.add_argument(
+        "--rank",
+        action="store_true",
+        help="List the terms best first, by TF-IDF across chapters, each followed by "
+             "its score, count, number of chapters and dispersion (needs NumPy).",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="With --rank (implied), keep only the N best phrases and N best words.",
+    )
+    parser.add_argument(
+        "--fold-variants",
+        action="store_true",
+        help="List each term once, in its most common form, instead of every variant "
+             "separately (\"Effect\", \"effects\" and \"Effects.\" are variants).",
+    )
+    parser.add_argument(
+        "--clusters",
+        nargs="?",
+        type=int,
+        const=DEFAULT_CLUSTER_DISTANCE,
+        metavar="K",
+        help="Also write groups of near-duplicate terms (\"composability\" and "
+             "\"composibility\"), within K edits of each other, to clusters.txt next to "
+             "the output, one group per line, most common term first (default K: %(const)s; "
+             "short terms allow fewer edits).",
+    )
+    parser.add_argument(
+        "--collocations",
+        nargs="?",
+        type=int,
+        const=DEFAULT_COLLOCATIONS_TOP,
+        metavar="N",
+        help="Also find the N phrases whose words go together most often in the plain "
+             "text, italicized or not (\"dependency injection\"), and write them with "
+             "their scores and counts to collocations.txt next to the output "
+             "(default N: %(const)s; faster with NumPy).",
+    )
+    parser.add_argument(
+        "--extract",
+        type=lambda names: [name.strip() for name in names.split(",") if name.strip()],
+        default=[],
+        metavar="NAMES",
+        help="Also list the terms found by these extractors, comma-separated, each in "
+             "its own section of the output, from the same pass over each file "
+             "(built in: bold, headings, definitions, code).",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Instead of writing the output file, write each index word and phrase to "
+             "standard output as a JSON Lines record as soon as it is first found.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and rewrite the output whenever a manuscript file "
+             "or dictionary changes.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=Path("profile"),
+        metavar="PREFIX",
+        help="Record time, bytes and peak memory per stage and file, and write them "
+             "to PREFIX.json and PREFIX.trace.json (Chrome trace format; "
+             "default PREFIX: profile, next to the output).",
+    )
+    args = parser.parse_args(argv)
+
+    stdin = "-" in args.files
+    paths = expand(argument for argument in args.files if argument != "-")
+    if not paths and not stdin:
+        parser.error("no markdown files found")
+    if args.extract:
+        from markua_indexing.extractors import EXTRACTORS
+        unknown = [name for name in args.extract if name not in EXTRACTORS]
+        if unknown:
+            parser.error(f"unknown extractors: {', '.join(unknown)} "
+                         f"(known: {', '.join(EXTRACTORS)})")
+    ranked = args.rank or args.top is not None
+    if ranked:
+        from markua_indexing import ranking
+        if ranking.np is None:
+            parser.error("--rank needs NumPy: pip install 'markua-indexing[rank]'")
+    if args.output is None:
+        from markua_indexing.markdown_doc import index_words_file
+        args.output = index_words_file
+    if args.jsonl:
+        if (args.watch or ranked or args.positions or args.concordance or args.clusters
+                or args.collocations or args.extract):
+            parser.error("--jsonl cannot be combined with --watch, --rank, --positions, "
+                         "--concordance, --clusters, --collocations or --extract")
+        from markua_indexing.streaming import records, write_jsonl
+        seen: set = set()
+        for argument in args.files:
+            if argument == "-":
+                write_jsonl(records(sys.stdin, "-", seen), sys.stdout)
+                continue
+            for path in expand([argument]):
+                for name, lines in chapter_lines(path):
+                    write_jsonl(records(lines, name, seen), sys.stdout)
+        return
+    if args.watch:
+        if stdin:
+            parser.error("- (standard input) cannot be combined with --watch")
+        from markua_indexing.archives import is_archive
+        if any(map(is_archive, paths)):
+            parser.error("archives cannot be combined with --watch")
+        if (args.positions or args.concordance or args.clusters or args.collocations
+                or args.extract):
+            parser.error("--positions, --concordance, --clusters, --collocations and "
+                         "--extract cannot be combined with --watch")
+        if ranked:
+            parser.error("--rank cannot be combined with --watch")
+        from markua_indexing.watch import LiveIndex
+        directories = [Path(argument) for argument in args.files if Path(argument).is_dir()]
+        live = LiveIndex(paths, directories, MANUSCRIPT_SUFFIXES, args.output,
+                         workers=args.workers, fold=args.fold_variants)
+        live.write()
+        print(f"Indexed {len(paths)} files into {args.output}; watching for changes "
+              f"(Ctrl-C to stop)", flush=True)
+        try:
+            live.watch()
+        except KeyboardInterrupt:
+            pass
+        return
+    from markua_indexing.manuscript import index_manuscript, index_stream
+    from markua_indexing.profiling import Profiler, no_profiler
+    cache = None
+    if not args.no_cache:
+        from markua_indexing.cache import ResultCache
+        cache = ResultCache(limit=args.cache_limit * 1024 * 1024)
+    profiler = no_profiler if args.profile is None else Profiler()
+    counts = ranked or args.fold_variants or bool(args.clusters)
+    manuscript = index_manuscript(paths, workers=args.workers, cache=cache,
+                                  positions=args.positions, profiler=profiler,
+                                  counts=counts, concordance=args.concordance or 0,
+                                  extractors=args.extract,
+                                  collocations=bool(args.collocations))
+    if stdin:
+        with profiler.stage("stdin"):
+            manuscript.merge(index_stream(sys.stdin, positions=args.positions, counts=counts,
+                                          concordance=args.concordance or 0,
+                                          extractors=args.extract,
+                                          collocations=bool(args.collocations)))
+    if args.fold_variants:
+        with profiler.stage("fold_variants"):
+            manuscript = manuscript.fold_variants()
+    with profiler.stage("write", args.output):
+        manuscript.write(args.output, ranked=ranked, top=args.top)
+    if args.clusters:
+        from markua_indexing import clusters
+        with profiler.stage("clusters"):
+            found = clusters.clusters(manuscript.index_phrases | manuscript.index_words,
+                                      manuscript.totals(), args.clusters)
+        clusters.write(found, args.output.with_name("clusters.txt"))
+    if manuscript.collocations is not None:
+        from markua_indexing.markdown_doc import stop_words
+        collocations = manuscript.collocations
+        with profiler.stage("collocations"):
+            found = collocations.scored(args.collocations, stop_words.excludes)
+        collocations.write(found, args.output.with_name("collocations.txt"))
+    if profiler.enabled:
+        prefix = args.profile
+        if prefix == Path("profile"):
+            prefix = args.output.with_name("profile")
+        for written in profiler.write(prefix):
+            print(f"Profile written to {written}")
+    if manuscript.postings is not None:
+        manuscript.postings.save(args.output.with_suffix(".postings"))
+    if manuscript.concordance is not None:
+        manuscript.concordance.write(args.output.with_name("concordance.txt"))
+    sources = len(paths) + stdin
+    print(f"Indexed {sources} {'file' if sources == 1 else 'files'}; "
+          f"results written to {args.output}")
+
+
+def defence(argv: Optional[Sequence[str]] = None) -> None:
+    """Writes a copy of each markdown file without its fenced code, as <name>_de_fenced.md."""
+    parser = argparse.ArgumentParser(description="Remove fenced code blocks from markdown files.")
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="Markdown files, file patterns (wildcards supported) or directories.",
+    )
+    args = parser.parse_args(argv)
+    from markua_indexing.markdown_doc import strip_code
+    for path in expand(args.files):
+        if path.stem.endswith("_de_fenced"):
+            continue
+        de_fenced = path.with_name(path.stem + "_de_fenced" + path.suffix)
+        de_fenced.write_text(strip_code(path.read_text(encoding='utf-8')), encoding='utf-8')
+        print(f"Processed file saved as: {de_fenced}")
+
+
+if __name__ == "__main__":
+    main()
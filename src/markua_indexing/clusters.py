@@ -0,0 +1,114 @@
+"""
+Group near-duplicate index terms ("Short-circuiting" and "short circuiting",
+"composability" and the typo "composibility") so the author can pick one
+entry for each group. Candidates come from a SymSpell-style deletion index:
+two terms within edit distance k share a string reachable from each by at
+most k deletions, so only terms sharing such a string are ever compared,
+rather than every pair.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+DEFAULT_DISTANCE = 2
+# Characters needed per edit allowed, so "monad" and "nomad" stay apart:
+LENGTH_PER_EDIT = 6
+
+
+def allowed_edits(key: str, max_distance: int = DEFAULT_DISTANCE) -> int:
+    return min(max_distance, len(key) // LENGTH_PER_EDIT)
+
+
+def deletes(key: str, edits: int) -> Set[str]:
+    """`key` and every string made by deleting up to `edits` of its characters."""
+    found = {key}
+    level = {key}
+    for _ in range(edits):
+        level = {item[:i] + item[i + 1:] for item in level for i in range(len(item))}
+        found |= level
+    return found
+
+
+def distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance between `a` and `b`, counting an adjacent transposition
+    as one edit; limit + 1 as soon as it's known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y))
+            if before is not None and j > 1 and x == b[j - 2] and a[i - 2] == y:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class DeletionIndex:
+    """Terms, casefolded, indexed by their deletes for near() lookups."""
+
+    def __init__(self, terms: Iterable[str], max_distance: int = DEFAULT_DISTANCE):
+        self.max_distance = max_distance
+        self.terms: List[str] = list(dict.fromkeys(terms))
+        self._keys = [term.casefold() for term in self.terms]
+        self._deletes: Dict[str, List[int]] = {}
+        for index, key in enumerate(self._keys):
+            for item in deletes(key, allowed_edits(key, max_distance)):
+                self._deletes.setdefault(item, []).append(index)
+
+    def near(self, index: int) -> Iterator[Tuple[int, int]]:
+        """(index, distance) of each other term within the edits both terms allow."""
+        key = self._keys[index]
+        edits = allowed_edits(key, self.max_distance)
+        seen = {index}
+        for item in deletes(key, edits):
+            for other in self._deletes.get(item, ()):
+                if other in seen:
+                    continue
+                seen.add(other)
+                limit = min(edits, allowed_edits(self._keys[other], self.max_distance))
+                found = distance(key, self._keys[other], limit)
+                if found <= limit:
+                    yield other, found
+
+
+def clusters(terms: Iterable[str], counts: Optional[Mapping[str, int]] = None,
+             max_distance: int = DEFAULT_DISTANCE) -> List[List[str]]:
+    """
+    Groups of two or more `terms` linked by near-duplicate pairs, each with
+    its most common term first (then the shortest, then alphabetically),
+    in alphabetical order of those.
+    """
+    counts = counts or {}
+    index = DeletionIndex(terms, max_distance)
+    parent = list(range(len(index.terms)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(index.terms)):
+        for other, _ in index.near(i):
+            parent[root(other)] = root(i)
+    groups: Dict[int, List[str]] = {}
+    for i, term in enumerate(index.terms):
+        groups.setdefault(root(i), []).append(term)
+    found = [sorted(group, key=lambda term: (-counts.get(term, 0), len(term), term.lower(), term))
+             for group in groups.values() if len(group) > 1]
+    return sorted(found, key=lambda group: (group[0].lower(), group[0]))
+
+
+def write(found: Iterable[List[str]], path: Path) -> None:
+    """One group per line, its terms separated by tabs."""
+    with path.open('w', encoding='utf-8') as f:
+        f.write("# Near-duplicate terms, most common first: keep one of each line\n")
+        for group in found:
+            f.write("\t".join(group) + "\n")
@@ -0,0 +1,354 @@
+"""
+Mine multi-word index phrases that the author never italicized ("dependency
+injection") from the plain text of the whole book: bigrams and trigrams
+whose words occur together far more often than chance, by Dunning's
+log-likelihood ratio. Counts go into a count-min sketch keyed by rolling
+hashes of the word sequence, and only the most frequent n-grams are kept as
+strings, so memory is fixed however many tokens the book has.
+"""
+import re
+import zlib
+from array import array
+from math import log
+from operator import add
+from pathlib import Path
+from typing import (Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence,
+                    Tuple)
+
+from markua_indexing.scanner import fenced_lines
+
+np = None  # NumPy, once vectorized counting has imported it
+
+# Words, and any other non-space character, which ends the current n-gram.
+# `*` touching a word and a word's leading and trailing `_` mark emphasis,
+# and are skipped, so "_dependency injection_" counts as "dependency injection";
+# `*` on its own (a list bullet) still ends the n-gram:
+token_pattern = re.compile(r'\w+|(?<!\S)\*+(?!\S)|[^\w\s*]')
+
+WIDTH = 1 << 18  # Counters per sketch row
+DEPTH = 4
+CAPACITY = 50_000  # N-grams kept as strings
+MIN_COUNT = 3
+DEFAULT_TOP = 100
+# Share of the words above which an excluded word counts as a function word:
+COMMON = 1 / 500
+BATCH = 1 << 16  # Words counted at a time
+# N-gram hashes are h(w1) * BASE + h(w2), and so on, modulo 2 ** 64:
+BASE = 1_000_003
+MASK = (1 << 64) - 1
+# Odd multiplier spreading a word's CRC-32 over all 64 bits:
+MIX = 0x9E3779B97F4A7C15
+
+
+class CountMinSketch:
+    """
+    Approximate counts of integer keys (hashes, so their bits are already
+    mixed): never under, and over by at most about 2.7 × total / width with
+    probability 1 - 0.5 ** depth. `width` must be a power of two.
+    If `vectorized`, uses NumPy, when installed, to count a batch of keys
+    at a time.
+    """
+    __slots__ = ('width', 'depth', 'vectorized', '_rows', '_mask')
+
+    def __init__(self, width: int = WIDTH, depth: int = DEPTH, vectorized: bool = True):
+        if width & (width - 1):
+            raise ValueError(f"width must be a power of two, not {width}")
+        self.width = width
+        self.depth = depth
+        self.vectorized = vectorized and _import_numpy()
+        self._mask = width - 1
+        self._rows = [array('I', bytes(4 * width)) for _ in range(depth)]
+
+    def update(self, keys: Sequence[int]) -> Sequence[int]:
+        """Counts one occurrence of each of `keys`; returns their estimates afterwards."""
+        # Row i uses column h1 + i * h2 (Kirsch and Mitzenmacher's double hashing)
+        if self.vectorized and len(keys):
+            return self._update_batch(np.asarray(keys, dtype=np.uint64))
+        mask = self._mask
+        columns = []
+        for key in keys:
+            column, step = key & mask, (key >> 32) | 1
+            for row in self._rows:
+                row[column] += 1
+                columns.append(column)
+                column = (column + step) & mask
+        depth = self.depth
+        return [min(row[column] for row, column in zip(self._rows, columns[i:i + depth]))
+                for i in range(0, len(columns), depth)]
+
+    def _update_batch(self, keys) -> Sequence[int]:
+        mask = np.uint64(self._mask)
+        column, step = keys & mask, (keys >> np.uint64(32)) | np.uint64(1)
+        estimates = None
+        for row in self._rows:
+            counts = np.frombuffer(row, dtype=np.uint32)
+            columns = column.astype(np.intp)
+            counts += np.bincount(columns, minlength=self.width).astype(np.uint32)
+            found = counts[columns]
+            estimates = found if estimates is None else np.minimum(estimates, found)
+            column = (column + step) & mask
+        return estimates.tolist()
+
+    def __getitem__(self, key: int) -> int:
+        mask = self._mask
+        column, step = key & mask, (key >> 32) | 1
+        estimate = 1 << 32
+        for row in self._rows:
+            estimate = min(estimate, row[column])
+            column = (column + step) & mask
+        return estimate
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("sketches of different sizes can't be merged")
+        for i, (ours, theirs) in enumerate(zip(self._rows, other._rows)):
+            if self.vectorized:
+                counts = np.frombuffer(ours, dtype=np.uint32)
+                counts += np.frombuffer(theirs, dtype=np.uint32)
+            else:
+                self._rows[i] = array('I', map(add, ours, theirs))
+
+    def __getstate__(self) -> tuple:
+        # A chapter's counters are mostly zeros: compressed, a sketch sent
+        # back from a worker or cached is a few kB rather than megabytes
+        return (self.width, self.depth, self.vectorized,
+                [zlib.compress(row.tobytes(), 1) for row in self._rows])
+
+    def __setstate__(self, state: tuple) -> None:
+        self.width, self.depth, vectorized, rows = state
+        self.vectorized = vectorized and _import_numpy()
+        self._mask = self.width - 1
+        self._rows = []
+        for compressed in rows:
+            row = array('I')
+            row.frombytes(zlib.decompress(compressed))
+            self._rows.append(row)
+
+
+class Collocation(NamedTuple):
+    phrase: str
+    score: float  # Log-likelihood ratio; the smaller of the two splits for trigrams
+    count: int
+
+
+class Collocations:
+    """
+    Feed it each chapter's lines with add(), or pass them through feed()
+    on their way to another reader; fenced code is skipped and n-grams
+    never span punctuation or a blank line. Words are casefolded.
+    Words are buffered and counted a batch at a time, vectorized with NumPy
+    if it's installed, unless `vectorized` is false. Chapters mined
+    separately (in worker processes) are combined with merge().
+    """
+
+    def __init__(self, width: int = WIDTH, depth: int = DEPTH, capacity: int = CAPACITY,
+                 min_count: int = MIN_COUNT, vectorized: bool = True):
+        self.sketch = CountMinSketch(width, depth, vectorized)
+        self.capacity = capacity
+        self.min_count = min_count
+        self.tokens = 0
+        # Candidate n-grams, each with its hash, once seen min_count times:
+        self._candidates: Dict[Tuple[str, ...], int] = {}
+        self._hashes: Dict[str, int] = {}
+        # The batch not yet counted, with None (and hash 0) where n-grams break:
+        self._words: List[Optional[str]] = []
+        self._word_hashes: List[int] = []
+
+    def _hash(self, word: str) -> int:
+        digest = self._hashes.get(word)
+        if digest is None:
+            digest = (zlib.crc32(word.encode('utf-8')) * MIX + 1) & MASK
+            if len(self._hashes) < self.capacity:
+                self._hashes[word] = digest
+        return digest
+
+    def add(self, lines: Iterable[str]) -> None:
+        for _ in self.feed(lines):
+            pass
+
+    def feed(self, lines: Iterable[str]) -> Iterator[str]:
+        """Passes `lines` through, counting them as add() does once they've all been read."""
+        words, word_hashes = self._words, self._word_hashes
+        known, hash_word = self._hashes, self._hash
+        for line, fenced in fenced_lines(lines):
+            if fenced or not line.strip():
+                self._break()
+                yield line
+                continue
+            for token in token_pattern.findall(line):
+                if not token[0].isalnum() and token[0] != "_":
+                    self._break()
+                    continue
+                word = token.strip("_").casefold()
+                if not word:
+                    continue
+                words.append(word)
+                word_hashes.append(known.get(word) or hash_word(word))
+            yield line
+        self._break()
+        self._count()
+
+    def _break(self) -> None:
+        if self._words and self._words[-1] is not None:
+            self._words.append(None)
+            self._word_hashes.append(0)
+            if len(self._words) >= BATCH:
+                self._count()
+
+    def _count(self) -> None:
+        """Counts the batch of words read so far, and their bigrams and trigrams."""
+        words = self._words
+        if not words:
+            return
+        if self.sketch.vectorized:
+            grams, gram_hashes = _grams_vectorized(words, self._word_hashes)
+        else:
+            grams, gram_hashes = _grams(words, self._word_hashes)
+        self.tokens += len(words) - words.count(None)
+        self.sketch.update([digest for word, digest in zip(words, self._word_hashes)
+                            if word is not None])
+        estimates = self.sketch.update(gram_hashes)
+        for (end, n), digest, estimate in zip(grams, gram_hashes, estimates):
+            if estimate >= self.min_count:
+                gram = tuple(words[end - n + 1:end + 1])
+                if gram not in self._candidates:
+                    self._candidates[gram] = int(digest)
+                    if len(self._candidates) > 2 * self.capacity:
+                        self._prune()
+        # Emptied in place, as add() holds on to them:
+        self._words.clear()
+        self._word_hashes.clear()
+
+    def _prune(self) -> None:
+        """Keeps the `capacity` most frequent candidates."""
+        ranked = sorted(self._candidates.items(), key=lambda item: -self.sketch[item[1]])
+        self._candidates = dict(ranked[:self.capacity])
+
+    def merge(self, other: "Collocations") -> None:
+        """Adds the counts from `other`, e.g. mined in another process."""
+        self.sketch.merge(other.sketch)
+        self.tokens += other.tokens
+        self._candidates.update(other._candidates)
+        if len(self._candidates) > 2 * self.capacity:
+            self._prune()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_hashes'] = {}  # Only a cache, rebuilt as needed
+        return state
+
+    def count(self, words: Sequence[str]) -> int:
+        """Estimated occurrences of the n-gram `words` (one to three casefolded words)."""
+        digest = self._hash(words[0])
+        for word in words[1:]:
+            digest = (digest * BASE + self._hash(word)) & MASK
+        return self.sketch[digest]
+
+    def scored(self, top: Optional[int] = None,
+               excludes: Optional[Callable[[str], bool]] = None) -> List[Collocation]:
+        """
+        Candidates seen at least min_count times, best first. With `excludes`
+        (such as StopWords.excludes), those it excludes are left out, as are
+        those made only of excluded words and those starting or ending with
+        an excluded word as common as a function word ("of the", "the
+        monad"). Phrases with a number are left out too.
+        """
+        found = []
+        for gram in self._candidates:
+            if any(word.isdigit() for word in gram):
+                continue
+            phrase = " ".join(gram)
+            if excludes is not None:
+                if excludes(phrase) or all(map(excludes, gram)):
+                    continue
+                if any(excludes(word) and self.count([word]) > self.tokens * COMMON
+                       for word in (gram[0], gram[-1])):
+                    continue
+            count = self.count(gram)
+            if count < self.min_count:
+                continue
+            # A trigram must be a collocation however it's split:
+            score = min(log_likelihood(count, self.count(gram[:i]), self.count(gram[i:]),
+                                       self.tokens)
+                        for i in range(1, len(gram)))
+            found.append(Collocation(phrase, score, count))
+        found.sort(key=lambda found: (-found.score, found.phrase))
+        return found[:top]
+
+    def write(self, found: Iterable[Collocation], path: Path) -> None:
+        with path.open('w', encoding='utf-8') as f:
+            f.write("# phrase\tscore\tcount\n")
+            for phrase, score, count in found:
+                f.write(f"{phrase}\t{score:.1f}\t{count}\n")
+
+
+def _import_numpy() -> bool:
+    """Whether NumPy is installed. Imported on first use: it takes longer than the CLI to start."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # Optional; counting is slower without it
+            return False
+        np = numpy
+    return True
+
+
+def _grams(words: Sequence[Optional[str]],
+           word_hashes: Sequence[int]) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """(index of last word, n) and hash of each bigram and trigram in `words`."""
+    grams, gram_hashes = [], []
+    for end in range(1, len(words)):
+        if words[end] is None or words[end - 1] is None:
+            continue
+        bigram = (word_hashes[end - 1] * BASE + word_hashes[end]) & MASK
+        grams.append((end, 2))
+        gram_hashes.append(bigram)
+        if end > 1 and words[end - 2] is not None:
+            grams.append((end, 3))
+            gram_hashes.append((((word_hashes[end - 2] * BASE) & MASK) * BASE + bigram) & MASK)
+    return grams, gram_hashes
+
+
+def _grams_vectorized(words: Sequence[Optional[str]], word_hashes: Sequence[int]):
+    """Like _grams(), with NumPy; uint64 arithmetic wraps modulo 2 ** 64 by itself."""
+    hashes = np.array(word_hashes, dtype=np.uint64)
+    present = np.fromiter((word is not None for word in words), dtype=bool, count=len(words))
+    base = np.uint64(BASE)
+    with np.errstate(over='ignore'):
+        bigrams = hashes[:-1] * base + hashes[1:]
+        trigrams = hashes[:-2] * base * base + bigrams[1:]
+    bigram_ends = np.flatnonzero(present[:-1] & present[1:]) + 1
+    trigram_ends = np.flatnonzero(present[:-2] & present[1:-1] & present[2:]) + 2
+    grams = [(end, 2) for end in bigram_ends.tolist()] + \
+        [(end, 3) for end in trigram_ends.tolist()]
+    gram_hashes = np.concatenate((bigrams[bigram_ends - 1], trigrams[trigram_ends - 2]))
+    return grams, gram_hashes
+
+
+def log_likelihood(together: int, first: int, second: int, total: int) -> float:
+    """
+    Dunning's G² for two events seen `first` and `second` times in `total`
+    positions, `together` of them adjacent; 0 when they're less frequent
+    together than chance.
+    """
+    first = max(first, together)
+    second = max(second, together)
+    total = max(total, first + second - together)
+    if together * total <= first * second or second >= total:
+        return 0.0
+    p = second / total
+    p1 = together / first
+    p2 = (second - together) / (total - first) if total > first else 0.0
+    return 2 * (_ll(together, first, p1) + _ll(second - together, total - first, p2)
+                - _ll(together, first, p) - _ll(second - together, total - first, p))
+
+
+def _ll(k: int, n: int, p: float) -> float:
+    """Log-likelihood of k successes in n trials at probability p (0 log 0 = 0)."""
+    result = 0.0
+    if k:
+        result += k * log(p)
+    if n - k:
+        result += (n - k) * log(1 - p)
+    return result
@@ -0,0 +1,152 @@
+"""
+Keyword-in-context (KWIC) concordance: a few snippets of each index term
+in use, with file:line, to help decide whether it deserves an entry.
+Snippets are gathered during the extraction pass, at most `k` per term,
+so memory doesn't grow with the number of occurrences.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Set, Tuple
+
+from markua_indexing.scanner import fenced_lines
+
+DEFAULT_K = 3
+# Characters of context on each side of the term:
+WIDTH = 40
+
+Snippet = Tuple[int, int, str]  # (file id, line, text)
+
+
+class Concordance:
+    """
+    Up to `k` snippets per term, plus how often and in how many files the
+    term occurs. When files are merged, snippets are picked round-robin
+    over the files, so a term used in many chapters shows several of them.
+    `files` maps file ids back to paths, as in Postings.
+    """
+    __slots__ = ('k', 'files', '_snippets', '_counts', '_spread', '_previous', '_current')
+
+    def __init__(self, files: Iterable[Path] = (), k: int = DEFAULT_K) -> None:
+        self.k = k
+        self.files: List[Path] = list(files)
+        self._snippets: Dict[str, List[Snippet]] = {}
+        self._counts: Dict[str, int] = {}
+        self._spread: Dict[str, Set[int]] = {}  # Ids of the files each term occurs in
+        # Lines of the paragraph before the current one, and of the current one:
+        self._previous: Dict[int, str] = {}
+        self._current: Dict[int, str] = {}
+
+    def remember(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Passes `lines` through, keeping the last two paragraphs' lines so
+        add() can cut snippets out of them; italic spans are only reported
+        once their paragraph has ended.
+        """
+        for number, (line, fenced) in enumerate(fenced_lines(lines), 1):
+            if fenced or not line.strip():
+                self._previous, self._current = self._current, {}
+            else:
+                self._current[number] = line
+            yield line
+
+    def add(self, term: str, file_id: int, line: int, column: int) -> None:
+        count = self._counts.get(term, 0)
+        self._counts[term] = count + 1
+        if not count:
+            self._spread[term] = {file_id}
+            self._snippets[term] = []
+        elif file_id not in self._spread[term]:
+            self._spread[term].add(file_id)
+        snippets = self._snippets[term]
+        if len(snippets) < self.k:
+            text = self._current.get(line) or self._previous.get(line)
+            if text is not None:
+                snippets.append((file_id, line, snippet(text, column, len(term))))
+
+    def retain(self, terms: Iterable[str]) -> None:
+        """Drops every term not in `terms`."""
+        keep = set(terms)
+        for table in (self._snippets, self._counts, self._spread):
+            for term in [term for term in table if term not in keep]:
+                del table[term]
+
+    def merge(self, other: "Concordance") -> None:
+        """Adds `other`'s terms, renumbering its files after ours."""
+        offset = len(self.files)
+        self.files.extend(other.files)
+        for term, theirs in other._snippets.items():
+            theirs = [(file_id + offset, line, text) for file_id, line, text in theirs]
+            spread = {file_id + offset for file_id in other._spread[term]}
+            self._add_all(term, theirs, other._counts[term], spread)
+
+    def rename(self, forms: Mapping[str, str]) -> None:
+        """Merges the entries of terms that `forms` maps to the same form."""
+        snippets, counts, spread = self._snippets, self._counts, self._spread
+        self._snippets, self._counts, self._spread = {}, {}, {}
+        for term, found in snippets.items():
+            self._add_all(forms.get(term, term), found, counts[term], spread[term])
+
+    def _add_all(self, term: str, snippets: List[Snippet], count: int,
+                 spread: Set[int]) -> None:
+        ours = self._snippets.get(term)
+        if ours is None:
+            self._snippets[term] = snippets[:self.k]
+            self._counts[term] = count
+            self._spread[term] = set(spread)
+            return
+        self._snippets[term] = round_robin(ours + snippets, self.k)
+        self._counts[term] += count
+        self._spread[term] |= spread
+
+    def snippets(self, term: str) -> List[Tuple[Path, int, str]]:
+        return [(self.files[file_id], line, text)
+                for file_id, line, text in self._snippets.get(term, [])]
+
+    def ranked(self) -> List[str]:
+        """Terms used in the most files first, then the most often, then alphabetically."""
+        return sorted(self._snippets, key=lambda term: (
+            -len(self._spread[term]), -self._counts[term], term.lower(), term))
+
+    def write(self, path: Path) -> None:
+        with path.open('w', encoding='utf-8') as f:
+            for term in self.ranked():
+                spread, count = len(self._spread[term]), self._counts[term]
+                f.write(f"{term} ({spread} {'file' if spread == 1 else 'files'}, "
+                        f"{count} {'use' if count == 1 else 'uses'})\n")
+                for file, line, text in self.snippets(term):
+                    f.write(f"    {file}:{line}: {text}\n")
+                f.write("\n")
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._snippets
+
+    def __len__(self) -> int:
+        return len(self._snippets)
+
+    def __getstate__(self):
+        return self.k, self.files, self._snippets, self._counts, self._spread
+
+    def __setstate__(self, state) -> None:
+        self.k, self.files, self._snippets, self._counts, self._spread = state
+        self._previous, self._current = {}, {}
+
+
+def snippet(line: str, column: int, length: int, width: int = WIDTH) -> str:
+    """The text around line[column:column + length], whitespace collapsed."""
+    start, end = max(0, column - width), column + length + width
+    text = " ".join(line[start:end].split())
+    return ("…" if start > 0 else "") + text + ("…" if end < len(line.rstrip()) else "")
+
+
+def round_robin(snippets: List[Snippet], k: int) -> List[Snippet]:
+    """Up to `k` of `snippets`, taking one from each file in turn, in file order."""
+    by_file: Dict[int, List[Snippet]] = {}
+    for found in snippets:
+        by_file.setdefault(found[0], []).append(found)
+    picked: List[Snippet] = []
+    depth = 0
+    while len(picked) < k and len(picked) < len(snippets):
+        for found in by_file.values():
+            if depth < len(found) and len(picked) < k:
+                picked.append(found[depth])
+        depth += 1
+    return sorted(picked)
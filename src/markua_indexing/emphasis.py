@@ -0,0 +1,234 @@
+"""
+Linear-time emphasis extraction for one paragraph, following the CommonMark
+delimiter-run rules that Markua inherits: left- and right-flanking runs,
+no intraword '_', backslash escapes, code spans, '**' for strong emphasis
+and the "rule of 3". Matching uses the CommonMark delimiter stack with
+per-kind lower bounds, so each delimiter is examined a bounded number of
+times and unbalanced input can't cause repeated long scans.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Longest span content, in characters, reported as a phrase:
+MAX_PHRASE_LENGTH = 100
+ESCAPABLE = set('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+
+
+class Span(NamedTuple):
+    start: int  # Offset of the first content character
+    end: int  # Offset just past the last content character
+    strong: bool  # '**'/'__' rather than '*'/'_'
+
+
+def _is_punctuation(char: str) -> bool:
+    return char in ESCAPABLE or unicodedata.category(char)[0] in 'PS'
+
+
+# Everything the extractor has to look at; the rest of the text is skipped
+# by the regex engine: backslash escapes, backtick runs and delimiter runs.
+# The lookahead lets the engine search for the first character quickly.
+special_pattern = re.compile(
+    r'(?=[\\`*_])(?:\\[' + re.escape(''.join(sorted(ESCAPABLE))) + r']|`+|\*+|_+)')
+
+
+def _code_spans(runs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """(start, end) of each `code span`, given the (start, length) of each backtick run."""
+    # For each run, the index of the next run of the same length:
+    following: Dict[int, int] = {}
+    next_of_length: List[int] = [-1] * len(runs)
+    for index in range(len(runs) - 1, -1, -1):
+        length = runs[index][1]
+        next_of_length[index] = following.get(length, -1)
+        following[length] = index
+    spans = []
+    index = 0
+    while index < len(runs):
+        closer = next_of_length[index]
+        if closer < 0:
+            index += 1
+            continue
+        start, length = runs[index]
+        spans.append((start, runs[closer][0] + length))
+        index = closer + 1
+    return spans
+
+
+def _backtick_runs(matches: List[re.Match]) -> List[Tuple[int, int]]:
+    return [(match.start(), match.end() - match.start())
+            for match in matches if match.group()[0] == '`']
+
+
+def code_spans(text: str, matches: Optional[List[re.Match]] = None) -> List[Tuple[int, str]]:
+    """
+    (offset of the content, content) for each `code span` in the paragraph
+    `text`, line breaks as spaces and, as in CommonMark, one space stripped
+    from each end if there is one at both. `matches` are those of
+    special_pattern in `text`, if already found.
+    """
+    if '`' not in text:
+        return []
+    if matches is None:
+        matches = list(special_pattern.finditer(text))
+    runs = _backtick_runs(matches)
+    lengths = {start: length for start, length in runs}
+    found = []
+    for start, end in _code_spans(runs):
+        # The closing run has the same length as the opening one:
+        length = lengths[start]
+        start += length
+        content = text[start:end - length].replace('\n', ' ')
+        if len(content) > 2 and content[0] == ' ' and content[-1] == ' ' and content.strip():
+            start, content = start + 1, content[1:-1]
+        found.append((start, content))
+    return found
+
+
+def emphasis_spans(text: str, matches: Optional[List[re.Match]] = None) -> List[Span]:
+    """
+    Every emphasis and strong emphasis span in the paragraph `text`.
+    `matches` are those of special_pattern in `text`, if already found.
+    """
+    if '*' not in text and '_' not in text:
+        return []
+    if matches is None:
+        matches = list(special_pattern.finditer(text))
+    code: List[Tuple[int, int]] = []
+    if '`' in text:
+        code = _code_spans(_backtick_runs(matches))
+    code_index = 0
+    n = len(text)
+    # The delimiter stack, as parallel lists plus a doubly linked list:
+    chars: List[str] = []
+    positions: List[int] = []  # Start of the still-unused part of each run
+    counts: List[int] = []  # Unused delimiters left in each run
+    lengths: List[int] = []  # Original run lengths
+    can_open: List[bool] = []
+    can_close: List[bool] = []
+    for match in matches:
+        start, i = match.span()
+        char = text[start]
+        if char != '*' and char != '_':
+            continue
+        while code_index < len(code) and code[code_index][1] <= start:
+            code_index += 1
+        if code_index < len(code) and code[code_index][0] <= start:
+            continue
+        before = text[start - 1] if start > 0 else ' '
+        after = text[i] if i < n else ' '
+        before_space, after_space = before.isspace(), after.isspace()
+        before_punct = _is_punctuation(before)
+        after_punct = _is_punctuation(after)
+        left = not after_space and (not after_punct or before_space or before_punct)
+        right = not before_space and (not before_punct or after_space or after_punct)
+        if char == '*':
+            opens, closes = left, right
+        else:
+            opens = left and (not right or before_punct)
+            closes = right and (not left or after_punct)
+        if opens or closes:
+            chars.append(char)
+            positions.append(start)
+            counts.append(i - start)
+            lengths.append(i - start)
+            can_open.append(opens)
+            can_close.append(closes)
+
+    total = len(chars)
+    previous = list(range(-1, total - 1))
+    following = list(range(1, total + 1))
+    if total:
+        following[-1] = -1
+
+    def remove(node: int) -> None:
+        before, after = previous[node], following[node]
+        if before >= 0:
+            following[before] = after
+        if after >= 0:
+            previous[after] = before
+
+    spans: List[Span] = []
+    # Openers at or below these indexes were already ruled out for closers of a kind:
+    openers_bottom: Dict[Tuple[str, bool, int], int] = {}
+    current = 0 if total else -1
+    while current >= 0:
+        if not can_close[current]:
+            current = following[current]
+            continue
+        key = (chars[current], can_open[current], lengths[current] % 3)
+        bottom = openers_bottom.get(key, -1)
+        opener = previous[current]
+        found = False
+        while opener > bottom:
+            if chars[opener] == chars[current] and can_open[opener]:
+                odd_match = ((can_close[opener] or can_open[current])
+                             and (lengths[opener] + lengths[current]) % 3 == 0
+                             and not (lengths[opener] % 3 == 0 and lengths[current] % 3 == 0))
+                if not odd_match:
+                    found = True
+                    break
+            opener = previous[opener]
+        if not found:
+            openers_bottom[key] = previous[current]
+            after = following[current]
+            if not can_open[current]:
+                remove(current)
+            current = after
+            continue
+        used = 2 if counts[opener] >= 2 and counts[current] >= 2 else 1
+        counts[opener] -= used
+        content_start = positions[opener] + counts[opener] + used
+        spans.append(Span(content_start, positions[current], used == 2))
+        positions[current] += used
+        counts[current] -= used
+        # Delimiters between opener and closer can no longer match:
+        between = following[opener]
+        while between != current:
+            after = following[between]
+            remove(between)
+            between = after
+        if counts[opener] == 0:
+            remove(opener)
+        if counts[current] == 0:
+            after = following[current]
+            remove(current)
+            current = after
+    return spans
+
+
+def phrases(text: str, max_length: int = MAX_PHRASE_LENGTH,
+            matches: Optional[List[re.Match]] = None) -> List[Tuple[int, str, bool]]:
+    """
+    (offset of the opening delimiter, content, strong) for each span of
+    `text` whose content is at most `max_length` characters, in order of
+    the opening delimiter. Delimiters of nested spans are removed from the
+    content and whitespace (including line breaks) collapses to one space.
+    Longer spans are skipped: they are sentences, not index phrases, and
+    the cap keeps the total work linear even for deeply nested input.
+    `matches` are those of special_pattern in `text`, if already found.
+    """
+    spans = emphasis_spans(text, matches)
+    if not spans:
+        return []
+    # Delimiter characters consumed by each span, sorted by offset:
+    delimiters = sorted(cut for span in spans for cut in (
+        (span.start - (2 if span.strong else 1), span.start),
+        (span.end, span.end + (2 if span.strong else 1))))
+    starts = [begin for begin, _ in delimiters]
+    found = []
+    for span in spans:
+        if span.end - span.start > max_length:
+            continue
+        pieces = []
+        position = span.start
+        for begin, finish in delimiters[bisect_left(starts, span.start):
+                                        bisect_left(starts, span.end)]:
+            if begin >= position:
+                pieces.append(text[position:begin])
+                position = finish
+        pieces.append(text[position:span.end])
+        opening = span.start - (2 if span.strong else 1)
+        found.append((opening, " ".join("".join(pieces).split()), span.strong))
+    found.sort()
+    return found
@@ -0,0 +1,88 @@
+"""
+Extractors for terms beyond italicized phrases and words: bold terms,
+headings, definition list terms and inline code identifiers, or your own.
+Each subscribes to Token kinds of the scanner's single pass over a
+document (see markua_indexing.scanner), so adding one adds work per token
+of those kinds rather than another pass over the text.
+
+To add one, subclass Extractor and decorate it with @register; then name
+it in MarkdownDoc(extractors=...) or `index_words --extract`. Chapters are
+indexed in worker processes, so register it in a module those import.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Set, Type
+
+from markua_indexing.scanner import BOLD, CODE, DEFINITION, HEADING, Token
+
+# Inline code worth indexing: a name, possibly dotted or called, e.g. os.path.join()
+identifier_pattern = re.compile(r'[A-Za-z_][\w.]*(?:\(\))?')
+
+
+class Extractor:
+    """
+    Receives every token of its `kinds` through add(); by default it
+    collects their text in `found`. Unless `filtered` is false, the results
+    lose their stop words, as index words and phrases do.
+    """
+    name = ""
+    title = ""  # The heading of its section of index_words.txt
+    kinds: FrozenSet[str] = frozenset()
+    filtered = True
+
+    def __init__(self) -> None:
+        self.found: Set[str] = set()
+
+    def add(self, token: Token) -> None:
+        self.found.add(token.text)
+
+
+EXTRACTORS: Dict[str, Type[Extractor]] = {}
+
+
+def register(extractor: Type[Extractor]) -> Type[Extractor]:
+    """Class decorator making `extractor` available by its name."""
+    EXTRACTORS[extractor.name] = extractor
+    return extractor
+
+
+def create(names: Iterable[str]) -> List[Extractor]:
+    """A fresh instance of each extractor named."""
+    unknown = [name for name in names if name not in EXTRACTORS]
+    if unknown:
+        raise ValueError(f"unknown extractors: {', '.join(unknown)} "
+                         f"(known: {', '.join(sorted(EXTRACTORS))})")
+    return [EXTRACTORS[name]() for name in names]
+
+
+@register
+class BoldTerms(Extractor):
+    name = "bold"
+    title = "Bold Terms"
+    kinds = frozenset({BOLD})
+
+
+@register
+class Headings(Extractor):
+    name = "headings"
+    title = "Headings"
+    kinds = frozenset({HEADING})
+
+
+@register
+class DefinitionTerms(Extractor):
+    name = "definitions"
+    title = "Defined Terms"
+    kinds = frozenset({DEFINITION})
+
+
+@register
+class CodeIdentifiers(Extractor):
+    """Only inline code that is a single identifier, not expressions or commands."""
+    name = "code"
+    title = "Code Identifiers"
+    kinds = frozenset({CODE})
+    filtered = False
+
+    def add(self, token: Token) -> None:
+        if identifier_pattern.fullmatch(token.text):
+            self.found.add(token.text)
@@ -0,0 +1,327 @@
+"""
+Language server (LSP over stdio) giving authors indexing hints as they
+type: "new candidate term" for index words and phrases missing from the
+index list, and "indexed elsewhere but not here" for terms that carry an
+index marker in another chapter but none in this one.
+
+Each open document is kept as a list of paragraphs and fence regions. An
+edit re-splits the lines, which is cheap, and re-extracts only paragraphs
+whose text changed; the rest come from a cache keyed by paragraph text.
+Terms are filtered by the same stop words as index_words and compared by
+their variant key (see markua_indexing.variants), so "Monads" matches an
+entry for "Monad".
+"""
+import json
+import re
+import sys
+from pathlib import Path
+from typing import (Any, BinaryIO, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple)
+from urllib.parse import unquote, urlparse
+
+from markua_indexing.markdown_doc import index_words_file, stop_words
+from markua_indexing.scanner import FENCE, WORD, Fences, scan
+from markua_indexing.variants import canonical
+
+# Markua index markers, e.g. {i: "Monad"}, as inserted by index_tag:
+index_marker_pattern = re.compile(r'\{i:\s*"((?:[^"\\]|\\.)*)"')
+escape_pattern = re.compile(r'\\(.)')
+
+# LSP diagnostic severities:
+INFORMATION = 3
+HINT = 4
+SOURCE = "markua-indexing"
+# Files searched for index markers when the workspace is opened:
+MANUSCRIPT_SUFFIXES = (".md", ".markua")
+
+Message = Dict[str, Any]
+# (term as written, line within the paragraph, column, length):
+Use = Tuple[str, int, int, int]
+
+
+class Paragraph(NamedTuple):
+    uses: Dict[str, Use]  # The first use of each index term, by variant key
+    markers: FrozenSet[str]  # Variant keys of the terms with index markers here
+
+
+def paragraph(lines: List[str]) -> Paragraph:
+    """The index terms and markers in `lines`, one paragraph with no fences."""
+    uses: Dict[str, Use] = {}
+    for token in scan(lines):
+        key = canonical(token.text)
+        if key in uses or stop_words.excludes(token.text):
+            continue
+        # Italic spans start at their opening * or _, and may run on to the next line:
+        length = len(token.text) if token.kind == WORD else \
+            min(len(token.text) + 2, len(lines[token.line - 1].rstrip('\n')) - token.column)
+        uses[key] = (token.text, token.line - 1, token.column, length)
+    return Paragraph(uses, markers_in(lines))
+
+
+def markers_in(lines: Iterable[str]) -> FrozenSet[str]:
+    """Variant keys of the terms given index markers in `lines`."""
+    return frozenset(canonical(escape_pattern.sub(r'\1', match.group(1)))
+                     for line in lines for match in index_marker_pattern.finditer(line))
+
+
+def blocks(lines: List[str]) -> Iterator[Tuple[int, List[str], bool]]:
+    """(first line, lines, fenced) for each paragraph and fence region of `lines`."""
+    start = 0
+    fences = Fences()
+    for number, line in enumerate(lines):
+        fenced = bool(fences.opened)
+        if line.startswith(FENCE) and fences.toggles(line):
+            if fenced:  # The closing fence
+                yield start, lines[start:number + 1], True
+                start = number + 1
+                continue
+        elif fenced or line.strip():
+            continue
+        if start < number:
+            yield start, lines[start:number], False
+        # An opening fence starts its region; a blank line belongs to neither:
+        start = number if fences.opened else number + 1
+    if start < len(lines):
+        yield start, lines[start:], bool(fences.opened)
+
+
+class Document:
+    """
+    An open document's lines, split into blocks, each with its Paragraph.
+    change() applies LSP content changes (whole-text or ranged).
+    """
+
+    def __init__(self, uri: str, text: str, version: int = 0):
+        self.uri = uri
+        self.version = version
+        self.lines: List[str] = text.splitlines(keepends=True)
+        self.paragraphs: List[Tuple[int, Paragraph]] = []  # (first line, Paragraph)
+        self._cache: Dict[str, Paragraph] = {}
+        self.reindexed = 0  # Paragraphs extracted by the last update
+        self.reindex()
+
+    def change(self, changes: Iterable[Message], version: int = 0) -> None:
+        for change in changes:
+            if "range" not in change:
+                self.lines = change["text"].splitlines(keepends=True)
+                continue
+            start, end = change["range"]["start"], change["range"]["end"]
+            first, last = start["line"], end["line"]
+            before = self._line(first)[:utf16_index(self._line(first), start["character"])]
+            after = self._line(last)[utf16_index(self._line(last), end["character"]):]
+            self.lines[first:last + 1] = (before + change["text"] + after).splitlines(keepends=True)
+        self.version = version
+        self.reindex()
+
+    def _line(self, number: int) -> str:
+        return self.lines[number] if number < len(self.lines) else ""
+
+    def reindex(self, everything: bool = False) -> None:
+        """Re-splits the lines; extracts paragraphs not seen before, or all of them."""
+        if everything:
+            self._cache = {}
+        cache: Dict[str, Paragraph] = {}
+        self.paragraphs = []
+        self.reindexed = 0
+        for start, lines, fenced in blocks(self.lines):
+            if fenced:
+                continue
+            text = "".join(lines)
+            found = cache.get(text) or self._cache.get(text)
+            if found is None:
+                found = paragraph(lines)
+                self.reindexed += 1
+            cache[text] = found
+            self.paragraphs.append((start, found))
+        self._cache = cache
+
+    @property
+    def markers(self) -> FrozenSet[str]:
+        return frozenset().union(*(found.markers for _, found in self.paragraphs))
+
+    def first_uses(self) -> Dict[str, Use]:
+        """The first use of each index term in the document, with its line in the document."""
+        uses: Dict[str, Use] = {}
+        for start, found in self.paragraphs:
+            for key, (term, line, column, length) in found.uses.items():
+                if key not in uses:
+                    uses[key] = (term, start + line, column, length)
+        return uses
+
+
+class LanguageServer:
+    """
+    Handles one JSON-RPC message at a time; handle() returns the messages
+    to send back. `terms` is the index list ("new candidate" means missing
+    from it); markers in other open documents and in the workspace's
+    manuscript files count as "indexed elsewhere".
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: FrozenSet[str] = frozenset(map(canonical, terms))
+        self.documents: Dict[str, Document] = {}
+        self.markers: Dict[str, FrozenSet[str]] = {}  # By URI, for every file seen
+        self._built: Dict[str, Dict[Tuple[Use, int, str], Message]] = {}
+        self.running = True
+
+    def handle(self, message: Message) -> List[Message]:
+        method = message.get("method")
+        params = message.get("params") or {}
+        if method == "initialize":
+            self._initialize(params)
+            return [response(message, {"capabilities": {
+                "textDocumentSync": {"openClose": True, "change": 2}}})]
+        if method == "shutdown":
+            return [response(message, None)]
+        if method == "exit":
+            self.running = False
+            return []
+        if method in ("textDocument/didOpen", "textDocument/didChange"):
+            # An edited dictionary changes every paragraph's terms:
+            reloaded = stop_words.refresh()
+            if reloaded:
+                for document in self.documents.values():
+                    document.reindex(everything=True)
+            item = params["textDocument"]
+            if method == "textDocument/didOpen":
+                self.documents[item["uri"]] = Document(item["uri"], item["text"],
+                                                       item.get("version", 0))
+            else:
+                self.documents[item["uri"]].change(params["contentChanges"],
+                                                   item.get("version", 0))
+            return self._updated(item["uri"], everything=reloaded)
+        if method == "textDocument/didClose":
+            self.documents.pop(params["textDocument"]["uri"], None)
+            self._built.pop(params["textDocument"]["uri"], None)
+            return [notification("textDocument/publishDiagnostics",
+                                 {"uri": params["textDocument"]["uri"], "diagnostics": []})]
+        if "id" in message:
+            return [{"jsonrpc": "2.0", "id": message["id"],
+                     "error": {"code": -32601, "message": f"method not found: {method}"}}]
+        return []  # Other notifications are ignored
+
+    def _initialize(self, params: Message) -> None:
+        options = params.get("initializationOptions") or {}
+        terms_path = Path(options.get("terms", index_words_file))
+        if not self.terms and terms_path.is_file():
+            from markua_indexing.tagger import load_terms
+            self.terms = frozenset(map(canonical, load_terms(terms_path)))
+        root = params.get("rootUri")
+        if root:
+            for path in Path(path_of(root)).rglob("*"):
+                if path.suffix in MANUSCRIPT_SUFFIXES and path.is_file():
+                    with path.open(encoding='utf-8', errors='replace') as file:
+                        self.markers[path.as_uri()] = markers_in(file)
+
+    def _updated(self, uri: str, everything: bool = False) -> List[Message]:
+        """
+        Diagnostics for `uri`, and for every other open document if its
+        markers changed (or if `everything` did).
+        """
+        markers = self.documents[uri].markers
+        everything = everything or self.markers.get(uri, frozenset()) != markers
+        self.markers[uri] = markers
+        uris = list(self.documents) if everything else [uri]
+        return [notification("textDocument/publishDiagnostics", {
+            "uri": other, "version": self.documents[other].version,
+            "diagnostics": self.diagnostics(self.documents[other])}) for other in uris]
+
+    def diagnostics(self, document: Document) -> List[Message]:
+        here = self.markers.get(document.uri, frozenset())
+        elsewhere = frozenset().union(*(markers for uri, markers in self.markers.items()
+                                        if uri != document.uri))
+        # Diagnostics built for the last update, reused where nothing moved:
+        built = self._built.get(document.uri, {})
+        self._built[document.uri] = now = {}
+        found = []
+        for key, use in document.first_uses().items():
+            if key in here:
+                continue
+            if key in elsewhere:
+                severity = INFORMATION
+            elif key not in self.terms:
+                severity = HINT
+            else:
+                continue
+            term, line, column, length = use
+            source = document.lines[line]
+            diagnostic = built.get((use, severity, source))
+            if diagnostic is None:
+                text = f'"{term}" is indexed elsewhere but not here' if severity == INFORMATION \
+                    else f'New candidate term "{term}"'
+                diagnostic = {"range": {"start": position(source, line, column),
+                                        "end": position(source, line, column + length)},
+                              "severity": severity, "source": SOURCE, "message": text}
+            now[use, severity, source] = diagnostic
+            found.append(diagnostic)
+        return found
+
+
+def utf16_index(line: str, character: int) -> int:
+    """The index in `line` of an LSP character offset, which counts UTF-16 code units."""
+    if line.isascii():
+        return character
+    units = 0
+    for index, char in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+def position(line: str, number: int, index: int) -> Message:
+    """The LSP position of line[index], `line` being line `number`."""
+    if not line.isascii():
+        index += sum(1 for char in line[:index] if ord(char) > 0xFFFF)
+    return {"line": number, "character": index}
+
+
+def path_of(uri: str) -> str:
+    return unquote(urlparse(uri).path)
+
+
+def response(request: Message, result: Any) -> Message:
+    return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+def notification(method: str, params: Any) -> Message:
+    return {"jsonrpc": "2.0", "method": method, "params": params}
+
+
+def read_message(stream: BinaryIO) -> Optional[Message]:
+    """The next message from `stream`, or None at its end."""
+    length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            break
+        name, _, value = header.decode('ascii').partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    if length is None:
+        return None
+    return json.loads(stream.read(length).decode('utf-8'))
+
+
+def write_message(stream: BinaryIO, message: Message) -> None:
+    body = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+    stream.flush()
+
+
+def main() -> None:
+    """Serves one client over stdin and stdout until it exits."""
+    server = LanguageServer()
+    while server.running:
+        message = read_message(sys.stdin.buffer)
+        if message is None:
+            break
+        for reply in server.handle(message):
+            write_message(sys.stdout.buffer, reply)
+
+
+if __name__ == "__main__":
+    main()
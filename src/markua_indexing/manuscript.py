@@ -0,0 +1,346 @@
+"""
+Index a whole manuscript by fanning its chapters out to a process pool.
+Each worker builds one MarkdownDoc and sends back only that chapter's sets;
+the parent merges them with set unions. With a ResultCache, only chapters
+whose content (or the dictionaries) changed since the last run are reprocessed.
+Zip and tar archives are read in this process, once, and their chapters'
+text sent to the workers as it is read.
+"""
+import io
+import os
+from dataclasses import dataclass, field, replace
+from itertools import chain
+from pathlib import Path
+from typing import (Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence,
+                    Set, TextIO, Tuple, Union)
+
+from markua_indexing.archives import is_archive, members
+from markua_indexing.cache import ResultCache
+from markua_indexing.collocations import Collocations
+from markua_indexing.concordance import Concordance
+from markua_indexing.extractors import EXTRACTORS
+from markua_indexing.mapped import MAPPED_THRESHOLD
+from markua_indexing.markdown_doc import MarkdownDoc, stop_words
+from markua_indexing.postings import Postings
+from markua_indexing.profiling import Profiler, StageRecord, no_profiler
+from markua_indexing.variants import surface_forms
+
+
+@dataclass
+class ChapterResult:
+    path: Path
+    italicized_phrases: FrozenSet[str]
+    unique_words: FrozenSet[str]
+    index_phrases: FrozenSet[str]
+    index_words: FrozenSet[str]
+    postings: Optional[Postings] = None
+    # Occurrences of each index word and phrase, when ranking or folding variants:
+    counts: Optional[Dict[str, int]] = None
+    concordance: Optional[Concordance] = None
+    # Terms found by each extractor, when extractors are named:
+    extracted: Optional[Dict[str, FrozenSet[str]]] = None
+    # The chapter's n-gram counts, when mining collocations:
+    collocations: Optional[Collocations] = None
+    # Stage records from the worker, when profiling:
+    profile: Optional[List[StageRecord]] = None
+
+
+# A chapter to index: (index_chapter or index_text, its first arguments, cache key)
+Job = Tuple[Callable[..., ChapterResult], tuple, str]
+
+
+def index_chapter(path: Path, positions: bool = False, profile: bool = False,
+                  counts: bool = False, concordance: int = 0,
+                  extractors: Sequence[str] = (), collocations: bool = False) -> ChapterResult:
+    """Runs in a worker process; the document text never leaves it."""
+    profiler = Profiler() if profile else no_profiler
+    doc = MarkdownDoc(doc_path=path, keep_text=False, positions=positions,
+                      profiler=profiler, mapped=path.stat().st_size >= MAPPED_THRESHOLD,
+                      counts=counts, concordance=concordance, extractors=extractors,
+                      collocations=collocations)
+    return _chapter_result(doc.extract(), profiler if profile else None)
+
+
+def index_stream(stream: Iterable[str], name: str = "-", positions: bool = False,
+                 counts: bool = False, concordance: int = 0,
+                 extractors: Sequence[str] = (), collocations: bool = False) -> ChapterResult:
+    """Like index_chapter(), for text read from `stream` (e.g. stdin) in this process."""
+    doc = MarkdownDoc.from_stream(stream, name, positions=positions, counts=counts,
+                                  concordance=concordance, extractors=extractors,
+                                  collocations=collocations)
+    return _chapter_result(doc.extract(), None)
+
+
+def index_text(path: Path, content: bytes, positions: bool = False, profile: bool = False,
+               counts: bool = False, concordance: int = 0,
+               extractors: Sequence[str] = (), collocations: bool = False) -> ChapterResult:
+    """Like index_chapter(), for the `content` of a chapter read from an archive."""
+    profiler = Profiler() if profile else no_profiler
+    doc = MarkdownDoc.from_stream(io.StringIO(content.decode('utf-8')), str(path),
+                                  positions=positions, profiler=profiler, counts=counts,
+                                  concordance=concordance, extractors=extractors,
+                                  collocations=collocations)
+    return _chapter_result(doc.extract(), profiler if profile else None)
+
+
+def _chapter_result(doc: MarkdownDoc, profiler: Optional[Profiler]) -> ChapterResult:
+    return ChapterResult(
+        path=doc.doc_path,
+        italicized_phrases=doc.italicized_phrases,
+        unique_words=doc.unique_words,
+        index_phrases=doc.index_phrases,
+        index_words=doc.index_words,
+        postings=doc.postings,
+        counts=doc.term_counts,
+        concordance=doc.concordance,
+        extracted=doc.extracted if doc.extractors else None,
+        collocations=doc.collocations,
+        profile=profiler.records if profiler is not None else None,
+    )
+
+
+@dataclass
+class ManuscriptIndex:
+    italicized_phrases: Set[str] = field(default_factory=set)
+    unique_words: Set[str] = field(default_factory=set)
+    index_phrases: Set[str] = field(default_factory=set)
+    index_words: Set[str] = field(default_factory=set)
+    postings: Optional[Postings] = None
+    # Each chapter's term counts, when ranking or folding variants:
+    counts: List[Dict[str, int]] = field(default_factory=list)
+    concordance: Optional[Concordance] = None
+    # Terms found by each extractor, by name:
+    extracted: Dict[str, Set[str]] = field(default_factory=dict)
+    # The chapters' n-gram counts merged, when mining collocations:
+    collocations: Optional[Collocations] = None
+
+    def merge(self, chapter: ChapterResult) -> None:
+        self.italicized_phrases |= chapter.italicized_phrases
+        self.unique_words |= chapter.unique_words
+        self.index_phrases |= chapter.index_phrases
+        self.index_words |= chapter.index_words
+        if chapter.postings is not None:
+            if self.postings is None:
+                self.postings = Postings()
+            self.postings.merge(chapter.postings)
+        if chapter.counts is not None:
+            self.counts.append(chapter.counts)
+        if chapter.concordance is not None:
+            if self.concordance is None:
+                self.concordance = Concordance(k=chapter.concordance.k)
+            self.concordance.merge(chapter.concordance)
+        if chapter.extracted is not None:
+            for name, terms in chapter.extracted.items():
+                self.extracted.setdefault(name, set()).update(terms)
+        if chapter.collocations is not None:
+            if self.collocations is None:
+                self.collocations = Collocations()
+            self.collocations.merge(chapter.collocations)
+
+    def totals(self) -> Dict[str, int]:
+        """Each term's count summed over the chapters."""
+        totals: Dict[str, int] = {}
+        for counts in self.counts:
+            for term, count in counts.items():
+                totals[term] = totals.get(term, 0) + count
+        return totals
+
+    def fold_variants(self) -> "ManuscriptIndex":
+        """
+        A copy whose index words and phrases list each term once, in the most
+        common of its variant forms (see markua_indexing.variants), with the
+        variants' counts, postings and snippets merged.
+        """
+        totals = self.totals()
+        words = surface_forms(self.index_words, totals)
+        phrases = surface_forms(self.index_phrases, totals)
+        forms = {**words, **phrases}
+        folded = []
+        for counts in self.counts:
+            chapter: Dict[str, int] = {}
+            for term, count in counts.items():
+                form = forms.get(term, term)
+                chapter[form] = chapter.get(form, 0) + count
+            folded.append(chapter)
+        postings = None
+        if self.postings is not None:
+            postings = Postings()
+            postings.merge(self.postings)
+            postings.rename(forms)
+        concordance = None
+        if self.concordance is not None:
+            concordance = Concordance(k=self.concordance.k)
+            concordance.merge(self.concordance)
+            concordance.rename(forms)
+        return replace(self, index_words=set(words.values()),
+                       index_phrases=set(phrases.values()), counts=folded,
+                       postings=postings, concordance=concordance)
+
+    def write(self, output: Path, ranked: bool = False, top: Optional[int] = None) -> None:
+        """
+        Index phrases at the top, then index words, as index_words.txt expects.
+        With `ranked` (which needs the chapters' counts), each section lists
+        its best `top` terms by score (see markua_indexing.ranking), one per
+        line with their scores after a tab.
+        """
+        # Written to a temporary file and renamed, so readers (an editor
+        # with index_words.txt open, or --watch) never see a partial file.
+        output.parent.mkdir(parents=True, exist_ok=True)
+        temporary = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        with temporary.open('w', encoding='utf-8') as f:
+            if ranked:
+                f.write("# term\tscore\tcount\tchapters\tdispersion\n")
+            if self.index_phrases:
+                f.write("Italicized Phrases:\n")
+                self._write_terms(f, self.index_phrases, ranked, top)
+                f.write("\n\n")
+            f.write("Index Words:\n")
+            self._write_terms(f, self.index_words, ranked, top)
+            for name, terms in self.extracted.items():
+                f.write(f"\n\n{EXTRACTORS[name].title}:\n")
+                f.write("\n".join(sorted_terms(terms)))
+        os.replace(temporary, output)
+
+    def _write_terms(self, f: TextIO, terms: Set[str], ranked: bool,
+                     top: Optional[int]) -> None:
+        if not ranked:
+            f.write("\n".join(sorted_terms(terms)))
+            return
+        from markua_indexing.ranking import rank  # Imports NumPy, so only when ranking
+        f.write("\n".join(f"{term}\t{score:.4f}\t{count}\t{chapters}\t{dispersion:.3f}"
+                          for term, score, count, chapters, dispersion
+                          in rank(self.counts, terms, top)))
+
+
+def sorted_terms(terms: Iterable[str]) -> List[str]:
+    return sorted(terms, key=lambda term: (term.lower(), term))
+
+
+def index_manuscript(paths: Iterable[Path], workers: Optional[int] = None,
+                     cache: Optional[ResultCache] = None,
+                     positions: bool = False, profiler=no_profiler,
+                     counts: bool = False, concordance: int = 0,
+                     extractors: Sequence[str] = (),
+                     collocations: bool = False) -> ManuscriptIndex:
+    """
+    Index every chapter in `paths`. `workers` is the process count
+    (None means one per CPU); with a single worker, or a single chapter
+    to process, everything runs in this process. With `positions`, the
+    result's `postings` locate every index word and phrase; with `counts`,
+    the result's `counts` hold each chapter's term counts, for ranking; with
+    `concordance=k`, the result's `concordance` holds up to k snippets of
+    each index word and phrase; with `collocations`, the result's
+    `collocations` hold the whole text's n-gram counts. An enabled
+    `profiler` receives the stages of every chapter, including those
+    run in worker processes.
+    """
+    manuscript = ManuscriptIndex()
+    with profiler.stage("index_manuscript"):
+        for chapter in index_chapters(paths, workers, cache, positions, profiler, counts,
+                                      concordance, extractors, collocations):
+            with profiler.stage("merge", chapter.path):
+                manuscript.merge(chapter)
+    return manuscript
+
+
+def index_chapters(paths: Iterable[Path], workers: Optional[int] = None,
+                   cache: Optional[ResultCache] = None,
+                   positions: bool = False, profiler=no_profiler,
+                   counts: bool = False, concordance: int = 0,
+                   extractors: Sequence[str] = (),
+                   collocations: bool = False) -> Iterator[ChapterResult]:
+    """
+    The result for each chapter in `paths`, in completion order. Each zip
+    or tar archive in `paths` stands for the manuscript files inside it.
+    """
+    profile = profiler.enabled
+    options = (positions, profile, counts, concordance, extractors, collocations)
+    fingerprint = ""
+    if cache is not None:
+        fingerprint = (stop_words.fingerprint + (":positions" if positions else "")
+                       + (":counts" if counts else "")
+                       + (f":concordance{concordance}" if concordance else "")
+                       + (f":extract={','.join(extractors)}" if extractors else "")
+                       + (":collocations" if collocations else ""))
+
+    def cached(path: Path, content: bytes) -> Tuple[Optional[ChapterResult], str]:
+        """The cached result for `content`, if there is one, and its key."""
+        with profiler.stage("cache", path):
+            key = cache.key(content, fingerprint)
+            found = cache.get(key)
+        if found is not None:
+            if found.postings is not None:
+                found.postings.files = [path]
+            if found.concordance is not None:
+                found.concordance.files = [path]
+            found = replace(found, path=path)
+        return found, key
+
+    def finish(key: str, chapter: ChapterResult) -> ChapterResult:
+        if chapter.profile is not None:
+            profiler.extend(chapter.profile)
+            chapter = replace(chapter, profile=None)
+        if cache is not None:
+            cache.put(key, chapter)
+        return chapter
+
+    def jobs(chapters: Iterable[Tuple[Path, Optional[bytes]]]
+             ) -> Iterator[Union[ChapterResult, Job]]:
+        """
+        The cached result, or else the job, for each (path, content) of
+        `chapters`; the content is None for files, which workers read.
+        """
+        for path, content in chapters:
+            key = ""
+            if cache is not None:
+                found, key = cached(path, path.read_bytes() if content is None else content)
+                if found is not None:
+                    yield found
+                    continue
+            yield ((index_chapter, (path,), key) if content is None
+                   else (index_text, (path, content), key))
+
+    paths = list(paths)
+    archives = [path for path in paths if is_archive(path)]
+    # Largest chapters first, so the longest job never starts last:
+    files = sorted((path for path in paths if not is_archive(path)),
+                   key=lambda path: path.stat().st_size, reverse=True)
+    pending: List[Job] = []
+    for job in jobs((path, None) for path in files):
+        if isinstance(job, ChapterResult):
+            yield job
+        else:
+            pending.append(job)
+    # Read as the workers need them, each archive once, front to back:
+    archived = jobs((path, content) for archive in archives for path, content in members(archive))
+
+    if workers == 1 or (len(pending) <= 1 and not archives):
+        for job in chain(pending, archived):
+            if isinstance(job, ChapterResult):
+                yield job
+            else:
+                function, arguments, key = job
+                yield finish(key, function(*arguments, *options))
+    else:
+        # Imported here: it costs more than the rest of a one-chapter run
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(function, *arguments, *options): key
+                       for function, arguments, key in pending}
+            # Archived chapters wait in memory until a worker takes them, so only a
+            # few per worker are read ahead:
+            limit = len(futures) + 4 * (workers or os.cpu_count() or 1)
+            for job in archived:
+                if isinstance(job, ChapterResult):
+                    yield job
+                    continue
+                function, arguments, key = job
+                futures[pool.submit(function, *arguments, *options)] = key
+                if len(futures) >= limit:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield finish(futures.pop(future), future.result())
+            for future in as_completed(futures):
+                yield finish(futures[future], future.result())
+    if cache is not None and (pending or archives):
+        cache.trim()
@@ -0,0 +1,91 @@
+"""
+Bytes-level extraction over a memory-mapped file, for manuscripts of
+hundreds of MB. Fences, paragraphs and words are found directly in the
+mapped buffer; only distinct word tokens, and paragraphs that contain an
+emphasis delimiter, are decoded, so peak memory stays far below the file size.
+"""
+import mmap
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, Optional, Set, Tuple
+
+from markua_indexing.emphasis import phrases
+from markua_indexing.scanner import Fences, word_pattern
+
+# Files at least this large are memory-mapped by the manuscript indexer:
+MAPPED_THRESHOLD = 32 * 1024 * 1024  # bytes
+
+# Lines that may be fences; scanner.Fences decides which are:
+fence_pattern = re.compile(rb'^```[^\n]*$', re.MULTILINE)
+blank_line_pattern = re.compile(rb'\n[ \t\r\f\v]*\n')
+# Bytes 0x80-0xff belong to UTF-8 encoded non-ASCII characters; treat them
+# as word characters here and split exactly with `word_pattern` after decoding.
+word_bytes_pattern = re.compile(rb'[A-Za-z0-9_\x80-\xff]+')
+
+
+def prose_ranges(buffer) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each region of `buffer` outside fenced code."""
+    start = 0
+    fences = Fences()
+    for fence in fence_pattern.finditer(buffer):
+        opened = fences.opened
+        if not fences.toggles(fence.group().decode('utf-8', errors='replace')):
+            continue
+        if not opened:
+            yield start, fence.start()
+        start = fence.end()
+    if not fences.opened:
+        yield start, len(buffer)
+
+
+def paragraph_ranges(buffer, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    for blank in blank_line_pattern.finditer(buffer, start, end):
+        yield start, blank.start()
+        start = blank.end()
+    yield start, end
+
+
+def extract_mapped(path: Path, words: bool = True, italics: bool = True,
+                   counts: Optional[Dict[str, int]] = None
+                   ) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    The same results as markdown_doc.extract() on the file's lines,
+    including the `counts` of every token if given.
+    Returns:
+    - (italicized phrases, unique words)
+    """
+    raw_words: Counter = Counter()
+    italic: Set[str] = set()
+    with path.open('rb') as file:
+        if path.stat().st_size == 0:
+            return frozenset(), frozenset()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for start, end in prose_ranges(buffer):
+                if words:
+                    raw_words.update(map(re.Match.group,
+                                         word_bytes_pattern.finditer(buffer, start, end)))
+                if italics:
+                    for paragraph, finish in paragraph_ranges(buffer, start, end):
+                        if buffer.find(b'*', paragraph, finish) < 0 and \
+                                buffer.find(b'_', paragraph, finish) < 0:
+                            continue
+                        text = buffer[paragraph:finish].decode('utf-8')
+                        for _, phrase, strong in phrases(text):
+                            if not strong and phrase:
+                                italic.add(phrase)
+                                # As in extract(), a single word counts once, as a word
+                                if counts is not None and word_pattern.fullmatch(phrase) is None:
+                                    counts[phrase] = counts.get(phrase, 0) + 1
+    unique: Set[str] = set()
+    for raw, occurrences in raw_words.items():
+        if raw.isascii():
+            found = [raw.decode('ascii')]
+        else:
+            found = word_pattern.findall(raw.decode('utf-8'))
+        for word in found:
+            if not word.isdigit():
+                unique.add(word)
+                if counts is not None:
+                    counts[word] = counts.get(word, 0) + occurrences
+    return frozenset(italic), frozenset(unique)
@@ -1,79 +1,367 @@
-import re
-from dataclasses import dataclass, field
+import sys
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Set
+from typing import (TYPE_CHECKING, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence,
+                    Set, Tuple)
 
+from markua_indexing.mapped import extract_mapped
+from markua_indexing.profiling import TimedLines, no_profiler
+from markua_indexing.scanner import ITALIC, WORD, fenced_lines, scan, word_pattern
+from markua_indexing.stop_words import StopWords
 from markua_indexing.top_dir import TopDir
 
+if TYPE_CHECKING:
+    # Imported by extract() when asked for, so plain runs don't load them
+    from markua_indexing.collocations import Collocations
+    from markua_indexing.concordance import Concordance
+    from markua_indexing.extractors import Extractor
+    from markua_indexing.postings import Postings
+
 # Directory containing .txt files of words and phrases to exclude:
 dictionaries = TopDir("dictionaries")
+# Loaded once per process and shared by every MarkdownDoc:
+stop_words = StopWords.shared(dictionaries.directory)
 # Resulting words & phrases to index:
 index_words_file = TopDir("index_words") / "index_words.txt"
 
 
-@dataclass
 class MarkdownDoc:
-    doc_path: Path
-    original: str = field(init=False)
-    codeless: str = field(init=False)
-    italicized_phrases: Set[str] = field(init=False)
-    unique_words: Set[str] = field(init=False)
-    index_phrases: Set[str] = field(init=False)
-    index_words: Set[str] = field(init=False)
-
-    def __post_init__(self) -> None:
-        self.original = self.doc_path.read_text(encoding='utf-8')
-        self.codeless = strip_code(self.original)
-        self.italicized_phrases = italicized_phrases(self.codeless)
-        self.unique_words = unique_words(self.codeless)
-        self.index_phrases = remove_stop_words(self.italicized_phrases)
-        self.index_words = remove_stop_words(self.unique_words)
+    """
+    Each result is computed the first time it is asked for, so a caller that
+    only wants `index_phrases` never tokenizes words. Results are frozensets
+    of interned strings, shared between documents. With `keep_text=False`
+    the raw `original` and `codeless` text is re-read on demand instead of
+    being held for the life of the object. With `positions=True` the same
+    pass also records where each index word and phrase occurs, in `postings`,
+    and with `counts=True` how often, in `term_counts`. With `concordance=k`
+    it also keeps up to k snippets of each in use, in `concordance`, and
+    with `collocations=True` it mines the plain text for collocations, in
+    `collocations` (see markua_indexing.collocations).
+    Name `extractors` (see markua_indexing.extractors) to collect further
+    kinds of terms, such as bold terms or headings, in `extracted`.
+    Pass a `profiler` (see markua_indexing.profiling) to record the time,
+    bytes and peak memory of each stage. With `mapped=True` extraction runs
+    over a memory map of the file's bytes (see markua_indexing.mapped);
+    positions and snippets always come from the line scanner.
+    `from_stream()` builds one over any text stream (such as stdin) instead
+    of a file.
+    """
+    __slots__ = ('doc_path', 'keep_text', 'positions', 'profiler', 'mapped', 'counts',
+                 'concordance_k', 'extractors', 'mine_collocations', '_original', '_codeless',
+                 '_italicized_phrases', '_unique_words', '_index_phrases', '_index_words',
+                 '_postings', '_term_counts', '_concordance', '_extracted', '_collocations',
+                 '_stream', '_streamed')
+
+    def __init__(self, doc_path: Path, keep_text: bool = True, positions: bool = False,
+                 profiler=no_profiler, mapped: bool = False, counts: bool = False,
+                 concordance: int = 0, extractors: Sequence[str] = (),
+                 collocations: bool = False) -> None:
+        self.doc_path = doc_path
+        self.keep_text = keep_text
+        self.positions = positions
+        self.profiler = profiler
+        self.mapped = mapped
+        self.counts = counts
+        self.concordance_k = concordance
+        self.extractors = tuple(extractors)
+        self.mine_collocations = collocations
+        self._original: Optional[str] = None
+        self._codeless: Optional[str] = None
+        self._italicized_phrases: Optional[FrozenSet[str]] = None
+        self._unique_words: Optional[FrozenSet[str]] = None
+        self._index_phrases: Optional[FrozenSet[str]] = None
+        self._index_words: Optional[FrozenSet[str]] = None
+        self._postings: Optional["Postings"] = None
+        self._term_counts: Optional[Dict[str, int]] = None
+        self._concordance: Optional["Concordance"] = None
+        self._extracted: Optional[Dict[str, FrozenSet[str]]] = None
+        self._collocations: Optional["Collocations"] = None
+        self._stream: Optional[Iterable[str]] = None
+        self._streamed = False
+
+    @classmethod
+    def from_stream(cls, stream: Iterable[str], name: str = "-", keep_text: bool = False,
+                    **options) -> "MarkdownDoc":
+        """
+        A document read from `stream` (lines of text, e.g. sys.stdin), named
+        `name` in postings and snippets. A stream can only be read once, so
+        the first result asked for extracts all of them; `original` and
+        `codeless` are only available with `keep_text`.
+        """
+        doc = cls(Path(name), keep_text=keep_text, **options)
+        doc._stream = stream
+        doc._streamed = True
+        return doc
+
+    def __repr__(self) -> str:
+        return f"MarkdownDoc(doc_path={self.doc_path!r})"
+
+    @property
+    def original(self) -> str:
+        if self._original is not None:
+            return self._original
+        if self._streamed:
+            if self._stream is not None and self.keep_text:
+                return self.extract()._original
+            raise ValueError("the text of a stream is only kept with keep_text=True")
+        with self.profiler.stage("read", self.doc_path) as record:
+            original = self.doc_path.read_text(encoding='utf-8')
+        if self.profiler.enabled:
+            record.bytes = len(original)
+        if self.keep_text:
+            self._original = original
+        return original
+
+    @property
+    def codeless(self) -> str:
+        if self._codeless is not None:
+            return self._codeless
+        original = self.original
+        with self.profiler.stage("strip_code", self.doc_path, len(original)):
+            codeless = strip_code(original)
+        if self.keep_text:
+            self._codeless = codeless
+        return codeless
+
+    @property
+    def italicized_phrases(self) -> FrozenSet[str]:
+        if self._italicized_phrases is None:
+            self.extract(words=False)
+        return self._italicized_phrases
+
+    @property
+    def unique_words(self) -> FrozenSet[str]:
+        if self._unique_words is None:
+            self.extract(italics=False)
+        return self._unique_words
+
+    @property
+    def index_phrases(self) -> FrozenSet[str]:
+        if self._index_phrases is None:
+            self._index_phrases = self._remove_stop_words(self.italicized_phrases)
+        return self._index_phrases
+
+    @property
+    def index_words(self) -> FrozenSet[str]:
+        if self._index_words is None:
+            self._index_words = self._remove_stop_words(self.unique_words)
+        return self._index_words
+
+    @property
+    def postings(self) -> Optional["Postings"]:
+        """Locations of the index words and phrases; None unless `positions`."""
+        if self.positions and self._postings is None:
+            self.extract()
+        return self._postings
+
+    @property
+    def term_counts(self) -> Optional[Dict[str, int]]:
+        """Occurrences of each index word and phrase; None unless `counts`."""
+        if self.counts and self._term_counts is None:
+            self.extract()
+        return self._term_counts
+
+    @property
+    def concordance(self) -> Optional["Concordance"]:
+        """Snippets of the index words and phrases in use; None unless `concordance`."""
+        if self.concordance_k and self._concordance is None:
+            self.extract()
+        return self._concordance
+
+    @property
+    def extracted(self) -> Dict[str, FrozenSet[str]]:
+        """The terms each of `extractors` found, by name."""
+        if self.extractors and self._extracted is None:
+            self.extract()
+        return self._extracted or {}
+
+    @property
+    def collocations(self) -> Optional["Collocations"]:
+        """The plain text's word and n-gram counts; None unless `collocations`."""
+        if self.mine_collocations and self._collocations is None:
+            self.extract()
+        return self._collocations
+
+    def extract(self, words: bool = True, italics: bool = True) -> "MarkdownDoc":
+        """Computes the requested results that are still missing, in one pass over the file."""
+        postings = None
+        term_counts = None
+        if self.positions and self._postings is None:
+            from markua_indexing.postings import Postings
+            postings = Postings([self.doc_path])
+        if self.counts and self._term_counts is None:
+            term_counts = {}
+        concordance = None
+        if self.concordance_k and self._concordance is None:
+            from markua_indexing.concordance import Concordance
+            concordance = Concordance([self.doc_path], k=self.concordance_k)
+        extractors: List["Extractor"] = []
+        if self.extractors and self._extracted is None:
+            from markua_indexing.extractors import create
+            extractors = create(self.extractors)
+        collocations = None
+        if self.mine_collocations and self._collocations is None:
+            from markua_indexing.collocations import Collocations
+            # Every n-gram is a candidate: one seen only once or twice here
+            # may still be common across the book, once chapters are merged
+            collocations = Collocations(min_count=1)
+        if postings is not None or term_counts is not None or concordance is not None \
+                or extractors or collocations is not None or self._stream is not None:
+            # These need every token, and a stream can only be read once,
+            # so everything comes from this pass:
+            words = italics = True
+        else:
+            words = words and self._unique_words is None
+            italics = italics and self._italicized_phrases is None
+        if words or italics:
+            profiler = self.profiler
+            size = self.doc_path.stat().st_size if profiler.enabled and not self._streamed else 0
+            if self.mapped and postings is None and concordance is None and not extractors \
+                    and collocations is None and not self._streamed:
+                with profiler.stage("scan", self.doc_path, size):
+                    phrases, unique = extract_mapped(self.doc_path, words=words, italics=italics,
+                                                     counts=term_counts)
+                phrases, unique = interned(phrases), interned(unique)
+            else:
+                kept: List[str] = []
+                if self._stream is not None:
+                    source = nullcontext(_kept(self._stream, kept) if self.keep_text
+                                         else self._stream)
+                    self._stream = None
+                else:
+                    source = self.doc_path.open(encoding='utf-8')
+                with profiler.stage("scan", self.doc_path, size), source as file:
+                    lines = TimedLines(file) if profiler.enabled else file
+                    phrases, unique = extract(lines, words=words, italics=italics,
+                                              postings=postings, counts=term_counts,
+                                              concordance=concordance, extractors=extractors,
+                                              profiler=profiler, file=self.doc_path,
+                                              collocations=collocations)
+                if profiler.enabled:
+                    profiler.add("io", self.doc_path, lines.duration_ns, size)
+                if kept:
+                    self._original = "".join(kept)
+            if italics:
+                self._italicized_phrases = phrases
+            if words:
+                self._unique_words = unique
+        if postings is not None:
+            postings.retain(self.index_words | self.index_phrases)
+            self._postings = postings
+        if term_counts is not None:
+            terms = self.index_words | self.index_phrases
+            self._term_counts = {term: count for term, count in term_counts.items()
+                                 if term in terms}
+        if concordance is not None:
+            concordance.retain(self.index_words | self.index_phrases)
+            self._concordance = concordance
+        if collocations is not None:
+            self._collocations = collocations
+        if extractors:
+            self._extracted = {
+                extractor.name: (self._remove_stop_words(frozenset(extractor.found))
+                                 if extractor.filtered else interned(extractor.found))
+                for extractor in extractors}
+        return self
+
+    def _remove_stop_words(self, items: FrozenSet[str]) -> FrozenSet[str]:
+        if self.profiler.enabled:
+            with self.profiler.stage("dictionaries", self.doc_path):
+                stop_words.refresh()
+        with self.profiler.stage("remove_stop_words", self.doc_path):
+            return frozenset(remove_stop_words(items))
+
+    def drop_text(self) -> None:
+        """Releases the raw text; it is re-read from the file if needed again."""
+        self._original = None
+        self._codeless = None
+
+
+def _kept(lines: Iterable[str], kept: List[str]) -> Iterator[str]:
+    for line in lines:
+        kept.append(line)
+        yield line
 
 
 def strip_code(source: str) -> str:
     """
-    Returns the input string with all matching code blocks removed.
-    - '\n```': Matches a newline followed by the opening triple backticks.
-    - '.*?': Non-greedy match for any characters,
-      including newlines (enabled by re.DOTALL).
-    - '```': Matches the closing triple backticks.
-    - '[^\n]*': Matches any non-newline characters after the closing backticks.
+    Returns the input string with its fenced code blocks, fence lines
+    included, removed: the same lines the scanner skips (see scanner.Fences).
     """
-    return re.sub(r'\n```.*?```[^\n]*', '', source, flags=re.DOTALL)
+    return "".join(line for line, fenced in fenced_lines(source.splitlines(keepends=True))
+                   if not fenced)
+
+
+def extract(lines: Iterable[str], words: bool = True, italics: bool = True,
+            postings: Optional["Postings"] = None, profiler=no_profiler,
+            file: object = "", counts: Optional[Dict[str, int]] = None,
+            concordance: Optional["Concordance"] = None,
+            extractors: Sequence["Extractor"] = (),
+            collocations: Optional["Collocations"] = None) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    One streaming pass over `lines` (e.g. an open file), skipping fenced code.
+    If `postings` is given, every token's position is added to it as file 0;
+    if `counts` is given, every token is counted in it, and if `concordance`
+    is given, every token is added to it as file 0. Each of `extractors`
+    is given the tokens of the kinds it subscribes to, from the same pass,
+    and `collocations`, if given, is fed every line.
+    Returns:
+    - (italicized phrases, unique words), as interned strings
+    """
+    phrases: Set[str] = set()
+    unique: Set[str] = set()
+    if concordance is not None:
+        lines = concordance.remember(lines)
+    if collocations is not None:
+        lines = collocations.feed(lines)
+    subscribers: Dict[str, List["Extractor"]] = {}
+    for extractor in extractors:
+        for kind in extractor.kinds:
+            subscribers.setdefault(kind, []).append(extractor)
+    for token in scan(lines, words=words, italics=italics, profiler=profiler, file=file,
+                      kinds=frozenset(subscribers)):
+        if subscribers and token.kind in subscribers:
+            for extractor in subscribers[token.kind]:
+                extractor.add(token)
+        if token.kind == WORD:
+            unique.add(token.text)
+        elif token.kind == ITALIC:
+            phrases.add(token.text)
+        else:
+            continue
+        # A single italicized word is already recorded as a word:
+        if token.kind == ITALIC and word_pattern.fullmatch(token.text) is not None:
+            continue
+        if postings is not None:
+            postings.add(token.text, 0, token.line, token.column)
+        if counts is not None:
+            counts[token.text] = counts.get(token.text, 0) + 1
+        if concordance is not None:
+            concordance.add(token.text, 0, token.line, token.column)
+    return interned(phrases), interned(unique)
+
+
+def interned(strings: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(map(sys.intern, strings))
 
 
 def italicized_phrases(source: str) -> Set[str]:
     """
     source (str): The input string to search for italicized phrases.
     Returns:
-    - list[str]: A list of all phrases found in the source string that
-                 are italicized using either asterisks or underscores.
+    - set[str]: The text of all phrases in the source string that
+                are italicized using either asterisks or underscores.
     """
-    starred = r'\*.*?\*'
-    underscored = r'_.*?_'
-    starred_phrases = re.findall(starred, source, flags=re.DOTALL)
-    underscored_phrases = re.findall(underscored, source, flags=re.DOTALL)
-    return set(starred_phrases) | set(underscored_phrases)
+    lines = source.splitlines(keepends=True)
+    return {token.text for token in scan(lines, words=False)}
 
 
 def unique_words(source: str) -> Set[str]:
-    # Replace all non-word characters (punctuation, special characters)
-    # with spaces, then break on spaces into words
-    words = re.sub(r'\W+', ' ', source).split()
-    # Filter out words that consist only of numbers
-    non_numbers = [word for word in words if not word.isdigit()]
-    # Produce a list of unique words sorted alphabetically
-    return set(non_numbers)
+    # Words are runs of word characters; words that are
+    # only numbers are dropped by the scanner
+    lines = source.splitlines(keepends=True)
+    return {token.text for token in scan(lines, italics=False)}
 
 
 def remove_stop_words(word_list: Set[str]) -> Set[str]:
-    stop_words = set()
-
-    # Dictionary lines starting with '#' are comments
-    for dictionary in dictionaries.directory.glob("*.txt"):
-        with dictionary.open(encoding='utf-8') as file:
-            stop_words.update([line.strip().lower() for line in file
-                               if not line.lstrip().startswith('#')])
-
-    return {word for word in word_list if word.lower() not in stop_words}
-    # return word_list - stop_words
+    return stop_words.remove_from(word_list)
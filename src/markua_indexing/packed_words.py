@@ -0,0 +1,109 @@
+"""
+Read-only word set for large exclusion dictionaries (500k-word frequency
+lists, glossaries) that pickles compactly: the words travel and are stored
+as UTF-8 buffers rather than as a pickled set of str. Lookups go to an
+ordinary frozenset, as no pure-Python structure matches its speed.
+
+Where memory matters more than lookup speed, a `hot` limit keeps only the
+first words in the frozenset and packs the long tail at about 20 bytes a
+word, against about 90 for a set of str: the UTF-8 words in one buffer,
+ordered by CRC-32, with an array of those hashes searched in C by bisect
+and a Bloom filter in front that rejects most misses without searching.
+"""
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Set
+from typing import AbstractSet, Iterable, Iterator, List, Optional
+
+# Entries kept in an ordinary frozenset, in the order given; None keeps all
+# of them there, so lookups are as fast as a set's:
+HOT_WORDS: Optional[int] = None
+BLOOM_BITS_PER_WORD = 10
+# Seed of the second Bloom filter hash:
+SEED = 0x5bd1e995
+
+
+class PackedWords(Set):
+    """
+    The first `hot` distinct `words` (all of them by default) go in a
+    frozenset; the rest are packed. Compares equal to a set of the same
+    words. Pickles as a few flat buffers. Words can't contain line breaks
+    (they are the lines of a dictionary).
+    """
+    __slots__ = ('_hot', '_hashes', '_ends', '_blob', '_bloom', '_mask')
+
+    def __init__(self, words: Iterable[str], hot: Optional[int] = None):
+        ordered = list(dict.fromkeys(words))
+        if hot is None:
+            hot = len(ordered) if HOT_WORDS is None else HOT_WORDS
+        self._hot = frozenset(ordered[:hot])
+        if any("\n" in word for word in self._hot):
+            raise ValueError("words can't contain line breaks")
+        cold = sorted((zlib.crc32(data), data)
+                      for data in (word.encode('utf-8') for word in ordered[hot:]))
+        self._hashes = array('I', (digest for digest, _ in cold))
+        self._blob = b''.join(data for _, data in cold)
+        self._ends = array('I')
+        end = 0
+        for _, data in cold:
+            end += len(data)
+            self._ends.append(end)
+        bits = 1 << max(3, (len(cold) * BLOOM_BITS_PER_WORD).bit_length())
+        self._mask = bits - 1
+        self._bloom = bytearray(bits // 8)
+        for digest, data in cold:
+            for bit in (digest & self._mask, zlib.crc32(data, SEED) & self._mask):
+                self._bloom[bit >> 3] |= 1 << (bit & 7)
+
+    def __contains__(self, word: object) -> bool:
+        if word in self._hot:
+            return True
+        if not self._hashes or not isinstance(word, str):
+            return False
+        data = word.encode('utf-8')
+        digest = zlib.crc32(data)
+        bit = digest & self._mask
+        if not self._bloom[bit >> 3] >> (bit & 7) & 1:
+            return False
+        bit = zlib.crc32(data, SEED) & self._mask
+        if not self._bloom[bit >> 3] >> (bit & 7) & 1:
+            return False
+        hashes, ends = self._hashes, self._ends
+        index = bisect_left(hashes, digest)
+        while index < len(hashes) and hashes[index] == digest:
+            if self._blob[ends[index - 1] if index else 0:ends[index]] == data:
+                return True
+            index += 1
+        return False
+
+    @property
+    def lookup(self) -> AbstractSet[str]:
+        """
+        What to test membership in: the frozenset itself when it holds every
+        word, which spares a call to __contains__ per test.
+        """
+        return self if self._hashes else self._hot
+
+    def _cold(self) -> List[str]:
+        ends = self._ends
+        return [self._blob[ends[i - 1] if i else 0:ends[i]].decode('utf-8')
+                for i in range(len(ends))]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._hot
+        yield from self._cold()
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._hashes)
+
+    def __getstate__(self):
+        # The frozenset goes as one buffer too: as quick to load as pickling
+        # it, and a fifth smaller
+        hot = "\n".join(self._hot).encode('utf-8') if self._hot else None
+        return hot, self._hashes, self._ends, self._blob, self._bloom, self._mask
+
+    def __setstate__(self, state) -> None:
+        hot, self._hashes, self._ends, self._blob, self._bloom, self._mask = state
+        self._hot = frozenset(hot.decode('utf-8').split("\n")) if hot is not None \
+            else frozenset()
@@ -0,0 +1,94 @@
+"""
+Positional inverted index: where each index word and phrase occurs.
+"""
+import pickle
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+Location = Tuple[Path, int, int]  # (file, line, column)
+
+
+class Postings:
+    """
+    Maps each term to a flat array of (file id, line, column) triples,
+    rather than a list of tuples, so each occurrence costs 12 bytes.
+    `files` maps file ids back to paths.
+    """
+    __slots__ = ('files', '_postings')
+
+    def __init__(self, files: Iterable[Path] = ()) -> None:
+        self.files: List[Path] = list(files)
+        self._postings: Dict[str, array] = {}
+
+    def add(self, term: str, file_id: int, line: int, column: int) -> None:
+        positions = self._postings.get(term)
+        if positions is None:
+            positions = self._postings[term] = array('I')
+        positions.append(file_id)
+        positions.append(line)
+        positions.append(column)
+
+    def locations(self, term: str) -> List[Location]:
+        positions = self._postings.get(term)
+        if positions is None:
+            return []
+        return [(self.files[positions[i]], positions[i + 1], positions[i + 2])
+                for i in range(0, len(positions), 3)]
+
+    def count(self, term: str) -> int:
+        return len(self._postings.get(term, ())) // 3
+
+    def retain(self, terms: Iterable[str]) -> None:
+        """Drops the postings of every term not in `terms`."""
+        keep = set(terms)
+        self._postings = {term: positions for term, positions in self._postings.items()
+                          if term in keep}
+
+    def rename(self, forms: Mapping[str, str]) -> None:
+        """Merges the postings of terms that `forms` maps to the same form, under that form."""
+        postings, self._postings = self._postings, {}
+        for term, positions in postings.items():
+            form = forms.get(term, term)
+            ours = self._postings.get(form)
+            if ours is None:
+                self._postings[form] = positions
+            else:
+                ours.extend(positions)
+
+    def merge(self, other: "Postings") -> None:
+        """Adds all of `other`'s postings, renumbering its files after ours."""
+        offset = len(self.files)
+        self.files.extend(other.files)
+        for term, theirs in other._postings.items():
+            if offset:
+                theirs = array('I', theirs)
+                theirs[0::3] = array('I', (file_id + offset for file_id in theirs[0::3]))
+            ours = self._postings.get(term)
+            if ours is None:
+                self._postings[term] = array('I', theirs)
+            else:
+                ours.extend(theirs)
+
+    def save(self, path: Path) -> None:
+        with path.open('wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: Path) -> "Postings":
+        with path.open('rb') as file:
+            return pickle.load(file)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._postings
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Postings):
+            return NotImplemented
+        return self.files == other.files and self._postings == other._postings
@@ -0,0 +1,165 @@
+"""
+Per-stage, per-file profiling of index runs: wall time, bytes processed and
+peak memory, written as a JSON summary and as a Chrome trace-event file
+(open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+class StageRecord:
+    # A plain class rather than a dataclass: the scanner imports this module,
+    # and dataclasses (through inspect) would add to every run's start-up
+    __slots__ = ('name', 'file', 'start_ns', 'duration_ns', 'bytes', 'peak_memory', 'pid', 'tid')
+
+    def __init__(self, name: str, file: str, start_ns: int, duration_ns: int = 0,
+                 bytes: int = 0, peak_memory: int = 0) -> None:
+        self.name = name
+        self.file = file
+        self.start_ns = start_ns
+        self.duration_ns = duration_ns
+        self.bytes = bytes
+        self.peak_memory = peak_memory  # bytes allocated above the level at stage entry
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def __repr__(self) -> str:
+        return (f"StageRecord({self.name!r}, {self.file!r}, {self.start_ns}, "
+                f"duration_ns={self.duration_ns}, bytes={self.bytes})")
+
+
+class Profiler:
+    """
+    Use `with profiler.stage(name, file, nbytes):` around each unit of work,
+    and `add()` for time accumulated in many small pieces (such as reads
+    interleaved with scanning). Peak memory comes from tracemalloc, which is
+    only started when `memory` is true.
+    """
+    enabled = True
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.records: List[StageRecord] = []
+        self._open: List[List[int]] = []  # [start traced, peak so far] per open stage
+        if memory:
+            # Imported here: it pulls in linecache and tokenize, a good part
+            # of the CLI's start-up time when memory isn't being profiled
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, file: Any = "", nbytes: int = 0) -> Iterator[StageRecord]:
+        record = StageRecord(name, str(file), time.perf_counter_ns(), bytes=nbytes)
+        if self.memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._open.append([current, current])
+        try:
+            yield record
+        finally:
+            record.duration_ns = time.perf_counter_ns() - record.start_ns
+            if self.memory:
+                import tracemalloc
+                start, peak = self._open.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                record.peak_memory = peak - start
+                # The enclosing stage's peak includes this one's:
+                if self._open:
+                    self._open[-1][1] = max(self._open[-1][1], peak)
+            self.records.append(record)
+
+    def add(self, name: str, file: Any, duration_ns: int, nbytes: int = 0) -> None:
+        """Records time spent on `name` in pieces too small to time as stages."""
+        self.records.append(StageRecord(name, str(file), time.perf_counter_ns() - duration_ns,
+                                        duration_ns, nbytes))
+
+    def extend(self, records: Iterable[StageRecord]) -> None:
+        """Adds records collected elsewhere, e.g. in a worker process."""
+        self.records.extend(records)
+
+    def summary(self) -> Dict[str, Any]:
+        stages: Dict[str, Dict[str, Any]] = {}
+        files: Dict[str, Dict[str, float]] = {}
+        for record in self.records:
+            total = stages.setdefault(record.name, {
+                "calls": 0, "seconds": 0.0, "bytes": 0, "peak_memory": 0})
+            total["calls"] += 1
+            total["seconds"] += record.duration_ns / 1e9
+            total["bytes"] += record.bytes
+            total["peak_memory"] = max(total["peak_memory"], record.peak_memory)
+            if record.file:
+                per_file = files.setdefault(record.file, {})
+                per_file[record.name] = per_file.get(record.name, 0.0) + record.duration_ns / 1e9
+        for total in stages.values():
+            seconds = total["seconds"]
+            total["mb_per_s"] = total["bytes"] / 1e6 / seconds if seconds and total["bytes"] else None
+        return {"stages": stages, "files": files}
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        return [{
+            "name": record.name,
+            "cat": "markua_indexing",
+            "ph": "X",
+            "ts": record.start_ns / 1000,
+            "dur": record.duration_ns / 1000,
+            "pid": record.pid,
+            "tid": record.tid,
+            "args": {"file": record.file, "bytes": record.bytes,
+                     "peak_memory": record.peak_memory},
+        } for record in self.records]
+
+    def write(self, prefix: Path) -> List[Path]:
+        """Writes <prefix>.json (summary) and <prefix>.trace.json. Returns both paths."""
+        import json
+        summary = prefix.with_name(prefix.name + ".json")
+        trace = prefix.with_name(prefix.name + ".trace.json")
+        summary.write_text(json.dumps(self.summary(), indent=2) + "\n", encoding='utf-8')
+        trace.write_text(json.dumps({"traceEvents": self.trace_events()}) + "\n",
+                         encoding='utf-8')
+        return [summary, trace]
+
+
+class NullProfiler:
+    """Stands in when profiling is off; `stage()` costs one call and a shared no-op."""
+    enabled = False
+    records: List[StageRecord] = []
+    _nothing = nullcontext()
+
+    def stage(self, name: str, file: Any = "", nbytes: int = 0):
+        return self._nothing
+
+    def add(self, name: str, file: Any, duration_ns: int, nbytes: int = 0) -> None:
+        pass
+
+    def extend(self, records: Iterable[StageRecord]) -> None:
+        pass
+
+
+no_profiler = NullProfiler()
+
+
+class TimedLines:
+    """Wraps a line iterator (an open file), accumulating the time spent reading."""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self.duration_ns = 0
+
+    def __iter__(self) -> "TimedLines":
+        return self
+
+    def __next__(self) -> str:
+        started = time.perf_counter_ns()
+        try:
+            line = next(self._lines)
+        finally:
+            self.duration_ns += time.perf_counter_ns() - started
+        return line
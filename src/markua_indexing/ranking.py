@@ -0,0 +1,74 @@
+"""
+Rank index candidates across chapters, so the terms most worth indexing
+come first: TF-IDF computed on a sparse chapter-by-term count matrix,
+with Juilland's dispersion alongside.
+Needs NumPy: pip install 'markua-indexing[rank]'.
+"""
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # Optional; rank() says how to install it
+    np = None
+
+
+class RankedTerm(NamedTuple):
+    term: str
+    score: float  # TF-IDF
+    count: int  # Occurrences in the whole manuscript
+    chapters: int  # Chapters it occurs in
+    # Juilland's D: 1 when spread evenly over the chapters, near 0 when in one
+    dispersion: float
+
+
+def rank(chapter_counts: Sequence[Dict[str, int]], terms: Optional[Iterable[str]] = None,
+         top: Optional[int] = None) -> List[RankedTerm]:
+    """
+    Ranks the terms counted in `chapter_counts` (one dict per chapter),
+    restricted to `terms` if given, best first; ties go to the more
+    frequent term, then alphabetically. Returns at most `top` terms.
+    - score: occurrences in the manuscript * idf
+    - idf: log((1 + chapters) / (1 + chapters containing the term)) + 1
+    """
+    if np is None:
+        raise ImportError("ranking needs NumPy; pip install 'markua-indexing[rank]'")
+    if terms is not None:
+        wanted = set(terms)
+        chapter_counts = [{term: count for term, count in counts.items() if term in wanted}
+                          for counts in chapter_counts]
+    vocabulary = {term: column for column, term in
+                  enumerate(dict.fromkeys(chain.from_iterable(chapter_counts)))}
+    if not vocabulary:
+        return []
+    n_chapters, n_terms = len(chapter_counts), len(vocabulary)
+    # The count matrix in coordinate form: (row, column, value) per nonzero entry
+    rows = np.repeat(np.arange(n_chapters), [len(counts) for counts in chapter_counts])
+    columns = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(chapter_counts)),
+                          dtype=np.int64, count=len(rows))
+    values = np.fromiter(chain.from_iterable(counts.values() for counts in chapter_counts),
+                         dtype=np.float64, count=len(rows))
+
+    df = np.bincount(columns, minlength=n_terms)
+    idf = np.log((1 + n_chapters) / (1 + df)) + 1
+    total = np.bincount(columns, weights=values, minlength=n_terms)
+    score = total * idf
+    if n_chapters > 1:
+        # A term's share of the counted terms in each chapter:
+        tf = values / np.bincount(rows, weights=values, minlength=n_chapters)[rows]
+        # Coefficient of variation of tf over every chapter, zeros included:
+        mean = np.bincount(columns, weights=tf, minlength=n_terms) / n_chapters
+        square = np.bincount(columns, weights=tf * tf, minlength=n_terms) / n_chapters
+        deviation = np.sqrt(np.maximum(square - mean * mean, 0.0))
+        dispersion = np.clip(1 - deviation / mean / np.sqrt(n_chapters - 1), 0.0, 1.0)
+    else:
+        dispersion = np.ones(n_terms)
+
+    names = list(vocabulary)
+    alphabetical = np.empty(n_terms, dtype=np.int64)
+    alphabetical[sorted(range(n_terms), key=lambda i: (names[i].lower(), names[i]))] = \
+        np.arange(n_terms)
+    order = np.lexsort((alphabetical, -total, -score))[:top]
+    return [RankedTerm(names[i], float(score[i]), int(total[i]), int(df[i]),
+                       float(dispersion[i]))
+            for i in order.tolist()]
@@ -0,0 +1,172 @@
+"""
+Single-pass, line-oriented scanner for Markua text.
+Tracks fence state line by line and buffers only the current paragraph,
+so memory is bounded by the longest paragraph rather than the document.
+"""
+import re
+import time
+from bisect import bisect_right
+from typing import FrozenSet, Iterable, Iterator, List, NamedTuple, Tuple
+
+from markua_indexing.emphasis import code_spans, phrases, special_pattern
+from markua_indexing.profiling import no_profiler
+
+WORD = "word"
+ITALIC = "italic"
+# Further kinds, only yielded when asked for (e.g. by extractors):
+BOLD = "bold"
+CODE = "code"  # Inline code spans
+HEADING = "heading"
+DEFINITION = "definition"  # The term line of a definition list item
+
+FENCE = "```"  # Every fence line starts with this; see Fences for the whole rule
+# A line opening a fence: backticks, then an info string without any:
+opening_fence_pattern = re.compile(r'(`{3,})[^`]*$')
+# A line closing one: backticks and nothing else:
+closing_fence_pattern = re.compile(r'(`{3,})\s*$')
+word_pattern = re.compile(r'\w+')
+# A heading's '#' marks, and its closing '#'s and {attribute list}:
+heading_marks_pattern = re.compile(r'^#+\s*|\s*(?:#+|\{[^}]*\})?\s*$')
+
+
+class Token(NamedTuple):
+    kind: str  # WORD, ITALIC, or one of the further kinds
+    text: str
+    line: int  # 1-based
+    column: int  # 0-based, within `line`
+
+
+class Fences:
+    """
+    The one rule for fenced code, shared by everything that skips it: a
+    fence opens on a line of three or more backticks and an info string
+    with no backticks (so "```inline``` text" is prose with a code span),
+    and closes on a line of at least as many backticks and nothing else.
+    A fence never closed runs to the end of the text. Pass toggles() each
+    line starting with FENCE, in order.
+    """
+    __slots__ = ('opened',)
+
+    def __init__(self) -> None:
+        self.opened = 0  # Backticks in the open fence's line, or 0 outside one
+
+    def toggles(self, line: str) -> bool:
+        """Whether `line` opens or closes a fence."""
+        if self.opened:
+            match = closing_fence_pattern.match(line)
+            if match is None or len(match.group(1)) < self.opened:
+                return False
+            self.opened = 0
+            return True
+        match = opening_fence_pattern.match(line)
+        if match is None:
+            return False
+        self.opened = len(match.group(1))
+        return True
+
+
+def fenced_lines(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """(line, whether it is a fence line or fenced code) for each of `lines`."""
+    fences = Fences()
+    for line in lines:
+        if line.startswith(FENCE) and fences.toggles(line):
+            yield line, True
+        else:
+            yield line, bool(fences.opened)
+
+
+def scan(lines: Iterable[str], words: bool = True, italics: bool = True,
+         profiler=no_profiler, file: object = "",
+         kinds: FrozenSet[str] = frozenset()) -> Iterator[Token]:
+    """
+    Yields the words and italicized spans of `lines`, skipping fenced code.
+    Words are yielded as each line is read; italic spans (see
+    markua_indexing.emphasis), which may cross line breaks but never a
+    blank line, when their paragraph ends.
+    Words consisting only of digits are skipped. An enabled `profiler`
+    receives the total time spent matching emphasis, as "emphasis".
+    Tokens of the further `kinds` come from the same pass: headings and
+    definition terms with their line, bold and code spans with the italics.
+    """
+    paragraph: List[str] = []
+    first_line = 0
+    fences = Fences()
+    timed = profiler.enabled
+    emphasis_ns = 0
+    bold, code = BOLD in kinds, CODE in kinds
+    spans = italics or bold or code
+    headings, definitions = HEADING in kinds, DEFINITION in kinds
+    previous = ""  # The paragraph's previous line, a definition term if this is its definition
+
+    def paragraph_spans() -> List[Token]:
+        nonlocal emphasis_ns
+        if not timed:
+            return _spans(paragraph, first_line, italics, bold, code)
+        started = time.perf_counter_ns()
+        found = _spans(paragraph, first_line, italics, bold, code)
+        emphasis_ns += time.perf_counter_ns() - started
+        return found
+
+    for number, line in enumerate(lines, 1):
+        if line.startswith(FENCE) and fences.toggles(line):
+            yield from paragraph_spans()
+            paragraph = []
+            previous = ""
+            continue
+        if fences.opened:
+            continue
+        if not line.strip():
+            yield from paragraph_spans()
+            paragraph = []
+            previous = ""
+            continue
+        if headings and line.startswith('#'):
+            marks = heading_marks_pattern.match(line)
+            heading = heading_marks_pattern.sub('', line)
+            if heading:
+                yield Token(HEADING, heading, number, marks.end())
+        if definitions:
+            if line.startswith(': ') and previous:
+                term = previous.strip()
+                yield Token(DEFINITION, term, number - 1, previous.index(term))
+            previous = line
+        if words:
+            for match in word_pattern.finditer(line):
+                word = match.group()
+                if not word.isdigit():
+                    yield Token(WORD, word, number, match.start())
+        if spans:
+            if not paragraph:
+                first_line = number
+            paragraph.append(line)
+    yield from paragraph_spans()
+    if timed:
+        profiler.add("emphasis", file, emphasis_ns)
+
+
+def _spans(paragraph: List[str], first_line: int, italics: bool = True, bold: bool = False,
+           code: bool = False) -> List[Token]:
+    if not paragraph:
+        return []
+    text = "".join(paragraph)
+    emphasis = (italics or bold) and ('*' in text or '_' in text)
+    code = code and '`' in text
+    if not emphasis and not code:
+        return []
+    # Offset of the start of each line, to map spans back to line/column:
+    starts = [0]
+    for line in paragraph[:-1]:
+        starts.append(starts[-1] + len(line))
+    matches = list(special_pattern.finditer(text)) if emphasis and code else None
+    found = []
+    if emphasis:
+        for offset, phrase, strong in phrases(text, matches=matches):
+            if phrase and (bold if strong else italics):
+                index = bisect_right(starts, offset) - 1
+                found.append(Token(BOLD if strong else ITALIC, phrase,
+                                   first_line + index, offset - starts[index]))
+    if code:
+        for offset, content in code_spans(text, matches):
+            index = bisect_right(starts, offset) - 1
+            found.append(Token(CODE, content, first_line + index, offset - starts[index]))
+    return found
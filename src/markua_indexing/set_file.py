@@ -0,0 +1,123 @@
+"""
+A set of strings persisted as a sorted file, one item per line, for curated
+index lists and exclusion dictionaries. Changes are appended to a journal
+and only compacted into the sorted file by flush() or close(), which
+replace the file atomically, so a crash never leaves a half-written list.
+"""
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set, TextIO
+
+ADD = "+"
+REMOVE = "-"
+
+
+class SetFile:
+    """
+    Opening a SetFile loads the sorted file and replays any journal left by
+    a process that didn't close it. Use it as a context manager, or call
+    close(), to compact the journal into the file. The journal is buffered:
+    after a hard crash the last few kilobytes of changes may be lost, but
+    the file itself is always a complete earlier version.
+    """
+
+    def __init__(self, file_name: str, dir_path: Path = Path()):
+        self.file_path = dir_path / file_name
+        self.journal_path = self.file_path.with_name(self.file_path.name + ".journal")
+        self._data: Set[str] = set()
+        self._journal: Optional[TextIO] = None
+        self._dirty = False
+        if self.file_path.exists():
+            with self.file_path.open(encoding='utf-8') as f:
+                self._data.update(line.rstrip('\n') for line in f if line != '\n')
+        if self.journal_path.exists():
+            self._replay()
+
+    def _replay(self) -> None:
+        with self.journal_path.open(encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Torn by a crash mid-write
+                operation, item = line[0], line[1:-1]
+                if operation == ADD:
+                    self._data.add(item)
+                elif operation == REMOVE:
+                    self._data.discard(item)
+        self._dirty = True
+
+    def _log(self, operation: str, item: str) -> None:
+        _check(item)
+        self._log_all(operation, [item])
+
+    def _log_all(self, operation: str, items: Iterable[str]) -> None:
+        if self._journal is None:
+            self._journal = self.journal_path.open('a', encoding='utf-8')
+        self._journal.writelines(operation + item + '\n' for item in items)
+        self._dirty = True
+
+    def add(self, item: str) -> None:
+        if item not in self._data:
+            self._log(ADD, item)
+            self._data.add(item)
+
+    def update(self, items: Iterable[str]) -> None:
+        new = [item for item in dict.fromkeys(items) if item not in self._data]
+        for item in new:
+            _check(item)
+        if new:
+            self._log_all(ADD, new)
+            self._data.update(new)
+
+    def remove(self, item: str) -> None:
+        """Removes `item` if present."""
+        if item in self._data:
+            self._log(REMOVE, item)
+            self._data.remove(item)
+
+    def flush(self) -> None:
+        """Compacts the journal: writes the sorted set beside the file and renames it over it."""
+        if not self._dirty:
+            return
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        temporary = self.file_path.with_name(f".{self.file_path.name}.{os.getpid()}.tmp")
+        with temporary.open('w', encoding='utf-8') as f:
+            f.writelines(item + '\n' for item in sorted(self._data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.file_path)
+        self.journal_path.unlink(missing_ok=True)
+        self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "SetFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        # On an exception the journal is kept, and replayed on the next open
+        if exc_type is None:
+            self.close()
+        elif self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        return False
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _check(item: str) -> None:
+    """Each item is one line of the file, so it can't be empty or contain a line break."""
+    if not item:
+        raise ValueError("items can't be empty")
+    if '\n' in item:
+        raise ValueError(f"items can't contain line breaks: {item!r}")
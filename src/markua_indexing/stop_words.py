@@ -0,0 +1,158 @@
+"""
+Exclusion dictionaries, loaded once per process and shared by every MarkdownDoc.
+"""
+import hashlib
+import os
+import pickle
+from itertools import chain, zip_longest
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, List, Optional, Set, Tuple
+
+from markua_indexing.automaton import Automaton
+from markua_indexing.packed_words import PackedWords
+from markua_indexing.scanner import word_pattern
+
+# (file name, mtime in ns, size in bytes) for each dictionary file:
+Signature = Tuple[Tuple[str, int, int], ...]
+
+SNAPSHOT_VERSION = 3
+
+
+class StopWords:
+    """
+    Lowercased words and phrases from every *.txt file in a dictionaries
+    directory. The files are only re-read when one is added, removed, or
+    changes its mtime or size. A compiled snapshot is written next to the
+    directory so a cold start can skip re-tokenizing the text files.
+
+    An item is excluded if it matches an entry exactly, ignoring case and
+    punctuation ("Side Effects." matches "side effects"), or if it is a
+    phrase containing a multi-word entry ("are not" excludes "these are not
+    monads"). Multi-word entries are compiled into a token-level automaton,
+    so the containment check is linear in the length of the candidate.
+    Entries are held as PackedWords, so even the snapshot of a 500k-word
+    list stays compact, and looked up in a plain frozenset.
+    """
+    _shared: Dict[Path, "StopWords"] = {}
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.snapshot = directory.with_name(directory.name + ".snapshot")
+        self._signature: Optional[Signature] = None
+        self._words = PackedWords(())
+        self._lookup: AbstractSet[str] = self._words.lookup
+        self._fingerprint = ""
+        self._phrases: Automaton[str] = Automaton()
+
+    @classmethod
+    def shared(cls, directory: Path) -> "StopWords":
+        """The single per-process instance for `directory`."""
+        key = directory.resolve()
+        if key not in cls._shared:
+            cls._shared[key] = cls(directory)
+        return cls._shared[key]
+
+    def signature(self) -> Signature:
+        entries = []
+        for dictionary in self.directory.glob("*.txt"):
+            stat = dictionary.stat()
+            entries.append((dictionary.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    @property
+    def words(self) -> PackedWords:
+        self.refresh()
+        return self._words
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the loaded words; unchanged by edits that only touch mtimes."""
+        self.refresh()
+        return self._fingerprint
+
+    def refresh(self) -> bool:
+        """Reload if any dictionary file changed. Returns True if reloaded."""
+        signature = self.signature()
+        if signature == self._signature:
+            return False
+        words = self._read_snapshot(signature)
+        if words is None:
+            words = self._read_dictionaries()
+            self._write_snapshot(signature, words)
+        phrases: Automaton[str] = Automaton()
+        for entry in words:
+            # Only true phrases; not contractions like "aren't":
+            if len(entry.split()) > 1:
+                phrases.add(normalize(entry), entry)
+        phrases.build()
+        self._signature = signature
+        self._words = words
+        self._lookup = words.lookup
+        self._phrases = phrases
+        self._fingerprint = hashlib.sha256(
+            "\n".join(sorted(words)).encode('utf-8')).hexdigest()
+        return True
+
+    def remove_from(self, items: Iterable[str]) -> Set[str]:
+        """The items that are not excluded."""
+        self.refresh()
+        return {item for item in items if not self.excludes(item)}
+
+    def __contains__(self, item: str) -> bool:
+        self.refresh()
+        return self.excludes(item)
+
+    def excludes(self, item: str) -> bool:
+        """Like `item in self`, without checking the files for changes; refresh() first."""
+        lowered = item.lower()
+        if lowered in self._lookup:
+            return True
+        tokens = normalize(lowered)
+        if len(tokens) == 1:
+            return tokens[0] != lowered and tokens[0] in self._lookup
+        if len(tokens) > 1:
+            return " ".join(tokens) in self._lookup or self._phrases.contains_any(tokens)
+        return False
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _read_dictionaries(self) -> PackedWords:
+        dictionaries: List[List[str]] = []
+        # Dictionary lines starting with '#' are comments
+        for dictionary in sorted(self.directory.glob("*.txt")):
+            with dictionary.open(encoding='utf-8') as file:
+                dictionaries.append([line.strip().lower() for line in file
+                                     if line.strip() and not line.lstrip().startswith('#')])
+        # Interleaved, so with a `hot` limit the head of every list (its most
+        # common words, in a frequency list) would land in the fast set:
+        interleaved = chain.from_iterable(zip_longest(*dictionaries))
+        return PackedWords(word for word in interleaved if word is not None)
+
+    def _read_snapshot(self, signature: Signature) -> Optional[PackedWords]:
+        try:
+            with self.snapshot.open('rb') as file:
+                version, stored_signature, words = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError,
+                AttributeError):  # E.g. an older PackedWords state
+            return None
+        if version != SNAPSHOT_VERSION or stored_signature != signature:
+            return None
+        return words
+
+    def _write_snapshot(self, signature: Signature, words: PackedWords) -> None:
+        # Write-then-rename so a concurrent reader never sees a partial file.
+        # A read-only install simply goes without a snapshot.
+        temporary = self.snapshot.with_name(f"{self.snapshot.name}.{os.getpid()}.tmp")
+        try:
+            with temporary.open('wb') as file:
+                pickle.dump((SNAPSHOT_VERSION, signature, words), file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.snapshot)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+
+def normalize(item: str) -> List[str]:
+    """Lowercased word tokens, without punctuation or extra whitespace."""
+    return word_pattern.findall(item.lower())
@@ -0,0 +1,47 @@
+"""
+Streaming mode for build pipelines: index text from any stream (such as
+stdin) and write each index word and phrase as a JSON Lines record as soon
+as it is first found, so the indexer can run as a filter stage without
+intermediate files.
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from markua_indexing.markdown_doc import stop_words
+from markua_indexing.scanner import WORD, scan
+
+Record = Dict[str, Any]
+
+
+def records(lines: Iterable[str], name: str = "-",
+            seen: Optional[Set[Tuple[str, str]]] = None) -> Iterator[Record]:
+    """
+    {"kind": "word" or "phrase", "term", "file": name, "line", "column"} for
+    the first occurrence of each index word and phrase in `lines`. Pass the
+    same `seen` set for several streams to report each term only once.
+    """
+    if seen is None:
+        seen = set()
+    stop_words.refresh()
+    for token in scan(lines):
+        key = (token.kind, token.text)
+        if key in seen:
+            continue
+        seen.add(key)
+        if stop_words.excludes(token.text):
+            continue
+        yield {"kind": "word" if token.kind == WORD else "phrase", "term": token.text,
+               "file": name, "line": token.line, "column": token.column}
+
+
+def write_jsonl(found: Iterable[Record], out: TextIO) -> int:
+    """
+    Writes one JSON object per line to `out`, flushing each, so a reader at
+    the other end of a pipe gets it at once. Returns the number written.
+    """
+    written = 0
+    for record in found:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        written += 1
+    return written
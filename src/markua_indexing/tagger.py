@@ -0,0 +1,197 @@
+"""
+Apply a curated index_words.txt to a manuscript: insert a Markua index
+marker, e.g. Monad{i: "Monad"}, after each occurrence of each term.
+All terms are matched in a single Aho-Corasick pass over each paragraph,
+so a phrase wrapped onto the next line is found too;
+fenced code, inline code, headings and existing attributes are skipped.
+"""
+import argparse
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from markua_indexing.automaton import Automaton
+from markua_indexing.cli import expand
+from markua_indexing.markdown_doc import index_words_file
+from markua_indexing.scanner import fenced_lines, word_pattern
+
+# Headings in index_words.txt, e.g. "Index Words:"
+section_pattern = re.compile(r'^[A-Z][\w ]*:$')
+# Text that is never tagged: inline code, {attribute} lists and link targets
+skipped_pattern = re.compile(r'`[^`]*`|\{[^}]*\}|\]\([^)]*\)')
+marker_pattern = re.compile(r'\{i:')
+
+
+def load_terms(path: Path) -> List[str]:
+    """
+    The terms in an index_words.txt-style list, skipping headings, comments
+    and blanks, and the scores after a tab in a ranked list.
+    """
+    terms = []
+    with path.open(encoding='utf-8') as file:
+        for line in file:
+            term = line.split('\t', 1)[0].strip()
+            if term and not term.startswith('#') and not section_pattern.match(term):
+                terms.append(term)
+    return terms
+
+
+class Tagger:
+    """
+    Holds the automaton for a term list. Matching is case-insensitive
+    unless `match_case`; phrase words may be separated only by whitespace.
+    """
+
+    def __init__(self, terms: Iterable[str], match_case: bool = False):
+        self.match_case = match_case
+        self.automaton: Automaton[str] = Automaton()
+        for term in terms:
+            tokens = self._tokens(term)
+            if tokens:
+                self.automaton.add(tokens, term)
+        self.automaton.build()
+
+    def _tokens(self, text: str) -> List[str]:
+        words = word_pattern.findall(text)
+        return words if self.match_case else [word.lower() for word in words]
+
+    def matches(self, line: str) -> Iterator[Tuple[int, str]]:
+        """
+        (insertion offset, term) for the leftmost-longest term occurrences in
+        `line`, which may be a whole paragraph.
+        """
+        words = [match for match in word_pattern.finditer(line)]
+        if not words:
+            return
+        tokens = (match.group() if self.match_case else match.group().lower()
+                  for match in words)
+        skipped = [span.span() for span in skipped_pattern.finditer(line)]
+        candidates = sorted(self.automaton.search(tokens), key=lambda m: (m[0], m[0] - m[1]))
+        taken_until = 0
+        for start, end, term in candidates:
+            if start < taken_until:
+                continue
+            first, last = words[start].start(), words[end - 1].end()
+            if any(line[words[i].end():words[i + 1].start()].strip()
+                   for i in range(start, end - 1)):
+                continue
+            if any(begin < last and first < finish for begin, finish in skipped):
+                continue
+            if marker_pattern.match(line, last):
+                continue
+            taken_until = end
+            yield last, term
+
+    def tag_lines(self, lines: Iterable[str], once: bool = False) -> Iterator[str]:
+        """`lines` with markers inserted; with `once`, only at each term's first occurrence."""
+        seen: Set[str] = set()
+        paragraph: List[str] = []
+        for line, fenced in fenced_lines(lines):
+            if fenced or line.startswith('#') or not line.strip():
+                yield from self._tag_paragraph(paragraph, once, seen)
+                paragraph = []
+                yield line
+            else:
+                paragraph.append(line)
+        yield from self._tag_paragraph(paragraph, once, seen)
+
+    def _tag_paragraph(self, paragraph: List[str], once: bool, seen: Set[str]) -> List[str]:
+        """The lines of `paragraph` with markers inserted, matching across line breaks."""
+        text = "".join(paragraph)
+        inserts = []
+        for offset, term in self.matches(text):
+            if once:
+                if term in seen:
+                    continue
+                seen.add(term)
+            inserts.append((offset, marker(term)))
+        if not inserts:
+            return paragraph
+        tagged = []
+        start = 0
+        pending = iter(inserts)
+        insert = next(pending, None)
+        for line in paragraph:
+            end = start + len(line)
+            pieces = []
+            previous = start
+            # A term ends before its line's line break, so its offset is at most `end`:
+            while insert is not None and insert[0] <= end:
+                offset, inserted = insert
+                pieces.append(text[previous:offset])
+                pieces.append(inserted)
+                previous = offset
+                insert = next(pending, None)
+            if pieces:
+                pieces.append(text[previous:end])
+                line = "".join(pieces)
+            tagged.append(line)
+            start = end
+        return tagged
+
+    def tag_file(self, path: Path, once: bool = False) -> int:
+        """Rewrites `path` in place (atomically). Returns the number of markers inserted."""
+        with path.open(encoding='utf-8', newline='') as file:
+            original = file.readlines()
+        tagged = list(self.tag_lines(original, once))
+        added = sum(new.count('{i:') - old.count('{i:')
+                    for old, new in zip(original, tagged) if old is not new)
+        if added:
+            temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with temporary.open('w', encoding='utf-8', newline='') as file:
+                file.writelines(tagged)
+            os.replace(temporary, path)
+        return added
+
+
+def marker(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('"', '\\"')
+    return f'{{i: "{escaped}"}}'
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="""
+    Insert Markua index markers into manuscript files for every term in a
+    curated word and phrase list (by default index_words.txt). Fenced code,
+    inline code, headings and terms that already carry a marker are skipped.
+    Files are rewritten in place.
+    """
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="Markdown files, file patterns (wildcards supported) or directories.",
+    )
+    parser.add_argument(
+        "-t", "--terms",
+        type=Path,
+        default=index_words_file,
+        help=f"Curated list of words and phrases (default: {index_words_file}).",
+    )
+    parser.add_argument(
+        "--match-case",
+        action="store_true",
+        help="Only tag occurrences with the same capitalization as the term.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Only tag the first occurrence of each term in each file.",
+    )
+    args = parser.parse_args(argv)
+
+    paths = expand(args.files)
+    if not paths:
+        parser.error("no markdown files found")
+    tagger = Tagger(load_terms(args.terms), match_case=args.match_case)
+    counts: Dict[Path, int] = {path: tagger.tag_file(path, once=args.once) for path in paths}
+    for path, count in counts.items():
+        if count:
+            print(f"{path}: {count} markers")
+    print(f"Inserted {sum(counts.values())} markers in {len(paths)} files")
+
+
+if __name__ == "__main__":
+    main()
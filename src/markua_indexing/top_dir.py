@@ -5,12 +5,12 @@ project_dir = Path(__file__).parent.parent.parent
 
 class TopDir:
     """
-    Directory off of the project root that is guaranteed to exist.
+    Directory off of the project root. Nothing touches the filesystem until
+    the directory is used: whoever writes into it first creates it.
     """
 
     def __init__(self, subdir_name: str, project_directory: Path = project_dir):
         self.directory: Path = project_directory / subdir_name
-        self.directory.mkdir(parents=True, exist_ok=True)
 
     def __truediv__(self, other: str) -> Path:
         """Used with '/' to specify files within the directory."""
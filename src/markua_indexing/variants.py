@@ -0,0 +1,80 @@
+"""
+Fold variants of a term ("Effect", "effects", "Side Effects.", "mapping",
+"mapped") onto one canonical key, so the index lists each term once, in
+its most common surface form. Keys come from a light suffix stemmer
+(plurals, possessives, -ed and -ing); they are only compared, never shown.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Mapping, Optional
+
+# Distinct terms whose keys are remembered; a book has far fewer
+CACHE_SIZE = 1 << 16
+
+edge_punctuation_pattern = re.compile(r'^[\W_]+|[\W_]+$')
+vowel_pattern = re.compile(r'[aeiouy]')
+# Double consonants undoubled after -ed/-ing ("mapped" -> "map"):
+UNDOUBLED = set("bdfgkmnprt")
+# Shortest stem left by removing -ed or -ing, so "typing" and "typed" aren't "types":
+MIN_STEM = 4
+# Words that only look inflected, kept whole ("lens" isn't "len()", "news" isn't "new"):
+UNCHANGED = frozenset({
+    "alias", "always", "analysis", "atlas", "basis", "bias", "canvas", "chaos", "does",
+    "economics", "ethics", "gas", "has", "lens", "mathematics", "means", "news", "perhaps",
+    "physics", "politics", "series", "species", "statistics", "status", "this", "thus", "was",
+    "yes",
+})
+
+
+def _stem(word: str) -> str:
+    if word in UNCHANGED:
+        return word
+    if word.endswith(("'s", "’s")):
+        word = word[:-2]
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        stem = word[:-len(suffix)]
+        if word.endswith(suffix) and not word.endswith("eed") and len(stem) >= MIN_STEM \
+                and vowel_pattern.search(stem):
+            word = stem
+            if word[-1] == word[-2] and word[-1] in UNDOUBLED:
+                word = word[:-1]
+            break
+    if len(word) > 3 and word[-1] == "e":
+        word = word[:-1]  # "compose" and "composed" meet at "compos"
+    if len(word) > 2 and word[-1] == "y" and word[-2] not in "aeiou":
+        word = word[:-1] + "i"  # "library" and "libraries" meet at "librari"
+    return word
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical(term: str) -> str:
+    """Casefolded, without surrounding punctuation, each word stemmed."""
+    words = edge_punctuation_pattern.sub("", term.casefold()).split()
+    return " ".join(map(_stem, words))
+
+
+def surface_forms(terms: Iterable[str],
+                  counts: Optional[Mapping[str, int]] = None) -> Dict[str, str]:
+    """
+    Maps each of `terms` to the form shown for all of its variants: the
+    one with the highest count, then the shortest, preferring lowercase.
+    """
+    counts = counts or {}
+    best: Dict[str, str] = {}
+    keys: Dict[str, str] = {}
+
+    def preference(form: str):
+        return -counts.get(form, 0), len(form), not form.islower(), form
+
+    for term in terms:
+        key = keys[term] = canonical(term) or term
+        current = best.get(key)
+        if current is None or preference(term) < preference(current):
+            best[key] = term
+    return {term: best[key] for term, key in keys.items()}
@@ -0,0 +1,228 @@
+"""
+Keep index_words.txt live while authors edit: watch the manuscript and
+dictionaries directories (inotify on Linux, polling elsewhere), reprocess
+only the files that changed, and atomically rewrite the output.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from markua_indexing.manuscript import ChapterResult, ManuscriptIndex, index_chapter, index_chapters
+from markua_indexing.markdown_doc import stop_words
+
+# Bursts of saves closer together than this become a single rebuild:
+DEBOUNCE = 0.1  # seconds
+POLL_INTERVAL = 0.25  # seconds
+
+
+class PollingWatcher:
+    """Portable fallback: compares (mtime, size) of every file on each poll."""
+
+    def __init__(self, directories: Iterable[Path], interval: float = POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        state = {}
+        for directory in self.directories:
+            for path in directory.rglob("*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.is_file():
+                    state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Changed, created or deleted files; empty if none within `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._snapshot()
+            changed = {path for path in state.keys() | self._state.keys()
+                       if state.get(path) != self._state.get(path)}
+            self._state = state
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            pause = self.interval
+            if deadline is not None:
+                pause = min(pause, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify through libc; no third-party dependency."""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    event_header = struct.Struct("iIII")
+
+    def __init__(self, directories: Iterable[Path]):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, Path] = {}
+        self.directories = list(directories)
+        for directory in self.directories:
+            self._watch_tree(directory)
+
+    def _watch_tree(self, directory: Path) -> None:
+        for path in [directory, *(p for p in directory.rglob("*") if p.is_dir())]:
+            descriptor = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(path), self.MASK)
+            if descriptor < 0:
+                raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+            self._directories[descriptor] = path
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Changed, created or deleted files; empty if none within `timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[Path] = set()
+        buffer = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            descriptor, mask, _, length = self.event_header.unpack_from(buffer, offset)
+            offset += self.event_header.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost: report everything so nothing stays stale
+                for directory in self.directories:
+                    changed.update(p for p in directory.rglob("*") if p.is_file())
+                continue
+            directory = self._directories.get(descriptor)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._watch_tree(path)
+                    changed.update(p for p in path.rglob("*") if p.is_file())
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def open_watcher(directories: Iterable[Path]):
+    """An InotifyWatcher where the OS supports it, otherwise a PollingWatcher."""
+    directories = list(directories)
+    try:
+        return InotifyWatcher(directories)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(directories)
+
+
+def debounced(watcher, quiet: float = DEBOUNCE) -> Iterator[Set[Path]]:
+    """Batches of changes, each one closed once no change arrives for `quiet` seconds."""
+    while True:
+        changed = watcher.wait()
+        while True:
+            more = watcher.wait(quiet)
+            if not more:
+                break
+            changed |= more
+        yield changed
+
+
+class LiveIndex:
+    """
+    Per-chapter results kept resident, so a change reprocesses only the
+    touched chapters, and a dictionary change only re-filters the words
+    already extracted. With `fold`, variants of a term are listed once
+    (see ManuscriptIndex.fold_variants).
+    """
+
+    def __init__(self, files: Iterable[Path], directories: Iterable[Path],
+                 suffixes: Iterable[str], output: Path, workers: Optional[int] = None,
+                 fold: bool = False):
+        self.files = {path.resolve() for path in files}
+        self.directories = [directory.resolve() for directory in directories]
+        self.suffixes = set(suffixes)
+        self.output = output
+        self.fold = fold
+        self.chapters: Dict[Path, ChapterResult] = {
+            chapter.path: chapter
+            for chapter in index_chapters(sorted(self.files), workers=workers, counts=fold)}
+
+    def is_chapter(self, path: Path) -> bool:
+        return path in self.files or (
+            path.suffix in self.suffixes
+            and any(path.is_relative_to(directory) for directory in self.directories))
+
+    def update(self, changed: Iterable[Path]) -> bool:
+        """Reprocesses the `changed` chapters and dictionaries. True if the index changed."""
+        updated = False
+        for path in changed:
+            path = path.resolve()
+            if path.parent == stop_words.directory.resolve() and path.suffix == ".txt":
+                updated |= self.refilter()
+            elif self.is_chapter(path):
+                if path.is_file():
+                    self.chapters[path] = index_chapter(path, counts=self.fold)
+                    updated = True
+                elif self.chapters.pop(path, None) is not None:
+                    updated = True
+        return updated
+
+    def refilter(self) -> bool:
+        if not stop_words.refresh():
+            return False
+        for path, chapter in self.chapters.items():
+            self.chapters[path] = replace(
+                chapter,
+                index_phrases=frozenset(stop_words.remove_from(chapter.italicized_phrases)),
+                index_words=frozenset(stop_words.remove_from(chapter.unique_words)))
+        return True
+
+    def manuscript(self) -> ManuscriptIndex:
+        manuscript = ManuscriptIndex()
+        for chapter in self.chapters.values():
+            manuscript.merge(chapter)
+        return manuscript
+
+    def write(self) -> None:
+        manuscript = self.manuscript()
+        if self.fold:
+            manuscript = manuscript.fold_variants()
+        manuscript.write(self.output)
+
+    def watch(self, watcher=None, quiet: float = DEBOUNCE) -> None:
+        """Rewrites the output after each debounced batch of changes, until interrupted."""
+        watched: List[Path] = [*self.directories,
+                               *{path.parent for path in self.files},
+                               stop_words.directory.resolve()]
+        watcher = watcher or open_watcher(dict.fromkeys(watched))
+        try:
+            for changed in debounced(watcher, quiet):
+                started = time.perf_counter()
+                if self.update(changed):
+                    self.write()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    print(f"Rewrote {self.output} in {elapsed:.0f} ms", flush=True)
+        finally:
+            watcher.close()
@@ -0,0 +1,108 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+import pytest
+from markua_indexing.archives import is_archive, members
+from markua_indexing.cache import ResultCache
+from markua_indexing.cli import main
+from markua_indexing.manuscript import index_chapters, index_manuscript
+
+CHAPTERS = {
+    "manuscript/ch1.md": "A *Kleisli arrow* composes.\n\n```\nignored_identifier\n```\n",
+    "manuscript/ch2.markua": "Functors map.\nMonads *zygomorphism*.\n",
+    "manuscript/ch3.md": "Catamorphisms fold.\n",
+}
+OTHERS = {
+    "manuscript/images/cover.png": "not text",
+    "__MACOSX/manuscript/._ch1.md": "resource fork",
+}
+
+
+def write_tar(path: Path, files: dict) -> Path:
+    with tarfile.open(path, "w:gz") as archive:
+        for name, text in files.items():
+            data = text.encode('utf-8')
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+def write_zip(path: Path, files: dict) -> Path:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return path
+
+
+@pytest.fixture(params=["book.zip", "book.tar.gz"])
+def archive(request: pytest.FixtureRequest, tmp_path: Path) -> Path:
+    write = write_zip if request.param.endswith(".zip") else write_tar
+    return write(tmp_path / request.param, {**CHAPTERS, **OTHERS})
+
+
+@pytest.fixture
+def unpacked(tmp_path: Path) -> list[Path]:
+    paths = []
+    for name, text in CHAPTERS.items():
+        path = tmp_path / "unpacked" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def test_is_archive() -> None:
+    assert is_archive(Path("book.zip")) and is_archive(Path("Book.TAR.GZ"))
+    assert not is_archive(Path("chapter.md")) and not is_archive(Path("notes.gz"))
+
+
+def test_members_are_only_manuscript_files(archive: Path) -> None:
+    found = {path: content for path, content in members(archive)}
+    assert found == {archive / name: text.encode('utf-8') for name, text in CHAPTERS.items()}
+
+
+def test_tar_is_read_as_one_stream(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = write_tar(tmp_path / "book.tgz", CHAPTERS)
+    modes = []
+    tar_open = tarfile.open
+
+    def opened(*args, mode: str = 'r', **kwargs):
+        modes.append(mode)
+        return tar_open(*args, mode=mode, **kwargs)
+    monkeypatch.setattr(tarfile, "open", opened)
+    assert len(list(members(path))) == 3
+    assert modes == ['r|*']
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_archive_indexes_like_unpacked_files(archive: Path, unpacked: list[Path],
+                                             workers: int) -> None:
+    expected = index_manuscript(unpacked, workers=1, extractors=["code"])
+    found = index_manuscript([archive], workers=workers, extractors=["code"])
+    assert found == expected
+    assert {'Kleisli arrow', 'zygomorphism'} <= found.index_phrases
+    assert 'ignored_identifier' not in found.unique_words
+
+
+def test_archive_and_files_together(archive: Path, unpacked: list[Path]) -> None:
+    paths = {chapter.path for chapter in index_chapters([archive, unpacked[0]], workers=2,
+                                                          positions=True)}
+    assert paths == {archive / name for name in CHAPTERS} | {unpacked[0]}
+
+
+def test_archive_members_are_cached(archive: Path, tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    first = list(index_chapters([archive], workers=1, cache=cache, positions=True))
+    again = list(index_chapters([archive], workers=1, cache=cache, positions=True))
+    assert len(list((tmp_path / "cache").iterdir())) == 3
+    assert sorted(chapter.path for chapter in again) == sorted(chapter.path for chapter in first)
+    assert [chapter.postings.files for chapter in again] == [[chapter.path] for chapter in again]
+
+
+def test_cli_reads_archives(archive: Path, tmp_path: Path) -> None:
+    output = tmp_path / "index_words.txt"
+    main([str(archive), "--no-cache", "--output", str(output)])
+    text = output.read_text(encoding='utf-8')
+    assert "Kleisli arrow" in text and "Catamorphisms" in text
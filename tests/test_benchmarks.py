@@ -0,0 +1,42 @@
+from pathlib import Path
+from benchmarks.run import measure, regressions, size_label
+from benchmarks.synthetic import BookSpec, parse_size, write_book
+
+
+def test_books_are_reproducible(tmp_path: Path) -> None:
+    first = write_book(BookSpec(20_000, seed=7), tmp_path / "first.md")
+    second = write_book(BookSpec(20_000, seed=7), tmp_path / "second.md")
+    other = write_book(BookSpec(20_000, seed=8), tmp_path / "other.md")
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+    assert 20_000 <= first.stat().st_size < 25_000
+
+
+def test_densities(tmp_path: Path) -> None:
+    plain = write_book(BookSpec(20_000, fence_density=0, emphasis_density=0),
+                       tmp_path / "plain.md").read_text(encoding='utf-8')
+    dense = write_book(BookSpec(20_000, fence_density=1, emphasis_density=0.2),
+                       tmp_path / "dense.md").read_text(encoding='utf-8')
+    assert "```" not in plain and "*" not in plain.replace("* factor", "")
+    assert dense.count("```") > 10 and dense.count("*") > 100
+
+
+def test_sizes() -> None:
+    assert parse_size("10K") == 10 * 1024
+    assert parse_size("1.5MB") == 3 * 512 * 1024
+    assert parse_size("123") == 123
+    assert size_label(500 * 1024 ** 2) == "500M"
+
+
+def test_measure_runs_in_a_child_process(tmp_path: Path) -> None:
+    book = write_book(BookSpec(5_000), tmp_path / "book.md")
+    seconds, peak = measure(book, "markdown_doc", repeat=1)
+    assert seconds > 0 and peak > 0
+
+
+def test_regressions() -> None:
+    baseline = {"1M:scan": {"mb_per_s": 10.0, "peak_rss_mb": 100.0}}
+    assert regressions({"1M:scan": {"mb_per_s": 9.0, "peak_rss_mb": 110.0}}, baseline) == []
+    slow = regressions({"1M:scan": {"mb_per_s": 5.0, "peak_rss_mb": 200.0}}, baseline)
+    assert len(slow) == 2
+    assert regressions({"10M:scan": {"mb_per_s": 0.1, "peak_rss_mb": 1.0}}, baseline) == []
@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+import pytest
+from markua_indexing import cache as cache_module, manuscript
+from markua_indexing.cache import ResultCache
+from markua_indexing.manuscript import index_manuscript
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResultCache:
+    return ResultCache(tmp_path / "cache")
+
+
+def test_key_depends_on_content_and_fingerprint() -> None:
+    assert ResultCache.key(b"text", "a") == ResultCache.key(b"text", "a")
+    assert ResultCache.key(b"text", "a") != ResultCache.key(b"text!", "a")
+    assert ResultCache.key(b"text", "a") != ResultCache.key(b"text", "b")
+
+
+def test_key_depends_on_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    before = ResultCache.key(b"text", "a")
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    assert ResultCache.key(b"text", "a") != before
+
+
+def test_round_trip(cache: ResultCache) -> None:
+    assert cache.get("missing") is None
+    cache.put("key", {'Monads'})
+    assert cache.get("key") == {'Monads'}
+
+
+def test_trim_evicts_least_recently_used(cache: ResultCache) -> None:
+    for n, key in enumerate(["old", "used", "new"]):
+        cache.put(key, "x" * 1000)
+        entry = cache.directory / f"{key}.pickle"
+        os.utime(entry, ns=(n * 10**9, n * 10**9))
+    cache.get("used")  # Most recently used now
+    cache.limit = 2500
+    assert cache.trim() == 1
+    assert cache.get("old") is None
+    assert cache.get("used") is not None
+    assert cache.get("new") is not None
+
+
+def test_manuscript_reprocesses_only_changed_files(
+        cache: ResultCache, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"chapter{n}.md"
+        path.write_text(f"Monads chapter{n}\n", encoding='utf-8')
+        paths.append(path)
+    processed = []
+    index_chapter = manuscript.index_chapter
+    monkeypatch.setattr(manuscript, "index_chapter",
+                        lambda path, *args: processed.append(path)
+                        or index_chapter(path, *args))
+
+    first = index_manuscript(paths, workers=1, cache=cache)
+    assert len(processed) == 3
+    paths[1].write_text("Functors chapter1\n", encoding='utf-8')
+    processed.clear()
+    second = index_manuscript(paths, workers=1, cache=cache)
+    assert processed == [paths[1]]
+    assert 'Functors' in second.index_words
+    assert first.index_words - second.index_words == set()
@@ -0,0 +1,43 @@
+import random
+from pathlib import Path
+from markua_indexing.cli import main
+from markua_indexing.clusters import DeletionIndex, allowed_edits, clusters, distance
+
+
+def test_distance() -> None:
+    assert distance("composability", "composibility", 2) == 1
+    assert distance("short-circuiting", "short circuiting", 2) == 1
+    assert distance("monad", "mnoad", 2) == 1  # Transposition
+    assert distance("kitten", "sitting", 3) == 3
+    assert distance("kitten", "sitting", 1) == 2  # Over the limit
+
+
+def test_clusters() -> None:
+    terms = ["composability", "composibility", "Short-circuiting", "short circuiting",
+             "monad", "nomad", "Functor"]
+    counts = {"composibility": 1, "composability": 4, "Short-circuiting": 2}
+    assert clusters(terms, counts) == [["composability", "composibility"],
+                                       ["Short-circuiting", "short circuiting"]]
+
+
+def test_deletion_index_finds_every_near_pair() -> None:
+    rng = random.Random(1)
+    terms = ["".join(rng.choice("abc") for _ in range(rng.randint(6, 13))) for _ in range(300)]
+    index = DeletionIndex(terms)
+    keys = index.terms
+    for i, a in enumerate(keys):
+        expected = set()
+        for j, b in enumerate(keys):
+            limit = min(allowed_edits(a), allowed_edits(b))
+            if i != j and distance(a, b, limit) <= limit:
+                expected.add(j)
+        assert {other for other, _ in index.near(i)} == expected
+
+
+def test_cli_writes_clusters(tmp_path: Path) -> None:
+    (tmp_path / "a.md").write_text("Composability matters. Composability again, "
+                                   "but composibility is a typo.\n", encoding='utf-8')
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path / "a.md"), "--no-cache", "--clusters", "--output", str(output)])
+    lines = (tmp_path / "clusters.txt").read_text(encoding='utf-8').splitlines()
+    assert lines[1:] == ["Composability\tcomposibility"]
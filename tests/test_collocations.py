@@ -0,0 +1,96 @@
+import io
+import sys
+from pathlib import Path
+import pytest
+from markua_indexing.cli import main
+from markua_indexing.collocations import Collocations, CountMinSketch, log_likelihood
+from markua_indexing.manuscript import index_manuscript
+from markua_indexing.markdown_doc import stop_words
+
+TEXT = """
+We use dependency injection here. Dependency injection decouples modules,
+so with dependency injection every module is tested alone; the test suite
+checks each module in the same way.
+
+```
+dependency injection in code
+```
+
+Pure functions, pure data and pure joy: a type class is not a class, but a type
+class helps, and type class instances compose.
+"""
+# A book's worth of other words, so "dependency" isn't as common as "the":
+FILLER = "".join(f"Zork{n} blorp{n % 7} quux{n % 11}.\n" for n in range(1000))
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_scored(vectorized: bool) -> None:
+    collocations = Collocations(vectorized=vectorized)
+    collocations.add((TEXT + FILLER).splitlines(keepends=True))
+    stop_words.refresh()
+    found = collocations.scored(excludes=stop_words.excludes)
+    assert found[0][0] == "dependency injection"
+    assert found[0][2] == 3
+    assert "type class" not in [phrase for phrase, _, _ in found]  # Both stop words
+    assert collocations.count(["injection"]) == 3  # Not in the fenced code
+
+
+def test_emphasis_markers_are_not_words() -> None:
+    collocations = Collocations(vectorized=False)
+    collocations.add(["We use _dependency injection_ and *dependency injection*,\n",
+                      "so __dependency injection__ is dependency injection.\n",
+                      "* injection\n", "* dependency\n"])
+    assert collocations.count(["dependency", "injection"]) == 4
+    assert collocations.count(["injection", "dependency"]) == 0  # Bullets end n-grams
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_chapters_merge_into_one_count(tmp_path: Path, workers: int) -> None:
+    # Twice in each chapter, under the minimum count, but 4 times in the book:
+    text = "We use dependency injection. Dependency injection decouples.\n"
+    paths = []
+    for n in range(2):
+        path = tmp_path / f"ch{n}.md"
+        path.write_text(text + FILLER, encoding='utf-8')
+        paths.append(path)
+    whole = Collocations()
+    whole.add((2 * (text + FILLER)).splitlines(keepends=True))
+    merged = index_manuscript(paths, workers=workers, collocations=True).collocations
+    assert merged.count(["dependency", "injection"]) == 4
+    assert merged.tokens == whole.tokens
+    assert merged.scored(5) == whole.scored(5)
+
+
+def test_sketch_never_undercounts() -> None:
+    sketch = CountMinSketch(width=1 << 4, depth=3, vectorized=False)
+    keys = [(key * 0x9E3779B97F4A7C15) % (1 << 64) for key in range(100)]
+    sketch.update(keys)
+    sketch.update(keys[:10])
+    assert all(sketch[key] >= 2 for key in keys[:10])
+    assert all(sketch[key] >= 1 for key in keys)
+    other = CountMinSketch(width=1 << 4, depth=3)
+    other.update(keys[:10])
+    sketch.merge(other)
+    assert all(sketch[key] >= 3 for key in keys[:10])
+
+
+def test_log_likelihood() -> None:
+    assert log_likelihood(1, 100, 100, 10_000) == 0.0  # As often as chance
+    assert log_likelihood(50, 60, 55, 10_000) > log_likelihood(5, 60, 55, 10_000) > 0
+
+
+def test_cli_writes_collocations(tmp_path: Path) -> None:
+    (tmp_path / "a.md").write_text(TEXT + FILLER, encoding='utf-8')
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path / "a.md"), "--no-cache", "--collocations", "5", "--output", str(output)])
+    lines = (tmp_path / "collocations.txt").read_text(encoding='utf-8').splitlines()
+    assert lines[0] == "# phrase\tscore\tcount"
+    assert "dependency injection" in [line.split("\t")[0] for line in lines[1:]]
+
+
+def test_cli_mines_stdin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(sys, "stdin", io.StringIO(TEXT + FILLER))
+    output = tmp_path / "index_words.txt"
+    main(["-", "--collocations", "5", "--output", str(output)])
+    lines = (tmp_path / "collocations.txt").read_text(encoding='utf-8').splitlines()
+    assert "dependency injection" in [line.split("\t")[0] for line in lines[1:]]
@@ -0,0 +1,67 @@
+from pathlib import Path
+from markua_indexing.cli import main
+from markua_indexing.concordance import round_robin, snippet
+from markua_indexing.manuscript import index_manuscript
+from markua_indexing.markdown_doc import MarkdownDoc
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_snippet_trims_long_lines() -> None:
+    line = "x " * 40 + "the Monad laws " + "y " * 40
+    text = snippet(line, line.index("Monad"), 5, width=10)
+    assert text == "…x x x the Monad laws y y…"
+    assert snippet("Monad\n", 0, 5) == "Monad"
+
+
+def test_snippets_per_term_are_bounded(tmp_path: Path) -> None:
+    path = write(tmp_path / "ch.md", "".join(f"Monad number {n}\n" for n in range(50)))
+    concordance = MarkdownDoc(path, concordance=2).concordance
+    assert [line for _, line, _ in concordance.snippets('Monad')] == [1, 2]
+    assert concordance.ranked()[0] == 'Monad'
+    assert 'number' not in concordance  # A stop word
+
+
+def test_italic_phrases_across_lines(tmp_path: Path) -> None:
+    path = write(tmp_path / "ch.md", "First line\nwith *side\neffects* here\n\nNext *one*\n")
+    concordance = MarkdownDoc(path, concordance=3).concordance
+    assert concordance.snippets('side effects') == [(path, 2, "with *side")]
+
+
+def test_italicized_word_is_one_use(tmp_path: Path) -> None:
+    path = write(tmp_path / "ch.md", "The *Monad* binds.\n")
+    concordance = MarkdownDoc(path, concordance=3).concordance
+    assert concordance.snippets('Monad') == [(path, 1, "The *Monad* binds.")]
+    output = tmp_path / "concordance.txt"
+    concordance.write(output)
+    assert "Monad (1 file, 1 use)" in output.read_text(encoding='utf-8').splitlines()
+
+
+def test_round_robin_prefers_spread() -> None:
+    snippets = [(0, 1, "a"), (0, 2, "b"), (0, 3, "c"), (1, 1, "d"), (2, 5, "e")]
+    assert round_robin(snippets, 3) == [(0, 1, "a"), (1, 1, "d"), (2, 5, "e")]
+    assert round_robin(snippets, 4) == [(0, 1, "a"), (0, 2, "b"), (1, 1, "d"), (2, 5, "e")]
+
+
+def test_manuscript_ranks_by_chapter_spread(tmp_path: Path) -> None:
+    paths = [write(tmp_path / "a.md", "Functor Functor Functor\nMonad\n"),
+             write(tmp_path / "b.md", "Monad\n")]
+    concordance = index_manuscript(paths, workers=1, concordance=3).concordance
+    assert concordance.ranked()[:2] == ['Monad', 'Functor']
+    assert {file.name for file, _, _ in concordance.snippets('Monad')} == {"a.md", "b.md"}
+
+
+def test_cli_writes_report(tmp_path: Path) -> None:
+    write(tmp_path / "a.md", "Monads compose, and a monad binds.\n")
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path / "a.md"), "--no-cache", "--concordance", "--fold-variants", "--output",
+          str(output)])
+    report = (tmp_path / "concordance.txt").read_text(encoding='utf-8')
+    heading, first, second = report.splitlines()[:3]
+    # "Monads" and "monad" are used once each, so the shorter form names both:
+    assert heading == "monad (1 file, 2 uses)"
+    assert first.endswith("a.md:1: Monads compose, and a monad binds.")
+    assert second.endswith("a.md:1: Monads compose, and a monad binds.")
@@ -0,0 +1,75 @@
+import time
+from typing import Callable, List, Tuple
+import pytest
+from markua_indexing.emphasis import code_spans, emphasis_spans, phrases
+
+
+def found(text: str) -> List[Tuple[str, bool]]:
+    return [(phrase, strong) for _, phrase, strong in phrases(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a *Monad* here", [("Monad", False)]),
+    ("a _Monad_ here", [("Monad", False)]),
+    ("**bold** text", [("bold", True)]),
+    ("***both***", [("both", False), ("both", True)]),
+    ("*outer **inner** outer*", [("outer inner outer", False), ("inner", True)]),
+    ("snake_case_name and foo*bar*", [("bar", False)]),
+    ("an \\*escaped\\* star", []),
+    ("`code *not* emphasis` but *this*", [("this", False)]),
+    ("* not emphasis *", []),
+    ("*a\nb*", [("a b", False)]),
+    ("2 * 3 * 4", []),
+    ("*unclosed and _also", []),
+    ("_(parenthesized)_", [("(parenthesized)", False)]),
+])
+def test_commonmark_rules(text: str, expected: List[Tuple[str, bool]]) -> None:
+    assert found(text) == expected
+
+
+def test_offsets_point_at_opening_delimiter() -> None:
+    assert [offset for offset, _, _ in phrases("ab *cd* **ef**")] == [3, 8]
+
+
+def test_code_spans() -> None:
+    assert code_spans("a `b` ``c ` d`` and ` e ` `unclosed") == [(3, "b"), (8, "c ` d"), (22, "e")]
+    assert code_spans("``\nx\n``") == [(3, "x")]
+
+
+def test_long_spans_are_not_phrases() -> None:
+    sentence = "*" + "word " * 40 + "end*"
+    assert emphasis_spans(sentence)
+    assert phrases(sentence) == []
+
+
+def best_time(function: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@pytest.mark.parametrize("unit", [
+    "*a ",  # Openers that never close
+    " a*",  # Closers that never open
+    "_",  # One huge run
+    "*_",  # Alternating kinds
+    "**a* ",  # Rule-of-3 mismatches
+    "a_b ",  # Intraword underscores
+    "`*",  # Unmatched backticks among delimiters
+    "*a _b ",  # Interleaved unclosed openers of both kinds
+])
+def test_adversarial_input_is_linear(unit: str) -> None:
+    small, large = unit * 4_000, unit * 32_000
+    ratio = best_time(lambda: phrases(large)) / best_time(lambda: phrases(small))
+    # 8x the input: a quadratic extractor would take ~64x as long
+    assert ratio < 20, f"{unit!r}: {ratio:.1f}x slower for 8x the input"
+
+
+def test_nested_input_is_linear() -> None:
+    def nested(n: int) -> str:
+        return "*a " * n + "b" + " c*" * n
+    ratio = best_time(lambda: phrases(nested(40_000))) / best_time(lambda: phrases(nested(5_000)))
+    assert ratio < 20
@@ -0,0 +1,84 @@
+from pathlib import Path
+import pytest
+from markua_indexing import markdown_doc
+from markua_indexing.cli import main
+from markua_indexing.extractors import EXTRACTORS, Extractor, create, register
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.scanner import HEADING, WORD, Token
+
+CHAPTER = """\
+# Zygohistomorphic Prepromorphisms {#zygo}
+
+A **Kleisli arrow** is *italic*, and `fmap` or `x + 1` is code.
+
+Catamorphism
+: folds a structure
+
+```
+# not a heading, **not bold**
+```
+"""
+
+
+@pytest.fixture
+def chapter(tmp_path: Path) -> Path:
+    path = tmp_path / "chapter.md"
+    path.write_text(CHAPTER, encoding='utf-8')
+    return path
+
+
+def test_built_in_extractors(chapter: Path) -> None:
+    doc = MarkdownDoc(chapter, extractors=["bold", "headings", "definitions", "code"])
+    assert doc.extracted == {
+        "bold": frozenset({"Kleisli arrow"}),
+        "headings": frozenset({"Zygohistomorphic Prepromorphisms"}),
+        "definitions": frozenset({"Catamorphism"}),
+        "code": frozenset({"fmap"}),
+    }
+    assert doc.index_phrases == frozenset({"italic"})
+
+
+def test_one_pass_serves_every_result(chapter: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    scans = []
+    scan = markdown_doc.scan
+
+    def counted(*args, **kwargs):
+        scans.append(kwargs.get("kinds"))
+        return scan(*args, **kwargs)
+    monkeypatch.setattr(markdown_doc, "scan", counted)
+    doc = MarkdownDoc(chapter, extractors=["bold", "headings"])
+    assert doc.extracted["bold"] == frozenset({"Kleisli arrow"})
+    assert "Kleisli" in doc.index_words
+    assert doc.index_phrases == frozenset({"italic"})
+    assert len(scans) == 1
+
+
+def test_custom_extractor(chapter: Path) -> None:
+    @register
+    class CapitalizedWords(Extractor):
+        name = "capitalized"
+        title = "Capitalized Words"
+        kinds = frozenset({WORD})
+
+        def add(self, token: Token) -> None:
+            if token.text[0].isupper():
+                self.found.add(token.text)
+    try:
+        doc = MarkdownDoc(chapter, extractors=["capitalized"])
+        assert doc.extracted["capitalized"] >= {"Kleisli", "Catamorphism"}
+    finally:
+        del EXTRACTORS["capitalized"]
+
+
+def test_unknown_extractor() -> None:
+    with pytest.raises(ValueError, match="unknown extractors: nope"):
+        create(["headings", "nope"])
+    assert [extractor.kinds for extractor in create(["headings"])] == [frozenset({HEADING})]
+
+
+def test_cli_writes_a_section_per_extractor(chapter: Path, tmp_path: Path) -> None:
+    output = tmp_path / "out" / "index_words.txt"
+    main([str(chapter), "--no-cache", "--extract", "headings,code", "--output", str(output)])
+    text = output.read_text(encoding='utf-8')
+    assert text.endswith("\n\nHeadings:\nZygohistomorphic Prepromorphisms"
+                         "\n\nCode Identifiers:\nfmap")
@@ -0,0 +1,99 @@
+import io
+import time
+from pathlib import Path
+from markua_indexing.language_server import (HINT, INFORMATION, Document, LanguageServer, blocks,
+                                             read_message, write_message)
+
+CHAPTER = """# Monads
+
+Monads compose, and *side effects* wait.
+
+```
+Functor in code
+```
+
+A Functor maps{i: "Functor"}.
+"""
+
+
+def open_message(uri: str, text: str) -> dict:
+    return {"jsonrpc": "2.0", "method": "textDocument/didOpen",
+            "params": {"textDocument": {"uri": uri, "version": 1, "text": text}}}
+
+
+def change_message(uri: str, version: int, line: int, start: int, end: int, text: str) -> dict:
+    return {"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {
+        "textDocument": {"uri": uri, "version": version},
+        "contentChanges": [{"range": {"start": {"line": line, "character": start},
+                                      "end": {"line": line, "character": end}},
+                            "text": text}]}}
+
+
+def messages(diagnostics: list) -> dict:
+    return {d["message"]: (d["range"]["start"]["line"], d["range"]["start"]["character"],
+                           d["severity"]) for d in diagnostics}
+
+
+def test_blocks() -> None:
+    lines = CHAPTER.splitlines(keepends=True)
+    assert [(start, len(found), fenced) for start, found, fenced in blocks(lines)] == [
+        (0, 1, False), (2, 1, False), (4, 3, True), (8, 1, False)]
+
+
+def test_diagnostics() -> None:
+    server = LanguageServer(terms=["Monad"])
+    server.handle(open_message("file:///a.md", CHAPTER))
+    [published] = server.handle(open_message("file:///b.md", "Functors everywhere.\n"))
+    assert published["params"]["uri"] == "file:///b.md"
+    assert messages(published["params"]["diagnostics"]) == {
+        '"Functors" is indexed elsewhere but not here': (0, 0, INFORMATION)}
+    found = messages(server.diagnostics(server.documents["file:///a.md"]))
+    assert found['New candidate term "side effects"'] == (2, 20, HINT)
+    assert not any("Monads" in message for message in found)  # In the index list
+    assert not any("Functor" in message for message in found)  # Marked here
+
+
+def test_edits_reextract_only_changed_paragraphs() -> None:
+    text = "".join(f"Paragraph {n} about Zorblax{n}.\n\n" for n in range(2000))
+    server = LanguageServer()
+    server.handle(open_message("file:///big.md", text))
+    document = server.documents["file:///big.md"]
+    started = time.perf_counter()
+    [published] = server.handle(change_message("file:///big.md", 2, 10, 0, 9, "Section"))
+    elapsed = time.perf_counter() - started
+    assert document.reindexed == 1
+    assert document.lines[10] == "Section 5 about Zorblax5.\n"
+    assert published["params"]["version"] == 2
+    assert elapsed < 0.5  # About 10 ms; generous for slow CI machines
+    server.handle(change_message("file:///big.md", 3, 10, 25, 25, "\n\nNew Quuxify here."))
+    assert document.reindexed == 1  # Only the new paragraph
+    assert 'New candidate term "Quuxify"' in messages(server.diagnostics(document))
+
+
+def test_utf16_positions() -> None:
+    document = Document("file:///c.md", "😀 Monad\n")
+    document.change([{"range": {"start": {"line": 0, "character": 3},
+                                "end": {"line": 0, "character": 8}}, "text": "Functor"}])
+    assert document.lines == ["😀 Functor\n"]
+
+
+def test_protocol_round_trip() -> None:
+    stream = io.BytesIO()
+    write_message(stream, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+    stream.seek(0)
+    request = read_message(stream)
+    server = LanguageServer()
+    [reply] = server.handle(request)
+    assert reply["id"] == 1 and reply["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+    assert read_message(stream) is None
+
+
+def test_workspace_markers(tmp_path: Path) -> None:
+    (tmp_path / "other.md").write_text('Closures{i: "closure"} close.\n', encoding='utf-8')
+    server = LanguageServer()
+    server.handle({"jsonrpc": "2.0", "id": 1, "method": "initialize",
+                   "params": {"rootUri": tmp_path.as_uri(),
+                              "initializationOptions": {"terms": str(tmp_path / "none.txt")}}})
+    [published] = server.handle(open_message("file:///new.md", "A closure.\n"))
+    assert messages(published["params"]["diagnostics"]) == {
+        '"closure" is indexed elsewhere but not here': (0, 2, INFORMATION)}
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from markua_indexing.cli import defence, main
+from markua_indexing.manuscript import index_manuscript
+from markua_indexing.top_dir import TopDir
+
+
+@pytest.fixture
+def chapters(tmp_path: Path) -> list[Path]:
+    texts = [
+        "Monads compose.\n\n```\nignored_identifier\n```\n",
+        "Functors map.\nMonads bind.\n",
+        "Nothing but stop words: the and a.\n",
+    ]
+    paths = []
+    for n, text in enumerate(texts):
+        path = tmp_path / f"chapter{n}.md"
+        path.write_text(text, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def test_merges_chapter_sets(chapters: list[Path]) -> None:
+    manuscript = index_manuscript(chapters, workers=1)
+    assert {'Monads', 'Functors'} <= manuscript.index_words
+    assert 'ignored_identifier' not in manuscript.unique_words
+    assert 'the' not in manuscript.index_words
+
+
+def test_process_pool_matches_serial(chapters: list[Path]) -> None:
+    assert index_manuscript(chapters, workers=2) == index_manuscript(chapters, workers=1)
+
+
+def test_cli_writes_index_file(chapters: list[Path], tmp_path: Path) -> None:
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path / "*.md"), "--workers", "2", "--output", str(output)])
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == "Index Words:"
+    assert lines.index('Functors') < lines.index('Monads')
+
+
+def test_import_has_no_side_effects(tmp_path: Path) -> None:
+    # Options most runs don't use mustn't slow down every run's start-up
+    code = ("import sys, markua_indexing.cli; "
+            "print(sorted({'concurrent.futures', 'dataclasses', 'json', 'numpy', 'tracemalloc', "
+            "'tarfile', 'zipfile', 'markua_indexing.watch', 'markua_indexing.streaming', "
+            "'markua_indexing.archives', 'markua_indexing.cache', 'markua_indexing.clusters', "
+            "'markua_indexing.collocations', 'markua_indexing.concordance', "
+            "'markua_indexing.extractors', 'markua_indexing.markdown_doc', "
+            "'markua_indexing.manuscript', 'markua_indexing.postings', "
+            "'markua_indexing.profiling'} & set(sys.modules)))")
+    src = Path(__file__).parent.parent / "src"
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True,
+                            text=True, check=True, env={**os.environ, "PYTHONPATH": str(src)})
+    assert result.stdout.strip() == "[]"
+    assert not TopDir("never_used", tmp_path).directory.exists()
+
+
+def test_cli_defaults_match_the_modules() -> None:
+    # The CLI spells them out so as not to import the modules up front
+    from markua_indexing import cache, cli, clusters, collocations, concordance, markdown_doc
+    assert markdown_doc.index_words_file.parts[-2:] == cli.DEFAULT_OUTPUT.parts
+    assert cli.DEFAULT_CACHE_LIMIT_MB * 1024 * 1024 == cache.DEFAULT_LIMIT
+    assert cli.DEFAULT_CONCORDANCE_K == concordance.DEFAULT_K
+    assert cli.DEFAULT_CLUSTER_DISTANCE == clusters.DEFAULT_DISTANCE
+    assert cli.DEFAULT_COLLOCATIONS_TOP == collocations.DEFAULT_TOP
+
+
+def test_write_creates_output_directory(chapters: list[Path], tmp_path: Path) -> None:
+    output = tmp_path / "new" / "index_words.txt"
+    index_manuscript(chapters, workers=1).write(output)
+    assert "Monads" in output.read_text(encoding='utf-8').split()
+
+
+def test_defence(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("Text\n```\ncode\n```\nMore\n", encoding='utf-8')
+    defence([str(path)])
+    defence([str(tmp_path)])  # Doesn't de-fence its own output
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ch.md", "ch_de_fenced.md"]
+    assert "code" not in (tmp_path / "ch_de_fenced.md").read_text(encoding='utf-8')
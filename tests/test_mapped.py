@@ -0,0 +1,70 @@
+from pathlib import Path
+import pytest
+from benchmarks.synthetic import BookSpec, write_book
+from markua_indexing.mapped import extract_mapped
+from markua_indexing.markdown_doc import MarkdownDoc, extract
+
+CHAPTER = """\
+# Café *Monad*
+
+A _side
+effects_ paragraph — naïve 42 snake_case.
+
+```scala
+val hidden_word = "*nope*"
+```
+**bold** and *italic*
+"""
+
+
+def both(path: Path):
+    with path.open(encoding='utf-8') as lines:
+        return extract_mapped(path), extract(lines)
+
+
+def test_matches_line_scanner(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text(CHAPTER, encoding='utf-8')
+    mapped, scanned = both(path)
+    assert mapped == scanned
+    phrases, words = mapped
+    assert {'Monad', 'side effects', 'italic'} == phrases
+    assert {'Café', 'naïve', 'snake_case'} <= words
+    assert 'hidden_word' not in words and '42' not in words
+
+
+def test_matches_line_scanner_on_synthetic_book(tmp_path: Path) -> None:
+    path = write_book(BookSpec(200_000, emphasis_density=0.1), tmp_path / "book.md")
+    mapped, scanned = both(path)
+    assert mapped == scanned
+
+
+def test_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+    assert extract_mapped(path) == (frozenset(), frozenset())
+
+
+def test_markdown_doc_mapped_mode(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text(CHAPTER, encoding='utf-8')
+    mapped = MarkdownDoc(doc_path=path, mapped=True)
+    plain = MarkdownDoc(doc_path=path)
+    assert mapped.index_words == plain.index_words
+    assert mapped.italicized_phrases == plain.italicized_phrases
+
+
+def test_invalid_utf8_is_reported(tmp_path: Path) -> None:
+    path = tmp_path / "bad.md"
+    path.write_bytes(b"caf\xe9 ok\n")
+    with pytest.raises(UnicodeDecodeError):
+        extract_mapped(path)
+
+
+def test_same_fence_rule(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("*alpha term*\n\n```inline``` text\n\n*beta term*\n\n"
+                    "````\n```\n*hidden term*\n````\n*gamma term*\n", encoding='utf-8')
+    mapped, scanned = both(path)
+    assert mapped == scanned
+    assert mapped[0] == {'alpha term', 'beta term', 'gamma term'}
@@ -43,3 +43,36 @@ def test_markdown_doc_index_phrases(mock_doc: MarkdownDoc) -> None:
 def test_markdown_doc_index_words(mock_doc: MarkdownDoc) -> None:
     # Assuming remove_stop_words function removes stop words ('is', 'a')
     assert mock_doc.index_words == {'this', 'test', 'markdown', 'document.'}
+
+
+def test_markdown_doc_is_lazy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from markua_indexing import markdown_doc
+    path = tmp_path / "lazy.md"
+    path.write_text(TEST_DOC_CONTENT, encoding='utf-8')
+    requested = []
+    scan = markdown_doc.scan
+    monkeypatch.setattr(markdown_doc, "scan",
+                        lambda lines, words, italics, **kwargs:
+                        requested.append((words, italics))
+                        or scan(lines, words=words, italics=italics, **kwargs))
+    doc = markdown_doc.MarkdownDoc(doc_path=path)
+    assert requested == []
+    assert doc.index_phrases == doc.index_phrases
+    assert requested == [(False, True)]
+
+
+def test_markdown_doc_is_compact(tmp_path: Path) -> None:
+    from markua_indexing.markdown_doc import MarkdownDoc
+    paths = [tmp_path / "one.md", tmp_path / "two.md"]
+    for path in paths:
+        path.write_text("Shared vocabulary", encoding='utf-8')
+    one, two = (MarkdownDoc(doc_path=path, keep_text=False) for path in paths)
+    assert not hasattr(one, '__dict__')
+    assert isinstance(one.unique_words, frozenset)
+    assert one.original == "Shared vocabulary"
+    # Not held on to, so read from the file again next time:
+    paths[0].write_text("Edited vocabulary", encoding='utf-8')
+    assert one.original == "Edited vocabulary"
+    # Interned, so each word is stored once however many documents use it:
+    word = max(one.unique_words)
+    assert any(word is other for other in two.unique_words)
@@ -0,0 +1,65 @@
+import pickle
+import sys
+import time
+from pathlib import Path
+from markua_indexing.packed_words import PackedWords
+from markua_indexing.stop_words import StopWords
+
+WORDS = [f"word{n}" for n in range(5000)] + ["naïve", "café au lait", "aren't"]
+
+
+def test_membership_in_both_tiers() -> None:
+    packed = PackedWords(WORDS, hot=100)
+    assert all(word in packed for word in WORDS)
+    assert not any(f"other{n}" in packed for n in range(5000))
+    assert "word" not in packed and "" not in packed and 42 not in packed
+    assert len(packed) == len(WORDS)
+    assert packed == set(WORDS)
+
+
+def test_empty_and_duplicates() -> None:
+    assert len(PackedWords([])) == 0
+    assert "a" not in PackedWords([])
+    assert PackedWords(["a", "b", "a"], hot=0) == {"a", "b"}
+
+
+def test_pickles_compactly() -> None:
+    words = [f"term{n:06d}" for n in range(100_000)]
+    packed = PackedWords(words, hot=0)
+    data = pickle.dumps(packed, protocol=pickle.HIGHEST_PROTOCOL)
+    assert pickle.loads(data) == packed
+    strings = sum(sys.getsizeof(word) for word in words) + sys.getsizeof(set(words))
+    assert len(data) < strings / 3
+
+
+def test_stop_words_from_a_long_list(tmp_path: Path) -> None:
+    dictionaries = tmp_path / "dictionaries"
+    dictionaries.mkdir()
+    (dictionaries / "frequency.txt").write_text(
+        "".join(f"Word{n}\n" for n in range(30_000)), encoding='utf-8')
+    (dictionaries / "phrases.txt").write_text("side effects\n", encoding='utf-8')
+    stop_words = StopWords(dictionaries)
+    assert 'word29999' in stop_words
+    assert 'Side Effects.' in stop_words
+    assert stop_words.remove_from({'Word5', 'Monad'}) == {'Monad'}
+    assert stop_words.words.lookup == stop_words.words
+
+
+def test_lookups_keep_up_with_a_set() -> None:
+    words = [f"word{n}" for n in range(200_000)]
+    items = [f"word{n}" for n in range(0, 400_000, 7)]
+    packed = PackedWords(words)
+    plain = set(words)
+
+    def best(lookup) -> float:
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            found = [item for item in items if item in lookup]
+            timings.append(time.perf_counter() - started)
+        assert len(found) == len(range(0, 200_000, 7))
+        return min(timings)
+
+    assert best(packed.lookup) <= 1.25 * best(plain)
+    # A `hot` limit trades that speed for memory:
+    assert PackedWords(words, hot=100).lookup == plain
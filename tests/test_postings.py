@@ -0,0 +1,67 @@
+from pathlib import Path
+from markua_indexing.manuscript import index_manuscript
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.postings import Postings
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_add_and_query() -> None:
+    postings = Postings([Path("a.md")])
+    postings.add('Monad', 0, 3, 7)
+    postings.add('Monad', 0, 9, 0)
+    assert postings.locations('Monad') == [(Path("a.md"), 3, 7), (Path("a.md"), 9, 0)]
+    assert postings.count('Monad') == 2
+    assert postings.locations('Functor') == []
+
+
+def test_merge_renumbers_files() -> None:
+    first, second = Postings([Path("a.md")]), Postings([Path("b.md")])
+    first.add('Monad', 0, 1, 0)
+    second.add('Monad', 0, 2, 4)
+    first.merge(second)
+    assert first.locations('Monad') == [(Path("a.md"), 1, 0), (Path("b.md"), 2, 4)]
+
+
+def test_rename_merges_variants() -> None:
+    postings = Postings([Path("a.md")])
+    postings.add('Monads', 0, 1, 0)
+    postings.add('monad', 0, 2, 4)
+    postings.add('Functor', 0, 3, 0)
+    postings.rename({'Monads': 'monad', 'monad': 'monad'})
+    assert sorted(postings) == ['Functor', 'monad']
+    assert postings.locations('monad') == [(Path("a.md"), 1, 0), (Path("a.md"), 2, 4)]
+
+
+def test_markdown_doc_positions(tmp_path: Path) -> None:
+    path = write(tmp_path / "ch.md", "The Monad\n\n```\nMonad\n```\nA *Functor* and Monad\n")
+    doc = MarkdownDoc(doc_path=path, positions=True)
+    postings = doc.postings
+    assert postings.locations('Monad') == [(path, 1, 4), (path, 6, 16)]
+    assert postings.locations('Functor') == [(path, 6, 3)]  # Once, though italicized
+    # Only surviving index terms are kept:
+    assert 'The' not in postings
+    assert MarkdownDoc(doc_path=path).postings is None
+
+
+def test_italicized_word_has_one_location(tmp_path: Path) -> None:
+    path = write(tmp_path / "ch.md", "The *Monad* binds.\n")
+    postings = MarkdownDoc(doc_path=path, positions=True).postings
+    assert postings.locations('Monad') == [(path, 1, 5)]
+    assert postings.count('Monad') == 1
+
+
+def test_manuscript_positions(tmp_path: Path) -> None:
+    paths = [write(tmp_path / "a.md", "Monad\n"), write(tmp_path / "b.md", "x\nMonad\n")]
+    manuscript = index_manuscript(paths, workers=1, positions=True)
+    assert sorted(manuscript.postings.locations('Monad')) == [(paths[0], 1, 0), (paths[1], 2, 0)]
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    postings = Postings([Path("a.md")])
+    postings.add('Monad', 0, 1, 2)
+    postings.save(tmp_path / "index.postings")
+    assert Postings.load(tmp_path / "index.postings") == postings
@@ -0,0 +1,61 @@
+import json
+import tracemalloc
+from pathlib import Path
+import pytest
+from markua_indexing.cli import main
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.profiling import Profiler, no_profiler
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    # Profiler starts tracemalloc, which would slow down every later test
+    yield
+    tracemalloc.stop()
+
+
+def test_stage_records_time_bytes_and_memory() -> None:
+    profiler = Profiler()
+    with profiler.stage("outer", "a.md", 10):
+        with profiler.stage("inner", "a.md"):
+            block = bytearray(1_000_000)
+        del block
+    inner, outer = profiler.records
+    assert (inner.name, outer.name) == ("inner", "outer")
+    assert inner.peak_memory >= 1_000_000
+    assert outer.peak_memory >= inner.peak_memory
+    assert outer.duration_ns >= inner.duration_ns
+    assert profiler.summary()["stages"]["outer"]["bytes"] == 10
+
+
+def test_disabled_profiler_records_nothing() -> None:
+    with no_profiler.stage("anything"):
+        pass
+    no_profiler.add("io", "a.md", 5)
+    assert no_profiler.records == []
+
+
+def test_markdown_doc_stages(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("A *Monad*\n\n```\ncode\n```\n", encoding='utf-8')
+    profiler = Profiler(memory=False)
+    doc = MarkdownDoc(doc_path=path, profiler=profiler)
+    doc.extract()
+    doc.index_words, doc.index_phrases, doc.codeless
+    stages = profiler.summary()["stages"]
+    assert {"scan", "io", "emphasis", "dictionaries", "remove_stop_words",
+            "read", "strip_code"} <= stages.keys()
+    assert stages["scan"]["bytes"] == path.stat().st_size
+
+
+def test_cli_writes_summary_and_trace(tmp_path: Path) -> None:
+    for n in range(2):
+        (tmp_path / f"ch{n}.md").write_text("Monads and Functors\n", encoding='utf-8')
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path), "-j", "2", "--no-cache", "-o", str(output), "--profile"])
+    summary = json.loads((tmp_path / "profile.json").read_text(encoding='utf-8'))
+    assert summary["stages"]["scan"]["calls"] == 2
+    assert len(summary["files"]) >= 2
+    trace = json.loads((tmp_path / "profile.trace.json").read_text(encoding='utf-8'))
+    assert {event["ph"] for event in trace["traceEvents"]} == {"X"}
+    assert {"index_manuscript", "write", "scan"} <= {e["name"] for e in trace["traceEvents"]}
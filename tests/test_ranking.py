@@ -0,0 +1,77 @@
+import time
+from pathlib import Path
+import pytest
+from markua_indexing.cli import main
+from markua_indexing.manuscript import index_manuscript
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.tagger import load_terms
+
+pytest.importorskip("numpy")
+from markua_indexing.ranking import rank  # noqa: E402
+
+
+def test_concentrated_terms_outrank_common_ones() -> None:
+    chapters = [
+        {'Monad': 5, 'function': 3},
+        {'Functor': 1, 'function': 3},
+        {'function': 2},
+    ]
+    ranked = rank(chapters)
+    assert [term.term for term in ranked] == ['Monad', 'function', 'Functor']
+    function = ranked[1]
+    assert (function.count, function.chapters) == (8, 3)
+    assert function.dispersion > 0.7
+    assert ranked[0].dispersion == 0.0
+
+
+def test_restricts_to_terms_and_top() -> None:
+    chapters = [{'Monad': 5, 'function': 3, 'the': 50}]
+    assert [term.term for term in rank(chapters, terms={'Monad', 'function'})] == \
+        ['Monad', 'function']
+    assert [term.term for term in rank(chapters, top=1)] == ['the']
+    assert rank([{}]) == []
+
+
+def test_ties_are_alphabetical() -> None:
+    assert [term.term for term in rank([{'beta': 1, 'Alpha': 1, 'alpha': 1}])] == \
+        ['Alpha', 'alpha', 'beta']
+
+
+def test_markdown_doc_counts_index_terms(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("The Monad and the *Monad*\n\n```\nMonad\n```\nMonad\n", encoding='utf-8')
+    counts = MarkdownDoc(path, counts=True).term_counts
+    assert counts['Monad'] == 3
+    assert 'the' not in counts
+
+
+def test_cli_writes_ranked_scores(tmp_path: Path) -> None:
+    for n, text in enumerate(["Monads compose. Monads bind. Functors map.\n",
+                              "Functors map.\n"]):
+        (tmp_path / f"chapter{n}.md").write_text(text, encoding='utf-8')
+    output = tmp_path / "index_words.txt"
+    main([str(tmp_path), "--workers", "1", "--no-cache", "--top", "2",
+          "--output", str(output)])
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[1] == "Index Words:"
+    term, score, count, chapters, dispersion = lines[2].split('\t')
+    assert (term, count, chapters) == ('Monads', '2', '1')
+    assert len(lines) == 4
+    assert load_terms(output) == ['Monads', lines[3].split('\t')[0]]
+
+
+def test_ranks_a_large_book_quickly() -> None:
+    # About a million tokens over 40 chapters
+    chapters = [{f"term{(chapter * 7919 + n) % 60000}": n % 50 + 1 for n in range(12000)}
+                for chapter in range(40)]
+    started = time.perf_counter()
+    ranked = rank(chapters, top=100)
+    assert time.perf_counter() - started < 1.0
+    assert len(ranked) == 100
+
+
+def test_manuscript_collects_chapter_counts(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("Monads compose.\n", encoding='utf-8')
+    manuscript = index_manuscript([path], workers=1, counts=True)
+    assert manuscript.counts == [{'Monads': 1}]
@@ -0,0 +1,86 @@
+from pathlib import Path
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.scanner import (BOLD, CODE, DEFINITION, HEADING, ITALIC, WORD, Fences, Token,
+                                     scan)
+
+CHAPTER = """\
+A *Monad* wraps
+a value, and _side
+effects_ too.
+
+```python
+not_a_word = "*nope*"
+```
+
+snake_case_name but **bold** isn't *italic*.
+"""
+
+
+def tokens(kind: str) -> list[Token]:
+    return [token for token in scan(CHAPTER.splitlines(keepends=True)) if token.kind == kind]
+
+
+def test_words_skip_fenced_code_and_numbers() -> None:
+    words = [token.text for token in tokens(WORD)]
+    assert 'Monad' in words
+    assert 'snake_case_name' in words
+    assert 'not_a_word' not in words
+    assert 'python' not in words
+
+
+def test_italics_cross_lines_but_not_fences() -> None:
+    assert tokens(ITALIC) == [
+        Token(ITALIC, 'Monad', 1, 2),
+        Token(ITALIC, 'side effects', 2, 13),
+        Token(ITALIC, 'italic', 9, 35),
+    ]
+
+
+def test_italics_never_cross_blank_lines() -> None:
+    lines = ["an *unclosed\n", "\n", "paragraph* here\n"]
+    assert list(scan(lines, words=False)) == []
+
+
+def test_word_positions() -> None:
+    assert list(scan(["  12 ab_c d\n"], italics=False)) == [
+        Token(WORD, 'ab_c', 1, 5),
+        Token(WORD, 'd', 1, 10),
+    ]
+
+
+def test_consumes_an_iterator_lazily() -> None:
+    def lines():
+        yield "first line\n"
+        raise AssertionError("read past the first word")
+    assert next(scan(lines())).text == 'first'
+
+
+def test_further_kinds_only_when_asked_for() -> None:
+    lines = ["## Effects {#effects}\n", "\n", "Monad\n", ": wraps `os.path` and **bold**\n"]
+    assert {token.kind for token in scan(lines)} == {WORD}
+    assert [token for token in scan(lines, words=False, kinds=frozenset({
+        HEADING, DEFINITION, BOLD, CODE}))] == [
+        Token(HEADING, 'Effects', 1, 3),
+        Token(DEFINITION, 'Monad', 3, 0),
+        Token(BOLD, 'bold', 4, 22),
+        Token(CODE, 'os.path', 4, 9),
+    ]
+
+
+def test_fences_need_a_line_of_their_own() -> None:
+    fences = Fences()
+    assert not fences.toggles("```inline``` text\n")
+    assert fences.toggles("````python\n")
+    assert not fences.toggles("```\n")  # Shorter than the opening run
+    assert not fences.toggles("```` not a close\n")
+    assert fences.toggles("`````\n")
+    assert fences.opened == 0
+
+
+def test_extraction_and_codeless_agree_on_fences(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("*alpha term* here.\n\n```inline``` text\n\nThen *beta term*.\n\n"
+                    "```\n*gamma term*\n```\n", encoding='utf-8')
+    doc = MarkdownDoc(path)
+    assert doc.italicized_phrases == {'alpha term', 'beta term'}
+    assert 'beta' in doc.codeless and 'gamma' not in doc.codeless
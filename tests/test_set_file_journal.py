@@ -0,0 +1,76 @@
+import time
+from pathlib import Path
+import pytest
+from markua_indexing.set_file import SetFile
+
+
+def test_changes_are_journaled_until_flush(tmp_path: Path) -> None:
+    set_file = SetFile("terms.txt", tmp_path)
+    set_file.add("monad")
+    set_file.add("functor")
+    set_file.add("monad")
+    set_file.remove("functor")
+    set_file.remove("missing")
+    assert not set_file.file_path.exists()
+    assert set_file.journal_path.exists()
+    set_file.flush()
+    assert set_file.file_path.read_text(encoding='utf-8') == "monad\n"
+    assert not set_file.journal_path.exists()
+
+
+def test_context_manager_writes_sorted_file(tmp_path: Path) -> None:
+    with SetFile("terms.txt", tmp_path) as set_file:
+        set_file.update(["banana", "apple", "cherry"])
+    assert set_file.file_path.read_text(encoding='utf-8') == "apple\nbanana\ncherry\n"
+    reopened = SetFile("terms.txt", tmp_path)
+    assert list(reopened) == ["apple", "banana", "cherry"]
+    assert "apple" in reopened and len(reopened) == 3
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path: Path) -> None:
+    with SetFile("terms.txt", tmp_path) as set_file:
+        set_file.add("apple")
+    with pytest.raises(RuntimeError):
+        with SetFile("terms.txt", tmp_path) as set_file:
+            set_file.add("banana")
+            set_file.remove("apple")
+            raise RuntimeError
+    # The sorted file was never half-written:
+    assert set_file.file_path.read_text(encoding='utf-8') == "apple\n"
+    with set_file.journal_path.open('a', encoding='utf-8') as journal:
+        journal.write("+torn")
+    assert list(SetFile("terms.txt", tmp_path)) == ["banana"]
+
+
+def test_rejects_line_breaks(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        SetFile("terms.txt", tmp_path).add("two\nlines")
+
+
+def test_rejects_empty_items(tmp_path: Path) -> None:
+    # An empty line can't be told apart from a blank one, so it wouldn't survive a reload:
+    with SetFile("terms.txt", tmp_path) as set_file:
+        with pytest.raises(ValueError):
+            set_file.add("")
+        with pytest.raises(ValueError):
+            set_file.update(["monad", ""])
+        set_file.add("functor")
+    assert list(SetFile("terms.txt", tmp_path)) == ["functor"]
+
+
+def test_many_adds_are_fast(tmp_path: Path) -> None:
+    started = time.perf_counter()
+    with SetFile("terms.txt", tmp_path) as set_file:
+        for n in range(100_000):
+            set_file.add(f"term{n}")
+    assert time.perf_counter() - started < 1.0
+    assert len(SetFile("terms.txt", tmp_path)) == 100_000
+
+
+def test_update_journals_a_batch(tmp_path: Path) -> None:
+    with pytest.raises(RuntimeError):
+        with SetFile("terms.txt", tmp_path) as set_file:
+            set_file.add("apple")
+            set_file.update(["banana", "apple", "banana"])
+            raise RuntimeError
+    assert set_file.journal_path.read_text(encoding='utf-8') == "+apple\n+banana\n"
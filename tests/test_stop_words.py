@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+import pytest
+from markua_indexing.stop_words import StopWords
+
+
+@pytest.fixture
+def dictionaries(tmp_path: Path) -> Path:
+    directory = tmp_path / "dictionaries"
+    directory.mkdir()
+    (directory / "common.txt").write_text("# comment\nThe\na\n\n", encoding='utf-8')
+    (directory / "phrases.txt").write_text("at compile time\n", encoding='utf-8')
+    return directory
+
+
+def test_loads_lowercased_words_without_comments(dictionaries: Path) -> None:
+    stop_words = StopWords(dictionaries)
+    assert stop_words.words == {'the', 'a', 'at compile time'}
+
+
+def test_remove_from_is_case_insensitive(dictionaries: Path) -> None:
+    stop_words = StopWords(dictionaries)
+    assert stop_words.remove_from({'THE', 'Monad', 'At Compile Time'}) == {'Monad'}
+
+
+def test_reloads_only_when_a_dictionary_changes(dictionaries: Path) -> None:
+    stop_words = StopWords(dictionaries)
+    assert stop_words.refresh()
+    assert not stop_words.refresh()
+    (dictionaries / "common.txt").write_text("monad\n", encoding='utf-8')
+    assert stop_words.refresh()
+    assert 'Monad' in stop_words
+    assert 'the' not in stop_words
+
+
+def test_cold_start_uses_snapshot(dictionaries: Path) -> None:
+    StopWords(dictionaries).refresh()
+    snapshot = dictionaries.with_name("dictionaries.snapshot")
+    assert snapshot.exists()
+    # Hide the text so only the snapshot can supply the words:
+    common = dictionaries / "common.txt"
+    stat = common.stat()
+    common.write_text("#" * (stat.st_size - 1) + "\n", encoding='utf-8')
+    os.utime(common, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert StopWords(dictionaries).words == {'the', 'a', 'at compile time'}
+
+
+def test_shared_instance_per_directory(dictionaries: Path) -> None:
+    assert StopWords.shared(dictionaries) is StopWords.shared(dictionaries)
+
+
+def test_phrases_match_ignoring_punctuation_and_containment(dictionaries: Path) -> None:
+    (dictionaries / "phrases.txt").write_text("at compile time\nside effects\n", encoding='utf-8')
+    stop_words = StopWords(dictionaries)
+    assert 'Side Effects.' in stop_words
+    assert 'checked at compile time' in stop_words
+    assert 'At compile-time' in stop_words
+    assert 'at compile' not in stop_words
+    assert 'compile' not in stop_words
+    # Single-word entries only ever match a whole item:
+    assert 'The Monad' not in stop_words
+    assert stop_words.remove_from({'The', 'The Monad', 'Side Effects.'}) == {'The Monad'}
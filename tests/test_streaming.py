@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import selectors
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from markua_indexing.cli import main
+from markua_indexing.manuscript import index_stream
+from markua_indexing.markdown_doc import MarkdownDoc
+from markua_indexing.streaming import records
+
+TEXT = "The *Monad laws* hold.\n\n```\nhidden\n```\nMonads compose, and the Monad binds.\n"
+
+
+def test_records_report_first_occurrences() -> None:
+    found = list(records(io.StringIO(TEXT), "book.md"))
+    assert found[0] == {"kind": "word", "term": "Monad", "file": "book.md",
+                        "line": 1, "column": 5}
+    terms = [(record["kind"], record["term"]) for record in found]
+    assert terms.count(("word", "Monad")) == 1
+    assert ("phrase", "Monad laws") in terms
+    assert ("word", "the") not in terms and ("word", "hidden") not in terms
+
+
+def test_records_are_incremental() -> None:
+    def lines():
+        yield "Monads compose.\n"
+        raise AssertionError("read past the first term")
+    assert next(records(lines()))["term"] == "Monads"
+
+
+def test_markdown_doc_from_stream() -> None:
+    doc = MarkdownDoc.from_stream(io.StringIO(TEXT), "book.md", positions=True)
+    assert 'Monad laws' in doc.index_phrases
+    assert 'Monads' in doc.index_words
+    assert doc.postings.locations('Monads') == [(Path("book.md"), 6, 0)]
+    with pytest.raises(ValueError):
+        doc.original
+
+
+def test_stream_text_is_kept_on_request() -> None:
+    doc = MarkdownDoc.from_stream(io.StringIO(TEXT), keep_text=True)
+    assert doc.original == TEXT
+    assert 'hidden' not in doc.codeless
+    assert 'Monads' in doc.index_words
+
+
+def test_index_stream() -> None:
+    chapter = index_stream(io.StringIO(TEXT), counts=True)
+    assert chapter.path == Path("-")
+    assert chapter.counts['Monad'] == 2
+
+
+def test_cli_filters_stdin_to_jsonl(monkeypatch: pytest.MonkeyPatch,
+                                    capsys: pytest.CaptureFixture, tmp_path: Path) -> None:
+    chapter = tmp_path / "chapter.md"
+    chapter.write_text("Functors map. Monads compose.\n", encoding='utf-8')
+    monkeypatch.setattr(sys, "stdin", io.StringIO(TEXT))
+    main(["-", str(chapter), "--jsonl"])
+    found = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert found[0]["file"] == "-"
+    assert [record["term"] for record in found if record["file"] == str(chapter)] == \
+        ['Functors']
+
+
+def test_cli_indexes_stdin_into_output(monkeypatch: pytest.MonkeyPatch,
+                                       tmp_path: Path) -> None:
+    monkeypatch.setattr(sys, "stdin", io.StringIO(TEXT))
+    output = tmp_path / "index_words.txt"
+    main(["-", "--no-cache", "--output", str(output)])
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[:2] == ["Italicized Phrases:", "Monad laws"]
+    assert "Monads" in lines
+
+
+def test_cli_jsonl_reaches_a_pipe_before_the_input_ends(tmp_path: Path) -> None:
+    src = Path(__file__).parent.parent / "src"
+    # Without PYTHONUNBUFFERED, stdout is block-buffered, as it is in a pipeline:
+    env = {name: value for name, value in os.environ.items() if name != "PYTHONUNBUFFERED"}
+    process = subprocess.Popen([sys.executable, "-m", "markua_indexing.cli", "-", "--jsonl"],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                               cwd=tmp_path, env={**env, "PYTHONPATH": str(src)})
+    try:
+        process.stdin.write("Monads compose.\n\n")
+        process.stdin.flush()
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            assert selector.select(timeout=10), "no record before the input ended"
+        assert json.loads(process.stdout.readline())["term"] == "Monads"
+    finally:
+        process.stdin.close()
+        process.wait(timeout=30)
+        process.stdout.close()
@@ -0,0 +1,69 @@
+from pathlib import Path
+from markua_indexing.automaton import Automaton
+from markua_indexing.tagger import Tagger, load_terms, main
+
+
+def test_automaton_finds_overlapping_terms() -> None:
+    automaton: Automaton[str] = Automaton()
+    for term in ["side effects", "effects", "pure side effects free"]:
+        automaton.add(term.split(), term)
+    found = sorted(automaton.search("no pure side effects here".split()))
+    assert found == [(2, 4, "side effects"), (3, 4, "effects")]
+    assert not automaton.contains_any("pure side".split())
+
+
+def test_load_terms_skips_sections(tmp_path: Path) -> None:
+    terms = tmp_path / "index_words.txt"
+    terms.write_text("Italicized Phrases:\nSide Effects\n\nIndex Words:\nMonad\n", encoding='utf-8')
+    assert load_terms(terms) == ["Side Effects", "Monad"]
+
+
+def test_tags_leftmost_longest_outside_code() -> None:
+    tagger = Tagger(["Side Effects", "effects", "Monad"])
+    lines = [
+        "Monads and side effects; `Monad` code.\n",
+        "```\n",
+        "Monad\n",
+        "```\n",
+        "# Monad heading\n",
+        "A monad{i: \"Monad\"} already, and side\teffects.\n",
+    ]
+    assert list(tagger.tag_lines(lines)) == [
+        'Monads and side effects{i: "Side Effects"}; `Monad` code.\n',
+        "```\n",
+        "Monad\n",
+        "```\n",
+        "# Monad heading\n",
+        'A monad{i: "Monad"} already, and side\teffects{i: "Side Effects"}.\n',
+    ]
+
+
+def test_phrase_words_must_be_separated_by_whitespace() -> None:
+    tagger = Tagger(["side effects"])
+    assert list(tagger.tag_lines(["side-effects\n"])) == ["side-effects\n"]
+
+
+def test_phrases_wrapped_across_lines() -> None:
+    tagger = Tagger(["side effects"])
+    lines = ["Pure code has no side\n", "effects at all.\n", "\n", "side\n", "\n", "effects\n"]
+    assert list(tagger.tag_lines(lines)) == [
+        "Pure code has no side\n",
+        'effects{i: "side effects"} at all.\n',
+        "\n", "side\n", "\n", "effects\n",  # Never across paragraphs
+    ]
+
+
+def test_match_case_and_once() -> None:
+    assert list(Tagger(["Go"], match_case=True).tag_lines(["go Go\n"])) == ['go Go{i: "Go"}\n']
+    assert list(Tagger(["Go"]).tag_lines(["Go go\n", "go\n"], once=True)) == \
+        ['Go{i: "Go"} go\n', "go\n"]
+
+
+def test_cli_rewrites_files_idempotently(tmp_path: Path) -> None:
+    terms = tmp_path / "terms.txt"
+    terms.write_text("Index Words:\nMonad\n", encoding='utf-8')
+    chapter = tmp_path / "chapter.md"
+    chapter.write_text("A Monad.\n", encoding='utf-8')
+    main([str(chapter), "--terms", str(terms)])
+    main([str(chapter), "--terms", str(terms)])
+    assert chapter.read_text(encoding='utf-8') == 'A Monad{i: "Monad"}.\n'
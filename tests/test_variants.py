@@ -0,0 +1,76 @@
+from pathlib import Path
+from markua_indexing.cli import main
+from markua_indexing.mapped import extract_mapped
+from markua_indexing.postings import Postings
+from markua_indexing.markdown_doc import extract
+from markua_indexing.variants import canonical, surface_forms
+
+
+def test_canonical_folds_variants() -> None:
+    assert canonical("Effect") == canonical("effects") == canonical("Effects.")
+    assert canonical("Side Effects.") == canonical("side effect")
+    assert canonical("mapping") == canonical("mapped") == canonical("maps") == canonical("map")
+    assert canonical("libraries") == canonical("Library")
+    assert canonical("compose") == canonical("composed")
+    assert canonical("classes") == canonical("class")
+    assert canonical("Monad's") == canonical("monad")
+
+
+def test_canonical_keeps_distinct_words_apart() -> None:
+    assert canonical("string") != canonical("str")
+    assert canonical("thing") != canonical("th")
+    assert canonical("need") != canonical("ne")
+    assert canonical("bus") != canonical("bu")
+
+
+def test_canonical_keeps_lookalikes_apart() -> None:
+    assert canonical("lens") != canonical("len()")
+    assert canonical("News") != canonical("new")
+    assert canonical("Typed") != canonical("Types")
+    assert canonical("typing") != canonical("Types")
+    assert canonical("Types") == canonical("type")
+
+
+def test_canonical_is_cached() -> None:
+    canonical.cache_clear()
+    canonical("Functors")
+    canonical("Functors")
+    assert canonical.cache_info().hits == 1
+
+
+def test_most_common_form_wins() -> None:
+    forms = surface_forms(["Effect", "effects", "Effects."], {'effects': 3, 'Effect': 1})
+    assert set(forms.values()) == {'effects'}
+    # Without counts, the shortest, then lowercase
+    assert set(surface_forms(["Monads", "Monad", "monad"]).values()) == {'monad'}
+
+
+def test_mapped_counts_match_line_scanner(tmp_path: Path) -> None:
+    path = tmp_path / "ch.md"
+    path.write_text("Café *Monad* and _side\neffects_ café\n\n```\nMonad\n```\nMonad 42\n",
+                    encoding='utf-8')
+    mapped: dict = {}
+    scanned: dict = {}
+    extract_mapped(path, counts=mapped)
+    with path.open(encoding='utf-8') as lines:
+        extract(lines, counts=scanned)
+    assert mapped == scanned
+    assert scanned['Monad'] == 2
+    assert scanned['side effects'] == 1
+
+
+def test_cli_folds_variants(tmp_path: Path) -> None:
+    chapter = tmp_path / "chapter.md"
+    chapter.write_text("Monads compose. A monad binds; monads map; monads fold.\n"
+                       "*Side Effects.* and *side effects*\n", encoding='utf-8')
+    output = tmp_path / "index_words.txt"
+    main([str(chapter), "--no-cache", "--fold-variants", "--positions", "--output", str(output)])
+    text = output.read_text(encoding='utf-8')
+    assert "\nmonads\n" in text + "\n"
+    assert "Monads" not in text
+    assert text.count("ide effects") == 1
+    # The postings are folded onto the written forms too:
+    postings = Postings.load(output.with_suffix(".postings"))
+    assert "Monads" not in postings and postings.count("monads") == 4
+    main([str(chapter), "--no-cache", "--output", str(output)])
+    assert "Monads" in output.read_text(encoding='utf-8')  # Folding is opt-in
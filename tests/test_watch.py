@@ -0,0 +1,98 @@
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+import pytest
+from markua_indexing import markdown_doc
+from markua_indexing.cli import main
+from markua_indexing.watch import InotifyWatcher, LiveIndex, PollingWatcher, debounced
+
+
+class ScriptedWatcher:
+    """Replays batches of changes; None stands for a quiet period."""
+
+    def __init__(self, events: List[Optional[Set[Path]]]):
+        self.events = events
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        event = self.events.pop(0)
+        return event or set()
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_debounce_merges_bursts() -> None:
+    a, b, c = Path("a.md"), Path("b.md"), Path("c.md")
+    batches = debounced(ScriptedWatcher([{a}, {b}, None, {c}, None]))
+    assert next(batches) == {a, b}
+    assert next(batches) == {c}
+
+
+def test_polling_watcher_reports_changes(tmp_path: Path) -> None:
+    chapter = write(tmp_path / "ch.md", "one")
+    watcher = PollingWatcher([tmp_path], interval=0.01)
+    assert watcher.wait(0.02) == set()
+    write(chapter, "one two")
+    created = write(tmp_path / "new.md", "new")
+    assert watcher.wait(1) == {chapter, created}
+
+
+def test_inotify_watcher_reports_changes(tmp_path: Path) -> None:
+    try:
+        watcher = InotifyWatcher([tmp_path])
+    except OSError:
+        pytest.skip("inotify is not available")
+    chapter = write(tmp_path / "ch.md", "one")
+    assert chapter in watcher.wait(1)
+    watcher.close()
+
+
+def test_live_index_reprocesses_only_changed_chapters(tmp_path: Path) -> None:
+    first = write(tmp_path / "first.md", "Monads\n")
+    second = write(tmp_path / "second.md", "Functors\n")
+    output = tmp_path / "index_words.txt"
+    live = LiveIndex([first, second], [tmp_path], [".md"], output, workers=1)
+    before = live.chapters[second.resolve()]
+    write(first, "Applicatives\n")
+    added = write(tmp_path / "third.md", "Lenses\n")
+    assert live.update({first, added, tmp_path / "notes.txt"})
+    assert live.chapters[second.resolve()] is before
+    assert live.manuscript().index_words == {'Applicatives', 'Functors', 'Lenses'}
+    second.unlink()
+    assert live.update({second})
+    live.write()
+    assert output.read_text(encoding='utf-8') == "Index Words:\nApplicatives\nLenses"
+    assert not live.update({tmp_path / "unrelated.txt"})
+
+
+def test_watch_rewrites_output_after_a_save(tmp_path: Path) -> None:
+    chapter = write(tmp_path / "ch.md", "Monads\n")
+    output = tmp_path / "index_words.txt"
+    live = LiveIndex([chapter], [tmp_path], [".md"], output, workers=1)
+    live.write()
+    watcher = PollingWatcher([tmp_path], interval=0.01)
+    threading.Thread(target=live.watch, args=(watcher, 0.02), daemon=True).start()
+    write(chapter, "Functors\n")
+    deadline = time.monotonic() + 2
+    while "Functors" not in output.read_text(encoding='utf-8'):
+        assert time.monotonic() < deadline, "index was not rewritten"
+        time.sleep(0.01)
+
+
+def test_cli_watch_writes_the_default_output(monkeypatch: pytest.MonkeyPatch,
+                                             tmp_path: Path,
+                                             capsys: pytest.CaptureFixture) -> None:
+    write(tmp_path / "ch.md", "Monads\n")
+    output = tmp_path / "index_words" / "index_words.txt"
+    monkeypatch.setattr(markdown_doc, "index_words_file", output)
+
+    def interrupted(self: LiveIndex, *args: object) -> None:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(LiveIndex, "watch", interrupted)
+    main([str(tmp_path), "--watch", "--workers", "1"])
+    assert output.read_text(encoding='utf-8') == "Index Words:\nMonads"
+    assert f"into {output};" in capsys.readouterr().out